@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+# End to end benchmark for clone_svn_repo(), against synthetic svn repos, built locally, and served over file:// and a local svnserve
+# Usage: python3 benchmarks/convert_svn_repo.py [--scenarios small,binary] [--access file,svnserve] [--output results.json] [--compare baseline.json]
+# Run from the repo-converter directory, in the repo converter's image, or with subversion, git, git-svn, and the packages from build/requirements.txt installed
+# Writes the results to a JSON file, with the commit they were measured on, so the results from two commits can be compared with --compare
+
+## Import libraries
+# Standard libraries
+import argparse                                             # https://docs.python.org/3/library/argparse.html
+from datetime import datetime, timedelta, timezone          # https://docs.python.org/3/library/datetime.html
+import json                                                 # https://docs.python.org/3/library/json.html
+import multiprocessing                                      # https://docs.python.org/3/library/multiprocessing.html
+import os                                                   # https://docs.python.org/3/library/os.html
+import platform                                             # https://docs.python.org/3/library/platform.html
+import queue                                                # https://docs.python.org/3/library/queue.html
+import random                                               # https://docs.python.org/3/library/random.html
+import resource                                             # https://docs.python.org/3/library/resource.html
+import shutil                                               # https://docs.python.org/3/library/shutil.html
+import socket                                               # https://docs.python.org/3/library/socket.html
+import statistics                                           # https://docs.python.org/3/library/statistics.html
+import subprocess                                           # https://docs.python.org/3/library/subprocess.html
+import sys                                                  # https://docs.python.org/3/library/sys.html
+import tempfile                                             # https://docs.python.org/3/library/tempfile.html
+import time                                                 # https://docs.python.org/3/library/time.html
+import uuid                                                 # https://docs.python.org/3/library/uuid.html
+
+build_directory_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build")
+
+# Name: parameters of the synthetic svn repo
+# revisions:        number of revisions, including the ones which create branches and tags
+# files:            number of text files added or changed in each revision on trunk
+# blob_bytes:       size of a binary file added or changed in each revision on trunk, 0 for none
+# branches, tags:   number of branches and tags copied from trunk, spread over the history, every 7th revision also changes a file on a branch
+# layout:           standard for trunk, branches, tags, or custom for project/main, project/feature-branches, project/releases
+scenarios_dict = {
+    "small"             : {"revisions": 200     , "files": 5    , "blob_bytes": 0           , "branches": 2     , "tags": 2     , "layout": "standard"  },
+    "many-revisions"    : {"revisions": 2000    , "files": 1    , "blob_bytes": 0           , "branches": 0     , "tags": 0     , "layout": "standard"  },
+    "wide-commits"      : {"revisions": 100     , "files": 200  , "blob_bytes": 0           , "branches": 0     , "tags": 0     , "layout": "standard"  },
+    "binary"            : {"revisions": 100     , "files": 2    , "blob_bytes": 1048576     , "branches": 0     , "tags": 0     , "layout": "standard"  },
+    "branches-tags"     : {"revisions": 300     , "files": 3    , "blob_bytes": 0           , "branches": 50    , "tags": 100   , "layout": "standard"  },
+    "custom-layout"     : {"revisions": 200     , "files": 5    , "blob_bytes": 0           , "branches": 5     , "tags": 5     , "layout": "custom"    },
+}
+
+layouts_dict = {
+    "standard"  : {"trunk": "trunk"         , "branches": "branches"                , "tags": "tags"            },
+    "custom"    : {"trunk": "project/main"  , "branches": "project/feature-branches", "tags": "project/releases"},
+}
+
+
+def format_dump_properties(properties):
+
+    # Format a dict of svn properties into the dump file's property block
+    property_block = b""
+
+    for property_name, property_value in properties.items():
+
+        property_name   = property_name.encode("utf-8")
+        property_value  = property_value if isinstance(property_value, bytes) else str(property_value).encode("utf-8")
+
+        property_block += b"K %d\n%s\nV %d\n%s\n" % (len(property_name), property_name, len(property_value), property_value)
+
+    return property_block + b"PROPS-END\n"
+
+
+def write_dump_revision(dump_file, revision, revision_date, log_message):
+
+    property_block = format_dump_properties({
+        "svn:author"    : "benchmark",
+        "svn:date"      : revision_date.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+        "svn:log"       : log_message,
+    })
+
+    dump_file.write(b"Revision-number: %d\nProp-content-length: %d\nContent-length: %d\n\n" % (revision, len(property_block), len(property_block)))
+    dump_file.write(property_block + b"\n")
+
+
+def write_dump_node(dump_file, node_path, node_kind, node_action, properties=None, text=None, copy_from=None):
+
+    # Write one node, ex. a file added or changed, or a directory added, or copied from another path
+    dump_file.write(b"Node-path: %s\nNode-kind: %s\nNode-action: %s\n" % (node_path.encode("utf-8"), node_kind.encode("utf-8"), node_action.encode("utf-8")))
+
+    if copy_from:
+        dump_file.write(b"Node-copyfrom-rev: %d\nNode-copyfrom-path: %s\n" % (copy_from[0], copy_from[1].encode("utf-8")))
+
+    property_block  = format_dump_properties(properties) if properties is not None else b""
+    content_length  = len(property_block)
+
+    if properties is not None:
+        dump_file.write(b"Prop-content-length: %d\n" % len(property_block))
+
+    if text is not None:
+        dump_file.write(b"Text-content-length: %d\n" % len(text))
+        content_length += len(text)
+
+    if properties is not None or text is not None:
+        dump_file.write(b"Content-length: %d\n" % content_length)
+
+    dump_file.write(b"\n" + property_block + (text or b"") + b"\n\n")
+
+
+def write_synthetic_svn_dump(dump_file_path, scenario, seed=0):
+
+    # Write an svn dump file with the scenario's history, which svnadmin load commits much faster than running svn commit for each revision,
+    # and with a fixed seed, the same history every time, so results are comparable across commits
+    random_generator    = random.Random(seed)
+    layout              = layouts_dict[scenario["layout"]]
+    revision_date       = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    copy_count          = scenario["branches"] + scenario["tags"]
+    file_pool_size      = max(scenario["files"] * 5, 10)
+
+    # Spread the revisions which copy trunk to branches and tags over the history, after the first content revision
+    copy_revisions_dict = {}
+
+    for copy_number in range(copy_count):
+
+        copy_revision = 3 + (copy_number * (scenario["revisions"] - 3)) // max(copy_count, 1)
+
+        while copy_revision in copy_revisions_dict:
+            copy_revision += 1
+
+        if copy_number < scenario["branches"]:
+            copy_revisions_dict[copy_revision] = f"{layout['branches']}/branch-{copy_number}"
+        else:
+            copy_revisions_dict[copy_revision] = f"{layout['tags']}/tag-{copy_number - scenario['branches']}"
+
+    trunk_files         = set()
+    branch_files_dict   = {}
+
+    with open(dump_file_path, "wb") as dump_file:
+
+        dump_file.write(b"SVN-fs-dump-format-version: 2\n\nUUID: %s\n\n" % str(uuid.UUID(int=random_generator.getrandbits(128))).encode("utf-8"))
+
+        revision_0_properties = format_dump_properties({"svn:date": revision_date.strftime("%Y-%m-%dT%H:%M:%S.000000Z")})
+        dump_file.write(b"Revision-number: 0\nProp-content-length: %d\nContent-length: %d\n\n%s\n" % (len(revision_0_properties), len(revision_0_properties), revision_0_properties))
+
+        # Revision 1 creates the layout's directories
+        write_dump_revision(dump_file, 1, revision_date, "Create the layout")
+
+        layout_directories = set()
+
+        for layout_path in layout.values():
+
+            path_parts = layout_path.split("/")
+
+            for depth in range(1, len(path_parts) + 1):
+                layout_directories.add("/".join(path_parts[:depth]))
+
+        for layout_directory in sorted(layout_directories):
+            write_dump_node(dump_file, layout_directory, "dir", "add", properties={})
+
+        for revision in range(2, max(scenario["revisions"], 2) + 1):
+
+            revision_date += timedelta(minutes=random_generator.randint(1, 600))
+
+            # Copy trunk to a branch or tag
+            if revision in copy_revisions_dict:
+
+                copy_path = copy_revisions_dict[revision]
+                write_dump_revision(dump_file, revision, revision_date, f"Copy trunk to {copy_path}")
+                write_dump_node(dump_file, copy_path, "dir", "add", copy_from=(revision - 1, layout["trunk"]))
+
+                if copy_path.startswith(layout["branches"]) and trunk_files:
+                    branch_files_dict[copy_path] = sorted(trunk_files)
+
+                continue
+
+            write_dump_revision(dump_file, revision, revision_date, f"Change {scenario['files']} files, revision {revision} of {scenario['revisions']}\n\n" + "Longer commit message body. " * random_generator.randint(0, 20))
+
+            # Every 7th revision also changes a file on a branch, if there are any
+            if revision % 7 == 0 and branch_files_dict:
+
+                branch_path = random_generator.choice(sorted(branch_files_dict))
+                branch_file = random_generator.choice(branch_files_dict[branch_path])
+
+                write_dump_node(dump_file, f"{branch_path}/{branch_file[len(layout['trunk']) + 1:]}", "file", "change", text=f"Changed on {branch_path} in revision {revision}\n".encode("utf-8"))
+
+            for file_number in range(scenario["files"]):
+
+                file_path = f"{layout['trunk']}/dir-{file_number % 10}/file-{(revision * scenario['files'] + file_number) % file_pool_size}.txt"
+                file_text = "".join(f"Line {line_number} of {file_path} in revision {revision}, {random_generator.random()}\n" for line_number in range(random_generator.randint(5, 50))).encode("utf-8")
+
+                if file_path in trunk_files:
+
+                    write_dump_node(dump_file, file_path, "file", "change", text=file_text)
+
+                else:
+
+                    directory_path = file_path.rsplit("/", 1)[0]
+
+                    if not any(trunk_file.startswith(f"{directory_path}/") for trunk_file in trunk_files):
+                        write_dump_node(dump_file, directory_path, "dir", "add", properties={})
+
+                    write_dump_node(dump_file, file_path, "file", "add", properties={}, text=file_text)
+                    trunk_files.add(file_path)
+
+            if scenario["blob_bytes"]:
+
+                blob_path = f"{layout['trunk']}/assets/blob-{revision % 20}.bin"
+                blob_data = random_generator.randbytes(scenario["blob_bytes"])
+
+                if blob_path in trunk_files:
+
+                    write_dump_node(dump_file, blob_path, "file", "change", text=blob_data)
+
+                else:
+
+                    if not any(trunk_file.startswith(f"{layout['trunk']}/assets/") for trunk_file in trunk_files):
+                        write_dump_node(dump_file, f"{layout['trunk']}/assets", "dir", "add", properties={})
+
+                    write_dump_node(dump_file, blob_path, "file", "add", properties={"svn:mime-type": "application/octet-stream"}, text=blob_data)
+                    trunk_files.add(blob_path)
+
+
+def create_synthetic_svn_repo(svn_repos_root_path, scenario_name, scenario):
+
+    # Create the svn repo with svnadmin create, and load the scenario's history into it
+    svn_repo_path   = f"{svn_repos_root_path}/{scenario_name}"
+    dump_file_path  = f"{svn_repos_root_path}/{scenario_name}.dump"
+
+    shutil.rmtree(svn_repo_path, ignore_errors=True)
+
+    write_synthetic_svn_dump(dump_file_path, scenario)
+    subprocess.run(["svnadmin", "create", svn_repo_path], check=True)
+
+    with open(dump_file_path, "rb") as dump_file:
+        subprocess.run(["svnadmin", "load", "--quiet", svn_repo_path], stdin=dump_file, check=True)
+
+    os.remove(dump_file_path)
+
+    return svn_repo_path
+
+
+def get_free_port():
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as free_port_socket:
+        free_port_socket.bind(("127.0.0.1", 0))
+        return free_port_socket.getsockname()[1]
+
+
+def start_svnserve(svn_repos_root_path):
+
+    # Serve the svn repos read only, to anonymous users, which is svnserve's default, on a local port
+    svnserve_port = get_free_port()
+    svnserve_process = subprocess.Popen(["svnserve", "--daemon", "--foreground", "--root", svn_repos_root_path, "--listen-host", "127.0.0.1", "--listen-port", str(svnserve_port)])
+
+    # Wait for it to listen
+    for _ in range(100):
+
+        try:
+
+            socket.create_connection(("127.0.0.1", svnserve_port), timeout=1).close()
+            return svnserve_process, svnserve_port
+
+        except OSError:
+
+            time.sleep(0.1)
+
+    svnserve_process.kill()
+    raise RuntimeError("svnserve didn't start listening")
+
+
+def run_conversion(svn_repo_url, scenario_name, scenario, access, work_directory_path, batch_size, log_level, results_queue):
+
+    # Runs in a new process, started with the spawn method, so each conversion starts with a fresh copy of run.py's global variables,
+    # its peak RSS and its subprocesses' peak RSS aren't mixed with other conversions, and it's the main process for run.py's metrics
+    src_serve_root_path = f"{work_directory_path}/src-serve-root-{scenario_name}-{access}"
+    shutil.rmtree(src_serve_root_path, ignore_errors=True)
+
+    os.environ["SRC_SERVE_ROOT"]                = src_serve_root_path
+    os.environ["LOG_LEVEL"]                     = log_level
+    os.environ["METRICS_PORT"]                  = str(get_free_port())
+    os.environ["CATCH_UP_TIME_BUDGET_SECONDS"]  = str(24 * 60 * 60)
+    os.environ["MAINTENANCE_QUIET_HOURS"]       = ""
+
+    sys.path.insert(0, build_directory_path)
+    import run
+
+    run.load_config_from_environment_variables()
+    run.configure_logging()
+    run.start_metrics_server()
+
+    # Time each phase from when the repo's lock moves into it, until it moves into the next phase
+    phase_starts = []
+    update_lock_phase = run.update_lock_phase
+
+    def update_lock_phase_and_record_time(lock_name, phase):
+        phase_starts.append((phase, time.perf_counter()))
+        update_lock_phase(lock_name, phase)
+
+    run.update_lock_phase = update_lock_phase_and_record_time
+
+    repo_key = f"{scenario_name}-{access}"
+    repo_config = {
+        "type"                          : "SVN",
+        "svn-repo-code-root"            : svn_repo_url,
+        "code-host-name"                : "benchmark",
+        "git-org-name"                  : "svn",
+        "fetch-batch-size"              : batch_size,
+        "git-default-branch"            : "main",
+    }
+
+    if scenario["layout"] == "standard":
+        repo_config["layout"] = "standard"
+    else:
+        repo_config.update(layouts_dict[scenario["layout"]])
+
+    # Convert the whole history, then run again with nothing new to convert, to measure each run's fixed overhead
+    start_time = time.perf_counter()
+    revision_lag = run.convert_repo_worker(repo_key, dict(repo_config), run.environment_variables_dict.copy(), set(), 1)
+    end_time = time.perf_counter()
+
+    phases_seconds = {}
+
+    for (phase, phase_start_time), (_, next_phase_start_time) in zip(phase_starts, phase_starts[1:] + [(None, end_time)]):
+        phases_seconds[phase] = round(phases_seconds.get(phase, 0) + next_phase_start_time - phase_start_time, 3)
+
+    up_to_date_start_time = time.perf_counter()
+    run.convert_repo_worker(repo_key, dict(repo_config), run.environment_variables_dict.copy(), set(), 2)
+    up_to_date_seconds = time.perf_counter() - up_to_date_start_time
+
+    def get_metric_values(metric_name):
+        return {dict(labels_key).get("command", ""): value for labels_key, value in run.metrics_dict.get(metric_name, {}).items()}
+
+    revisions_converted = sum(value for value in run.metrics_dict.get("repo_converter_revisions_fetched_total", {}).values())
+    wall_seconds        = end_time - start_time
+
+    run.stop_log_writer()
+
+    results_queue.put({
+        "scenario"                  : scenario_name,
+        "access"                    : access,
+        "parameters"                : scenario,
+        "revision_lag"              : revision_lag,
+        "revisions_converted"       : revisions_converted,
+        "wall_seconds"              : round(wall_seconds, 3),
+        "revisions_per_second"      : round(revisions_converted / wall_seconds, 3) if wall_seconds else None,
+        "up_to_date_run_seconds"    : round(up_to_date_seconds, 3),
+        "phases_seconds"            : phases_seconds,
+        "peak_rss_kb"               : {
+            "converter"             : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "largest_subprocess"    : resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        },
+        "subprocesses"              : get_metric_values("repo_converter_subprocesses_total"),
+        "subprocess_failures"       : get_metric_values("repo_converter_subprocess_failures_total"),
+    })
+
+
+def get_conversion_result(conversion_process, results_queue):
+
+    # Wait for the conversion process' result, checking that the process is still running, so the benchmark doesn't wait forever if it died,
+    # ex. if run_conversion() raised an exception, or the process was killed
+    # Returns the result dict, or None if the process exited without one
+    while True:
+
+        try:
+            return results_queue.get(timeout=1)
+        except queue.Empty:
+            pass
+
+        if not conversion_process.is_alive():
+            break
+
+    # The process may have put its result right before it exited
+    try:
+        return results_queue.get(timeout=1)
+    except queue.Empty:
+        return None
+
+
+def get_missing_commands(access_methods):
+
+    # Returns the list of commands which the benchmark needs, and which aren't on the PATH
+    required_commands = ["git", "svn", "svnadmin"]
+
+    if "svnserve" in access_methods:
+        required_commands.append("svnserve")
+
+    return [command for command in required_commands if not shutil.which(command)]
+
+
+def get_command_output(args):
+
+    try:
+        return subprocess.run(args, capture_output=True, text=True).stdout.strip()
+    except FileNotFoundError:
+        return None
+
+
+def get_metadata():
+
+    # Record what the results were measured on, to only compare results from similar machines
+    return {
+        "commit"            : get_command_output(["git", "-C", build_directory_path, "rev-parse", "HEAD"]),
+        "dirty"             : bool(get_command_output(["git", "-C", build_directory_path, "status", "--porcelain", "--untracked-files=no"])),
+        "date"              : datetime.now(timezone.utc).isoformat(),
+        "hostname"          : platform.node(),
+        "cpu_count"         : os.cpu_count(),
+        "python_version"    : platform.python_version(),
+        "git_version"       : get_command_output(["git", "--version"]),
+        "svn_version"       : get_command_output(["svn", "--version", "--quiet"]),
+    }
+
+
+def compare_results(results, baseline, threshold):
+
+    # Compare each scenario and access method's median revisions per second to the baseline
+    # Returns the list of regressions, which are slower than the baseline by more than the threshold
+    baseline_results_dict   = {(result["scenario"], result["access"]): result for result in baseline["results"]}
+    regressions             = []
+
+    print(f"Compared to baseline commit {baseline['metadata'].get('commit')}, measured on {baseline['metadata'].get('hostname')} with {baseline['metadata'].get('cpu_count')} CPUs:")
+
+    for result in results:
+
+        baseline_result = baseline_results_dict.get((result["scenario"], result["access"]))
+
+        if not baseline_result or not baseline_result.get("revisions_per_second") or not result.get("revisions_per_second"):
+            continue
+
+        ratio = result["revisions_per_second"] / baseline_result["revisions_per_second"]
+        regressed = ratio < 1 - threshold
+
+        print(f"    {result['scenario']:<20} {result['access']:<10} {baseline_result['revisions_per_second']:>10.1f} -> {result['revisions_per_second']:>10.1f} revisions per second, {ratio:.2f}x{'    REGRESSION' if regressed else ''}")
+
+        for phase, phase_seconds in result["phases_seconds"].items():
+
+            baseline_phase_seconds = baseline_result.get("phases_seconds", {}).get(phase)
+
+            if baseline_phase_seconds:
+                print(f"        {phase:<24} {baseline_phase_seconds:>8.2f} -> {phase_seconds:>8.2f} seconds")
+
+        if regressed:
+            regressions.append(result)
+
+    return regressions
+
+
+def main():
+
+    argument_parser = argparse.ArgumentParser(description="Benchmark converting synthetic svn repos with clone_svn_repo()")
+    argument_parser.add_argument("--scenarios"      , default=",".join(scenarios_dict)  , help=f"Comma-separated scenarios, from: {', '.join(scenarios_dict)}")
+    argument_parser.add_argument("--access"         , default="file,svnserve"           , help="Comma-separated access methods, from: file, svnserve")
+    argument_parser.add_argument("--scale"          , default=1.0, type=float           , help="Multiply each scenario's number of revisions")
+    argument_parser.add_argument("--repeat"         , default=1, type=int               , help="Number of times to convert each repo, the median run is reported")
+    argument_parser.add_argument("--batch-size"     , default=100, type=int             , help="fetch-batch-size for the conversions")
+    argument_parser.add_argument("--work-directory" , default=None                      , help="Directory for the svn repos and converted repos, default a new temp directory, which is deleted after")
+    argument_parser.add_argument("--output"         , default="benchmark-results.json"  , help="Path to write the results JSON file")
+    argument_parser.add_argument("--compare"        , default=None                      , help="Path to a previous results JSON file, exits 1 if any revisions per second regressed by more than --threshold")
+    argument_parser.add_argument("--threshold"      , default=0.1, type=float           , help="Fraction slower than the baseline to report as a regression")
+    argument_parser.add_argument("--log-level"      , default="WARNING"                 , help="LOG_LEVEL for the converter")
+    arguments = argument_parser.parse_args()
+
+    # Check for the svn and git commands up front, instead of failing part way through with a FileNotFoundError
+    access_methods      = arguments.access.split(",")
+    missing_commands    = get_missing_commands(access_methods)
+
+    if missing_commands:
+        print(f"Missing commands: {', '.join(missing_commands)}; run the benchmark in the repo converter's image, or install subversion, git, and git-svn", file=sys.stderr)
+        sys.exit(1)
+
+    work_directory_path = arguments.work_directory or tempfile.mkdtemp(prefix="repo-converter-benchmark-")
+    svn_repos_root_path = f"{work_directory_path}/svn-repos"
+    os.makedirs(svn_repos_root_path, exist_ok=True)
+
+    results             = []
+    failed_conversions  = []
+    svnserve_port       = None
+    svnserve_process    = None
+
+    # Spawn each conversion in a new process, instead of forking this one
+    spawn_context = multiprocessing.get_context("spawn")
+
+    try:
+
+        if "svnserve" in access_methods:
+            svnserve_process, svnserve_port = start_svnserve(svn_repos_root_path)
+
+        for scenario_name in arguments.scenarios.split(","):
+
+            scenario = dict(scenarios_dict[scenario_name])
+            scenario["revisions"] = max(3, int(scenario["revisions"] * arguments.scale))
+
+            build_start_time = time.perf_counter()
+            svn_repo_path = create_synthetic_svn_repo(svn_repos_root_path, scenario_name, scenario)
+            print(f"{scenario_name}: created svn repo with {scenario['revisions']} revisions in {time.perf_counter() - build_start_time:.1f} seconds")
+
+            for access in access_methods:
+
+                svn_repo_url = f"file://{svn_repo_path}" if access == "file" else f"svn://127.0.0.1:{svnserve_port}/{scenario_name}"
+                repeat_results = []
+
+                for _ in range(arguments.repeat):
+
+                    results_queue = spawn_context.Queue()
+                    conversion_process = spawn_context.Process(
+                        target  = run_conversion,
+                        args    = (svn_repo_url, scenario_name, scenario, access, work_directory_path, arguments.batch_size, arguments.log_level, results_queue),
+                    )
+                    conversion_process.start()
+                    repeat_result = get_conversion_result(conversion_process, results_queue)
+                    conversion_process.join()
+
+                    if repeat_result is None:
+
+                        print(f"    {access:<10} conversion failed, exit code {conversion_process.exitcode}", file=sys.stderr)
+                        failed_conversions.append(f"{scenario_name}-{access}")
+                        continue
+
+                    repeat_results.append(repeat_result)
+
+                if not repeat_results:
+                    continue
+
+                result = sorted(repeat_results, key=lambda repeat_result: repeat_result["wall_seconds"])[len(repeat_results) // 2]
+                result["repeat_wall_seconds"] = [repeat_result["wall_seconds"] for repeat_result in repeat_results]
+                results.append(result)
+
+                print(f"    {access:<10} {result['revisions_converted']} revisions in {result['wall_seconds']:.1f} seconds, {result['revisions_per_second']} revisions per second, up to date run {result['up_to_date_run_seconds']:.2f} seconds, phases: {result['phases_seconds']}")
+
+    finally:
+
+        if svnserve_process:
+            svnserve_process.kill()
+
+        if not arguments.work_directory:
+            shutil.rmtree(work_directory_path, ignore_errors=True)
+
+    metadata = get_metadata()
+
+    for result in results:
+        result["commit"] = metadata["commit"]
+
+    with open(arguments.output, "w") as output_file:
+        json.dump({"metadata": metadata, "results": results}, output_file, indent=4)
+
+    print(f"Wrote results to {arguments.output}, median wall seconds of {statistics.median(result['wall_seconds'] for result in results) if results else 0:.1f} per conversion")
+
+    regressions = []
+
+    if arguments.compare:
+
+        with open(arguments.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare_results(results, baseline, arguments.threshold)
+
+    if failed_conversions:
+        print(f"Failed conversions: {', '.join(failed_conversions)}", file=sys.stderr)
+
+    if regressions or failed_conversions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+# Microbenchmarks for the pure-Python functions in run.py which run on every repo, every ref, every svn revision, or every log line,
+# fed generated inputs at production scale, ex. a 5,000 repo repos-to-convert.yaml file, 100k packed refs, and a multi-MB svn log --xml
+# Usage: python3 benchmarks/hot_paths.py [--benchmarks sanitize_inputs,redact_password] [--scale 0.1] [--output results.json] [--compare baseline.json]
+# Run from the repo-converter directory, with the packages from build/requirements.txt installed
+# Measures the time of each benchmark over --repeat runs, then the peak memory allocated by one run, with tracemalloc,
+# and writes the results to a JSON file, with the commit they were measured on, so the results from two commits can be compared with --compare
+
+## Import libraries
+# Standard libraries
+import argparse                                             # https://docs.python.org/3/library/argparse.html
+import copy                                                 # https://docs.python.org/3/library/copy.html
+from datetime import datetime, timezone                     # https://docs.python.org/3/library/datetime.html
+import json                                                 # https://docs.python.org/3/library/json.html
+import logging                                              # https://docs.python.org/3/library/logging.html
+import os                                                   # https://docs.python.org/3/library/os.html
+import platform                                             # https://docs.python.org/3/library/platform.html
+import random                                               # https://docs.python.org/3/library/random.html
+import shutil                                               # https://docs.python.org/3/library/shutil.html
+import statistics                                           # https://docs.python.org/3/library/statistics.html
+import string                                               # https://docs.python.org/3/library/string.html
+import subprocess                                           # https://docs.python.org/3/library/subprocess.html
+import sys                                                  # https://docs.python.org/3/library/sys.html
+import tempfile                                             # https://docs.python.org/3/library/tempfile.html
+import time                                                 # https://docs.python.org/3/library/time.html
+import tracemalloc                                          # https://docs.python.org/3/library/tracemalloc.html
+
+# Third party libraries
+import yaml                                                 # https://pyyaml.org/wiki/PyYAMLDocumentation
+
+# Import run.py from the build directory, without starting its main loop
+build_directory_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build")
+sys.path.insert(0, build_directory_path)
+import run
+
+# Production scale of each generated input, multiplied by --scale, except the count of passwords
+input_sizes_dict = {
+    "repos"             : 5000,     # repos in repos-to-convert.yaml
+    "refs"              : 100000,   # refs in packed-refs
+    "svn_log_revisions" : 25000,    # logentries in svn log --xml, with their changed paths, about 10 MB
+    "log_messages"      : 5000,     # log messages per run of the log benchmarks
+    "passwords"         : 48,       # secrets in the redactor
+    "output_lines"      : 20000,    # lines of subprocess output
+    "processes"         : 1000,     # process_dicts per run of print_process_status()
+}
+
+
+def random_string(length):
+
+    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def random_hash():
+
+    return "".join(random.choices("0123456789abcdef", k=40))
+
+
+def generate_repos_to_convert_yaml(repos_count):
+
+    # Mix of the repo configs in a large deployment, most with the default layout, some with custom layouts and lists of branches
+    yaml_lines = []
+
+    for n in range(repos_count):
+
+        yaml_lines += [
+            f"project{n}:",
+            "  type: svn",
+            f"  svn-repo-code-root: https://svn{n % 20}.example.com/repos/project{n}",
+            f"  code-host-name: svn{n % 20}.example.com",
+            f"  git-org-name: org{n % 50}",
+            f"  username: user{n % 20}",
+            f"  password: {random_string(24)}",
+            f"  fetch-interval-seconds: {random.choice([300, 3600, 86400])}",
+        ]
+
+        if n % 5 == 0:
+            yaml_lines += [
+                "  layout: custom",
+                f"  trunk: project{n}/main",
+                "  branches:",
+                f"    - project{n}/feature-branches",
+                f"    - project{n}/release-branches",
+                f"  tags: project{n}/releases",
+                "  git-default-branch: main",
+            ]
+
+        else:
+            yaml_lines += [
+                "  layout: standard",
+            ]
+
+    return "\n".join(yaml_lines) + "\n"
+
+
+def generate_packed_refs(git_dir_path, refs_count):
+
+    # git svn's remote branches and tags, with some @ history refs and peeled tags, as git pack-refs writes them, sorted
+    remote_refs_dict = {"refs/remotes/git-svn": random_hash()}
+
+    for n in range(refs_count - 1):
+
+        if n % 3 == 0:
+            remote_refs_dict[f"refs/remotes/origin/branch-{n}"] = random_hash()
+        elif n % 50 == 0:
+            remote_refs_dict[f"refs/remotes/origin/tags/v{n}@{n * 7}"] = random_hash()
+        else:
+            remote_refs_dict[f"refs/remotes/origin/tags/v{n // 100}.{n % 100}.0"] = random_hash()
+
+    os.makedirs(git_dir_path, exist_ok=True)
+
+    with open(f"{git_dir_path}/packed-refs", "w") as packed_refs_file:
+
+        packed_refs_file.write("# pack-refs with: peeled fully-peeled sorted \n")
+
+        for ref in sorted(remote_refs_dict):
+
+            packed_refs_file.write(f"{remote_refs_dict[ref]} {ref}\n")
+
+            if "/tags/" in ref:
+                packed_refs_file.write(f"^{random_hash()}\n")
+
+    with open(f"{git_dir_path}/HEAD", "w") as head_file:
+        head_file.write("ref: refs/heads/main\n")
+
+    return remote_refs_dict
+
+
+def generate_svn_log_xml(svn_log_xml_path, revisions_count):
+
+    # svn log --xml --verbose output, with a few changed paths per revision, written in chunks so the generator doesn't hold it all in memory
+    with open(svn_log_xml_path, "w") as svn_log_xml_file:
+
+        svn_log_xml_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<log>\n')
+
+        for revision in range(revisions_count, 0, -1):
+
+            paths = "".join(
+                f'<path action="{random.choice("AMD")}" prop-mods="false" text-mods="true" kind="file">/trunk/src/main/java/org/example/module{random.randint(1, 99)}/Class{random.randint(1, 9999)}.java</path>\n'
+                for _ in range(random.randint(1, 4))
+            )
+
+            svn_log_xml_file.write(
+                f'<logentry revision="{revision}">\n'
+                f'<author>user{revision % 97}</author>\n'
+                f'<date>2024-01-01T00:00:{revision % 60:02d}.000000Z</date>\n'
+                f'<paths>\n{paths}</paths>\n'
+                f'</logentry>\n'
+            )
+
+        svn_log_xml_file.write("</log>\n")
+
+
+def generate_log_messages(messages_count, passwords):
+
+    # Mix of the log messages a DEBUG run writes, most without a password, some with a password in a process' cmdline
+    message_templates = [
+        "pid {pid}; started;   process_dict: {{'ppid': 1, 'name': 'git', 'cmdline': ['git', '-C', '/sourcegraph/src-serve-root/svn.example.com/org/project{n}', 'svn', 'fetch', '--revision', '{n}:{m}'], 'status': 'running', 'num_fds': 4}}; ",
+        "pid {pid}; succeeded; running for 0:00:0{n}; process_dict: {{'ppid': 1, 'name': 'svn', 'cmdline': ['svn', 'info', '--non-interactive', 'https://svn.example.com/repos/project{n}', '--username', 'user', '--password', '{password}'], 'status': 'zombie'}}; std_out: ['Path: project{n}', 'Last Changed Rev: {m}']; ",
+        "project{n}; out of date; local rev {n}, remote rev {m}, {m} revs remaining to catch up, fetching next batch of 100 revisions",
+        "project{n}; fetched 100 revisions in {n}.5 seconds, 3.412 revisions per second; next batch size 200, to take 600 seconds",
+        "\tA\tsrc/main/java/org/example/module{n}/SomeLongClassName{m}.java",
+    ]
+
+    return [
+        random.choice(message_templates).format(pid=random.randint(100, 99999), n=random.randint(1, 999), m=random.randint(1000, 99999), password=random.choice(passwords))
+        for _ in range(messages_count)
+    ]
+
+
+def generate_git_svn_fetch_output(lines_count):
+
+    # git svn fetch prints a line for each changed file, then a line for each revision it commits
+    output_lines = []
+    revision = 1
+
+    while len(output_lines) < lines_count:
+
+        output_lines += [f"\t{random.choice('AMD')}\tsrc/main/java/org/example/module{random.randint(1, 99)}/Class{random.randint(1, 9999)}.java" for _ in range(random.randint(1, 5))]
+        output_lines.append(f"r{revision} = {random_hash()} (refs/remotes/origin/trunk)")
+        revision += 1
+
+    return output_lines[:lines_count]
+
+
+def generate_process_dicts(processes_count):
+
+    # The process_dicts which subprocess_run() passes to print_process_status(), with this process' pid, so get_process_uptime() finds it
+    return [
+        {
+            "pid"               : os.getpid(),
+            "ppid"              : 1,
+            "name"              : "git",
+            "cmdline"           : ["git", "-C", f"/sourcegraph/src-serve-root/svn.example.com/org/project{n}", "svn", "fetch", "--revision", f"{n}:{n + 100}"],
+            "status"            : "zombie",
+            "num_fds"           : 4,
+            "cpu_times"         : (1.5, 0.25, 0.0, 0.0),
+            "memory_percent"    : 0.125,
+            "connections"       : [],
+            "open_files"        : [],
+        }
+        for n in range(processes_count)
+    ]
+
+
+def setup_benchmarks(work_directory_path, sizes):
+
+    # Generate each benchmark's inputs once, outside of the timed runs
+    # Returns a dict of {benchmark name: (function which runs it once, description of its input, function to run before each run, untimed, or None)}
+    benchmarks_dict = {}
+
+    passwords = [random_string(random.randint(12, 32)) for _ in range(sizes["passwords"])]
+
+    def reset_passwords():
+        run.passwords_set.clear()
+        run.passwords_redaction_pattern = None
+        run.add_passwords(passwords)
+
+    log_messages = generate_log_messages(sizes["log_messages"], passwords)
+
+    # repos-to-convert.yaml
+    repos_to_convert_file_path = f"{work_directory_path}/repos-to-convert.yaml"
+
+    with open(repos_to_convert_file_path, "w") as repos_to_convert_file:
+        repos_to_convert_file.write(generate_repos_to_convert_yaml(sizes["repos"]))
+
+    run.environment_variables_dict["REPOS_TO_CONVERT"] = repos_to_convert_file_path
+    repos_to_convert_file_dict = run.parse_repos_to_convert_file()
+
+    # A reload of the same file, with one repo's config changed
+    repos_to_convert_file_dict_changed = copy.deepcopy(repos_to_convert_file_dict)
+    repos_to_convert_file_dict_changed["project0"]["fetch-interval-seconds"] += 1
+
+    def reset_repos_dict():
+        reset_passwords()
+        run.repos_to_convert_raw_dict.clear()
+        run.repos_dict.clear()
+
+    def add_repos_passwords():
+        run.add_passwords([repo_config.get("password") for repo_config in repos_to_convert_file_dict.values()])
+
+    def load_repos_dict():
+        if not run.repos_dict:
+            run.update_repos_dict(repos_to_convert_file_dict)
+
+    def update_repos_dict_reload_one_changed():
+        run.update_repos_dict(repos_to_convert_file_dict_changed)
+        run.update_repos_dict(repos_to_convert_file_dict)
+
+    repos_file_description = f"{sizes['repos']} repos, {os.path.getsize(repos_to_convert_file_path) // 1024} KiB"
+
+    benchmarks_dict["parse_repos_to_convert_file"]      = (lambda: run.parse_repos_to_convert_file(), repos_file_description, None)
+    benchmarks_dict["sanitize_inputs"]                  = (lambda: [run.sanitize_inputs(repo_config) for repo_config in repos_to_convert_file_dict.values()], f"{repos_file_description}, passwords already added", add_repos_passwords)
+    benchmarks_dict["update_repos_dict_initial_load"]   = (lambda: run.update_repos_dict(repos_to_convert_file_dict), repos_file_description, reset_repos_dict)
+    benchmarks_dict["update_repos_dict_reload"]         = (update_repos_dict_reload_one_changed, f"{repos_file_description}, 1 changed, then changed back", load_repos_dict)
+
+    # Logging
+    log_records = [{"time": time.time(), "level": "DEBUG", "run": 1, "pid": 1, "repo": "project1", "phase": "fetch", "message": message} for message in log_messages]
+
+    def format_log_records(log_format):
+        run.environment_variables_dict["LOG_FORMAT"] = log_format
+        for log_record in log_records:
+            run.format_log_record(dict(log_record))
+
+    log_messages_description = f"{len(log_messages)} messages, {len(passwords)} passwords"
+
+    benchmarks_dict["redact_password"]                  = (lambda: [run.redact_password(message) for message in log_messages], log_messages_description, reset_passwords)
+    benchmarks_dict["format_log_record_text"]           = (lambda: format_log_records("text"), log_messages_description, reset_passwords)
+    benchmarks_dict["format_log_record_json"]           = (lambda: format_log_records("json"), log_messages_description, reset_passwords)
+
+    # Subprocess output and process status
+    output_lines    = [f"\tA\tsrc/main/java/org/example/module{n % 99}/{'VeryLongDirectoryName/' * (n % 12)}Class{n}.java" for n in range(sizes["output_lines"])]
+    process_dicts   = generate_process_dicts(sizes["processes"])
+
+    def print_process_statuses():
+        for process_dict in process_dicts:
+            run.print_process_status(dict(process_dict), "succeeded", output_lines[:20])
+
+    benchmarks_dict["truncate_subprocess_output"]       = (lambda: run.truncate_subprocess_output(list(output_lines)), f"{len(output_lines)} lines", None)
+    benchmarks_dict["print_process_status"]             = (print_process_statuses, f"{len(process_dicts)} processes", None)
+
+    # Refs
+    local_repo_path = f"{work_directory_path}/repo"
+    published_refs_snapshot_file_path = f"{local_repo_path}/.git/{run.git_config_namespace}-published-refs"
+    remote_refs_dict = generate_packed_refs(f"{local_repo_path}/.git", sizes["refs"])
+    run.write_published_refs_snapshot(published_refs_snapshot_file_path, "main", remote_refs_dict)
+
+    refs_description = f"{len(remote_refs_dict)} refs, {os.path.getsize(f'{local_repo_path}/.git/packed-refs') // 1024} KiB packed-refs"
+
+    benchmarks_dict["read_git_refs"]                    = (lambda: run.read_git_refs(local_repo_path, ("refs/remotes/",)), refs_description, None)
+    benchmarks_dict["get_published_refs"]               = (lambda: run.get_published_refs(remote_refs_dict, "main"), refs_description, None)
+    benchmarks_dict["read_published_refs_snapshot"]     = (lambda: run.read_published_refs_snapshot(published_refs_snapshot_file_path), refs_description, None)
+    benchmarks_dict["write_published_refs_snapshot"]    = (lambda: run.write_published_refs_snapshot(f"{published_refs_snapshot_file_path}-benchmark", "main", remote_refs_dict), refs_description, None)
+    benchmarks_dict["cleanup_branches_and_tags"]        = (lambda: run.cleanup_branches_and_tags("project1", local_repo_path, "main"), f"{refs_description}, no changes since the last publish", None)
+
+    # svn revision parsing
+    svn_log_xml_path = f"{work_directory_path}/svn-log.xml"
+    generate_svn_log_xml(svn_log_xml_path, sizes["svn_log_revisions"])
+
+    revision_index_file_path = f"{work_directory_path}/svn-revision-index"
+    svn_remote_repo_code_root = "https://svn.example.com/repos/project1"
+
+    with open(revision_index_file_path, "w") as revision_index_file:
+        revision_index_file.write(f"# {svn_remote_repo_code_root}\n")
+        revision_index_file.writelines(f"{revision}\n" for revision in range(1, sizes["svn_log_revisions"] * 3, 3))
+
+    revision_index = run.read_svn_revision_index(revision_index_file_path, svn_remote_repo_code_root)
+
+    def plan_all_svn_fetch_batches():
+        batch_end_revision = 0
+        while batch_end_revision is not None:
+            _, batch_end_revision, _ = run.plan_svn_fetch_batch(revision_index, batch_end_revision, 100)
+
+    svn_info_output = [
+        "Path: project1",
+        f"URL: {svn_remote_repo_code_root}",
+        "Relative URL: ^/project1",
+        "Repository Root: https://svn.example.com/repos",
+        "Repository UUID: 13f79535-47bb-0310-9956-ffa450edef68",
+        f"Revision: {sizes['svn_log_revisions']}",
+        "Node Kind: directory",
+        "Last Changed Author: user1",
+        f"Last Changed Rev: {sizes['svn_log_revisions']}",
+        "Last Changed Date: 2024-01-01 00:00:00 +0000 (Mon, 01 Jan 2024)",
+    ]
+
+    git_svn_fetch_output = generate_git_svn_fetch_output(sizes["output_lines"])
+
+    def parse_git_svn_fetch_output():
+        git_svn_fetch_progress_dict = {"revisions_fetched": 0, "last_revision_fetched": None}
+        for output_line in git_svn_fetch_output:
+            run.parse_git_svn_fetch_output_line(output_line, git_svn_fetch_progress_dict)
+
+    benchmarks_dict["iterate_svn_log_entries"]          = (lambda: sum(1 for _ in run.iterate_svn_log_entries(["cat", svn_log_xml_path])), f"{sizes['svn_log_revisions']} revisions, {os.path.getsize(svn_log_xml_path) // 1048576} MiB", None)
+    benchmarks_dict["read_svn_revision_index"]          = (lambda: run.read_svn_revision_index(revision_index_file_path, svn_remote_repo_code_root), f"{len(revision_index)} revisions", None)
+    benchmarks_dict["plan_svn_fetch_batch"]             = (plan_all_svn_fetch_batches, f"{len(revision_index)} revisions, batches of 100", None)
+    benchmarks_dict["parse_svn_info_output"]            = (lambda: [run.parse_svn_info_output(svn_info_output) for _ in range(sizes["processes"])], f"{sizes['processes']} svn info outputs", None)
+    benchmarks_dict["parse_git_svn_fetch_output_line"]  = (parse_git_svn_fetch_output, f"{len(git_svn_fetch_output)} lines", None)
+
+    return benchmarks_dict
+
+
+def run_benchmark(benchmark_function, setup_function, repeat):
+
+    # Time each run, then trace the memory allocated by one more run, separately, as tracemalloc slows down the allocations it traces
+    # Returns a dict of the results
+    run_seconds = []
+
+    for _ in range(repeat):
+
+        if setup_function:
+            setup_function()
+
+        start_time = time.perf_counter()
+        benchmark_function()
+        run_seconds.append(time.perf_counter() - start_time)
+
+    if setup_function:
+        setup_function()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    traced_memory_before, _ = tracemalloc.get_traced_memory()
+    benchmark_function()
+    traced_memory_after, traced_memory_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_seconds"    : statistics.median(run_seconds),
+        "min_seconds"       : min(run_seconds),
+        "run_seconds"       : run_seconds,
+        "peak_kib"          : (traced_memory_peak - traced_memory_before) // 1024,
+        "retained_kib"      : (traced_memory_after - traced_memory_before) // 1024,
+    }
+
+
+def get_command_output(args):
+
+    try:
+        return subprocess.run(args, capture_output=True, text=True).stdout.strip()
+    except FileNotFoundError:
+        return None
+
+
+def get_metadata(arguments):
+
+    # Record what the results were measured on, to only compare results from similar machines
+    return {
+        "commit"            : get_command_output(["git", "-C", build_directory_path, "rev-parse", "HEAD"]),
+        "dirty"             : bool(get_command_output(["git", "-C", build_directory_path, "status", "--porcelain", "--untracked-files=no"])),
+        "date"              : datetime.now(timezone.utc).isoformat(),
+        "hostname"          : platform.node(),
+        "cpu_count"         : os.cpu_count(),
+        "python_version"    : platform.python_version(),
+        "pyyaml_libyaml"    : yaml.__with_libyaml__,
+        "scale"             : arguments.scale,
+        "repeat"            : arguments.repeat,
+    }
+
+
+def compare_results(results, baseline, threshold):
+
+    # Compare each benchmark's median seconds and peak memory to the baseline
+    # Returns the list of regressions, which are slower, or allocate more, than the baseline by more than the threshold
+    baseline_results_dict   = {result["benchmark"]: result for result in baseline["results"]}
+    regressions             = []
+
+    print(f"Compared to baseline commit {baseline['metadata'].get('commit')}, measured on {baseline['metadata'].get('hostname')} at scale {baseline['metadata'].get('scale')}:")
+
+    for result in results:
+
+        baseline_result = baseline_results_dict.get(result["benchmark"])
+
+        if not baseline_result or baseline_result.get("input") != result["input"]:
+            continue
+
+        seconds_ratio   = result["median_seconds"] / max(baseline_result["median_seconds"], 1e-9)
+        memory_ratio    = result["peak_kib"] / max(baseline_result["peak_kib"], 1)
+        regressed       = seconds_ratio > 1 + threshold or (memory_ratio > 1 + threshold and result["peak_kib"] - baseline_result["peak_kib"] > 64)
+
+        print(f"    {result['benchmark']:<34} {baseline_result['median_seconds'] * 1000:>10.2f} -> {result['median_seconds'] * 1000:>10.2f} ms, {seconds_ratio:.2f}x; {baseline_result['peak_kib']:>8} -> {result['peak_kib']:>8} KiB peak{'    REGRESSION' if regressed else ''}")
+
+        if regressed:
+            regressions.append(result)
+
+    return regressions
+
+
+def main():
+
+    argument_parser = argparse.ArgumentParser(description="Microbenchmarks for the pure-Python hot paths in run.py")
+    argument_parser.add_argument("--benchmarks"     , default=None                              , help="Comma-separated benchmarks to run, default all")
+    argument_parser.add_argument("--scale"          , default=1.0, type=float                   , help="Multiply the size of each generated input, ex. 0.1 for a quick run")
+    argument_parser.add_argument("--repeat"         , default=5, type=int                       , help="Number of timed runs of each benchmark, the median run is reported")
+    argument_parser.add_argument("--seed"           , default=0, type=int                       , help="Random seed for the generated inputs, so runs on two commits get the same inputs")
+    argument_parser.add_argument("--output"         , default="hot-paths-results.json"          , help="Path to write the results JSON file")
+    argument_parser.add_argument("--compare"        , default=None                              , help="Path to a previous results JSON file, exits 1 if any benchmark regressed by more than --threshold")
+    argument_parser.add_argument("--threshold"      , default=0.2, type=float                   , help="Fraction slower, or more memory, than the baseline to report as a regression")
+    arguments = argument_parser.parse_args()
+
+    random.seed(arguments.seed)
+    sizes = {input_name: input_size if input_name == "passwords" else max(1, int(input_size * arguments.scale)) for input_name, input_size in input_sizes_dict.items()}
+
+    # Time the functions, not writing their log lines; log() still checks the level, same as in production at the default LOG_LEVEL
+    run.environment_variables_dict.update({"LOG_LEVEL": "WARNING", "LOG_FORMAT": "text"})
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.WARNING)
+
+    work_directory_path = tempfile.mkdtemp(prefix="repo-converter-hot-paths-")
+    results = []
+
+    try:
+
+        setup_start_time = time.perf_counter()
+        benchmarks_dict = setup_benchmarks(work_directory_path, sizes)
+        print(f"Generated inputs in {time.perf_counter() - setup_start_time:.1f} seconds")
+
+        benchmark_names = arguments.benchmarks.split(",") if arguments.benchmarks else list(benchmarks_dict)
+
+        for benchmark_name in benchmark_names:
+
+            benchmark_function, input_description, setup_function = benchmarks_dict[benchmark_name]
+
+            result = {"benchmark": benchmark_name, "input": input_description}
+            result.update(run_benchmark(benchmark_function, setup_function, arguments.repeat))
+            results.append(result)
+
+            print(f"    {benchmark_name:<34} {result['median_seconds'] * 1000:>10.2f} ms median, {result['min_seconds'] * 1000:>10.2f} ms min, {result['peak_kib']:>8} KiB peak, {result['retained_kib']:>6} KiB retained; {input_description}")
+
+    finally:
+        shutil.rmtree(work_directory_path, ignore_errors=True)
+
+    with open(arguments.output, "w") as output_file:
+        json.dump({"metadata": get_metadata(arguments), "results": results}, output_file, indent=4)
+
+    print(f"Wrote results to {arguments.output}")
+
+    if arguments.compare:
+
+        with open(arguments.compare, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if compare_results(results, baseline, arguments.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
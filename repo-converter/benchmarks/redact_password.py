@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Benchmark for redact_password(), which log() runs on every message
+# Usage: python3 benchmarks/redact_password.py [lines] [comma-separated counts of passwords]
+# Run from the repo-converter directory, with the packages from build/requirements.txt installed
+
+## Import libraries
+# Standard libraries
+import os                                                   # https://docs.python.org/3/library/os.html
+import random                                               # https://docs.python.org/3/library/random.html
+import string                                               # https://docs.python.org/3/library/string.html
+import sys                                                  # https://docs.python.org/3/library/sys.html
+import time                                                 # https://docs.python.org/3/library/time.html
+
+# Import run.py from the build directory, without starting its main loop
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build"))
+import run
+
+
+def generate_passwords(count):
+
+    return ["".join(random.choices(string.ascii_letters + string.digits, k=random.randint(12, 32))) for _ in range(count)]
+
+
+def generate_log_messages(count, passwords):
+
+    # Mix of the log messages a DEBUG run writes, most without a password, some with a password in a process' cmdline
+    message_templates = [
+        "pid {pid}; started;   process_dict: {{'ppid': 1, 'name': 'git', 'cmdline': ['git', '-C', '/sourcegraph/src-serve-root/svn.apache.org/asf/repo{n}', 'svn', 'fetch', '--revision', '{n}:{m}'], 'status': 'running', 'num_fds': 4}}; ",
+        "pid {pid}; succeeded; running for 0:00:0{n}; process_dict: {{'ppid': 1, 'name': 'svn', 'cmdline': ['svn', 'info', '--non-interactive', 'https://svn.apache.org/repos/asf/repo{n}', '--username', 'user', '--password', '{password}'], 'status': 'zombie'}}; std_out: ['Path: repo{n}', 'Last Changed Rev: {m}']; ",
+        "repo{n}; out of date; local rev {n}, remote rev {m}, {m} revs remaining to catch up, fetching next batch of 100 revisions",
+        "repo{n}; fetched 100 revisions in {n}.5 seconds, 3.412 revisions per second; next batch size 200, to take 600 seconds",
+        "\tA\tsrc/main/java/org/apache/project{n}/module{m}/SomeLongClassName{n}.java",
+    ]
+
+    return [
+        random.choice(message_templates).format(pid=random.randint(100, 99999), n=random.randint(1, 999), m=random.randint(1000, 99999), password=random.choice(passwords))
+        for _ in range(count)
+    ]
+
+
+def redact_password_baseline(input, passwords):
+
+    # The approach redact_password() used before, with its bugs fixed: scan for each password, then replace each password
+    if all(password not in input for password in passwords):
+        return input
+
+    for password in passwords:
+        input = input.replace(password, "REDACTED-PASSWORD")
+
+    return input
+
+
+def time_function(function, messages):
+
+    start_time = time.perf_counter()
+
+    for message in messages:
+        function(message)
+
+    return time.perf_counter() - start_time
+
+
+def main():
+
+    lines_count         = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    passwords_counts    = [int(count) for count in sys.argv[2].split(",")] if len(sys.argv) > 2 else [2, 20, 200, 1000]
+
+    for passwords_count in passwords_counts:
+
+        random.seed(0)
+        passwords   = generate_passwords(passwords_count)
+        messages    = generate_log_messages(lines_count, passwords)
+
+        # Start each count with an empty set of passwords
+        run.passwords_set.clear()
+        run.passwords_redaction_pattern = None
+        run.add_passwords(passwords)
+
+        # Check both redact the same passwords before timing them
+        for message in messages[:1000]:
+            assert run.redact_password(message) == redact_password_baseline(message, sorted(passwords, key=len, reverse=True))
+            assert not any(password in run.redact_password(message) for password in passwords)
+
+        baseline_seconds    = time_function(lambda message: redact_password_baseline(message, passwords), messages)
+        redactor_seconds    = time_function(lambda message: run.redact_password(message), messages)
+
+        print(f"{lines_count} log messages, {passwords_count} passwords, {sum(len(message) for message in messages) // lines_count} characters per message on average")
+        print(f"    baseline, per-password scan and replace:    {baseline_seconds:.3f} seconds, {lines_count / baseline_seconds:,.0f} messages per second")
+        print(f"    redact_password():                          {redactor_seconds:.3f} seconds, {lines_count / redactor_seconds:,.0f} messages per second")
+        print(f"    speedup: {baseline_seconds / redactor_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
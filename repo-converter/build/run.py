@@ -15,9 +15,6 @@
         # Branches and tags
 
     # SVN
-        # SVN commands hanging
-            # Add a timeout in run_subprocess() for hanging svn info and svn log commands, if data isn't transferring
-
         # .gitignore files
             # git svn create-ignore
             # git svn show-ignore
@@ -25,52 +22,8 @@
 
         # Test layout tags and branches as lists / arrays
 
-        # Run git svn log --xml to store the repo's log on disk, then append to it when there are new revisions, so getting counts of revisions in each repo is slow once, fast many times
-
-    # Git
-        # SSH clone
-            # Move git SSH clone from outside bash script into this script
-            # See if the GitPython module fetches the repo successfully, or has a way to clone multiple branches
-                # Fetch (just the default branch)
-                # Fetch all branches
-                # Clone all branches
-
-            # From the git remote --help
-                # Imitate git clone but track only selected branches
-                #     mkdir project.git
-                #     cd project.git
-                #     git init
-                #     git remote add -f -t master -m master origin git://example.com/git.git/
-                #     git merge origin
-
     # Other
 
-        # Read environment variables from repos-to-convert.yaml, so the values can be changed without restarting the container
-
-        # Parallelism
-            # Add a max concurrent repos environment variable
-
-        # Add a fetch-interval-seconds config to repos-to-convert.yaml file
-            # convert_svn_repos loop
-                # Try and read it
-                        # next_fetch_time = repo_key.get(next-fetch-time, None)
-                # If it's defined and in the future, skip this run
-                    # if next_fetch_time
-                        # if next_fetch_time >= time.now()
-                            # Log.debug(repo_key next fetch time is: yyyy-mm-dd HH:MM:SS, skipping)
-                            # continue
-                        # Else
-                            # Log.debug(repo_key next fetch time was: yyyy-mm-dd HH:MM:SS, fetching
-                # Doing this before forking the process reduces zombies and debug process log noise
-            # convert_svn_repo
-                # Set the next fetch time to None, so the forking loop doesn't fork again for this repo fetch interval
-                    # repo_key[next-fetch-time] = None
-                # Check if this repo has a fetch interval defined
-                    # fetch_interval_seconds = repo_key.get(fetch-interval-seconds, None)
-                    # If yes, calculate and store the next fetch time
-                    # If fetch_interval_seconds
-                        # repo_key[next-fetch-time] = fetch_interval_seconds + time.now()
-
         # Add to the process status check and cleanup function to
             # get the last lines of stdout from a running process,
             # instead of just wait with a timeout of 0.1,
@@ -96,18 +49,38 @@
 
 ## Import libraries
 # Standard libraries
+import atexit                                               # https://docs.python.org/3/library/atexit.html
+import bisect                                               # https://docs.python.org/3/library/bisect.html
+import collections                                          # https://docs.python.org/3/library/collections.html
+import concurrent.futures                                   # https://docs.python.org/3/library/concurrent.futures.html
+import configparser                                         # https://docs.python.org/3/library/configparser.html
+import contextlib                                           # https://docs.python.org/3/library/contextlib.html
+import cProfile                                             # https://docs.python.org/3/library/profile.html
 from datetime import datetime, timedelta                    # https://docs.python.org/3/library/datetime.html
+import fcntl                                                # https://docs.python.org/3/library/fcntl.html
+import heapq                                                # https://docs.python.org/3/library/heapq.html
+import http.server                                          # https://docs.python.org/3/library/http.server.html
+import io                                                   # https://docs.python.org/3/library/io.html
+import itertools                                            # https://docs.python.org/3/library/itertools.html
+import json                                                 # https://docs.python.org/3/library/json.html
 import logging                                              # https://docs.python.org/3/library/logging.html
 import multiprocessing                                      # https://docs.python.org/3/library/multiprocessing.html
 import os                                                   # https://docs.python.org/3/library/os.html
+import pstats                                               # https://docs.python.org/3/library/profile.html#pstats.Stats
+import queue                                                # https://docs.python.org/3/library/queue.html
 import random                                               # https://docs.python.org/3/library/random.html
+import re                                                   # https://docs.python.org/3/library/re.html
 import shutil                                               # https://docs.python.org/3/library/shutil.html
 import signal                                               # https://docs.python.org/3/library/signal.html
 import subprocess                                           # https://docs.python.org/3/library/subprocess.html
 import sys                                                  # https://docs.python.org/3/library/sys.html
+import tempfile                                             # https://docs.python.org/3/library/tempfile.html
 import textwrap                                             # https://docs.python.org/3/library/textwrap.html
+import threading                                            # https://docs.python.org/3/library/threading.html
 import time                                                 # https://docs.python.org/3/library/time.html
 import traceback                                            # https://docs.python.org/3/library/traceback.html
+import urllib.parse                                         # https://docs.python.org/3/library/urllib.parse.html
+import xml.etree.ElementTree as ElementTree                 # https://docs.python.org/3/library/xml.etree.elementtree.html
 # Third party libraries
 import git                                                  # https://gitpython.readthedocs.io/en/stable/tutorial.html
 import psutil                                               # https://pypi.org/project/psutil/
@@ -115,12 +88,131 @@ import yaml                                                 # https://pyyaml.org
 
 
 # Global variables
+child_process_exited_event = threading.Event()
+code_hosts_dict = {}
+# Settings which can be set for each code host in the code-hosts section of the REPOS_TO_CONVERT file, to limit the load on the code host,
+# and the environment variables they default to
+code_hosts_limits_options_dict = {
+    "circuit-breaker-failures"              : "CODE_HOST_CIRCUIT_BREAKER_FAILURES",
+    "circuit-breaker-max-backoff-seconds"   : "CODE_HOST_CIRCUIT_BREAKER_MAX_BACKOFF_SECONDS",
+    "max-concurrent-repos"                  : "CODE_HOST_MAX_CONCURRENT_REPOS",
+    "requests-per-minute"                   : "CODE_HOST_REQUESTS_PER_MINUTE",
+}
+code_hosts_waiting_repos_dict = {}
 environment_variables_dict = {}
+environment_variables_from_container_dict = {}
+# Environment variables which are only used when the container starts, so they can't be changed in the REPOS_TO_CONVERT file
+environment_variables_restart_required = [
+    "BUILD_BRANCH",
+    "BUILD_COMMIT",
+    "BUILD_DATE",
+    "BUILD_DIRTY",
+    "BUILD_TAG",
+    "MAX_CONCURRENT_REPOS",
+    "METRICS_PORT",
+    "REPO_CONVERTER_STATE_DIR",
+    "REPOS_TO_CONVERT",
+    "SRC_SERVE_ROOT",
+]
+git_config_cache_dict = {}
 git_config_namespace = "repo-converter"
+git_lock_files = [
+    ("Git garbage collection"       , ".git/gc.pid"                                     ), # fatal: gc is already running on machine '75c377aedbaf' pid 3700 (use --force if not)
+    ("svn config"                   , ".git/svn/.metadata.lock"                         ), # error: could not lock config file .git/svn/.metadata: File exists config svn-remote.svn.branches-maxRev 125551: command returned error: 255
+    ("git svn fetch git-svn"        , ".git/svn/refs/remotes/git-svn/index.lock"        ), # fatal: Unable to create '/sourcegraph/src-serve-root/svn.apache.org/asf/xmlbeans/.git/svn/refs/remotes/git-svn/index.lock': File exists.
+    ("git svn fetch origin trunk"   , ".git/svn/refs/remotes/origin/trunk/index.lock"   ), # fatal: Unable to create '/sourcegraph/src-serve-root/svn.apache.org/asf/xmlbeans/.git/svn/refs/remotes/origin/trunk/index.lock': File exists
+    ("git index"                    , ".git/index.lock"                                 ),
+    ("git config"                   , ".git/config.lock"                                ),
+    ("git HEAD"                     , ".git/HEAD.lock"                                  ),
+    ("git packed refs"              , ".git/packed-refs.lock"                           ),
+]
+# The refs which a short ref name in a refspec can match, in order of precedence, same as git's ref_rev_parse_rules
+git_short_ref_name_rules = [
+    "{}",
+    "refs/{}",
+    "refs/tags/{}",
+    "refs/heads/{}",
+    "refs/remotes/{}",
+    "refs/remotes/{}/HEAD",
+]
+locks_held_dict = {}
+log_context_dict = {}
+log_queue = None
+log_records_dropped = 0
+log_writer_thread = None
+main_process_pid = os.getpid()
+main_process_profiler = None
+metrics_dict = {}
+metrics_lock = threading.Lock()
+metrics_queue = None
+# Name: (type, help), in the Prometheus text exposition format
+metrics_definitions_dict = {
+    "repo_converter_repo_local_revision"                : ("gauge"      , "Last svn revision converted into the repo's git clone"),
+    "repo_converter_repo_remote_revision"               : ("gauge"      , "Last Changed Rev of the repo on the svn server"),
+    "repo_converter_repo_revision_lag"                  : ("gauge"      , "Number of svn revisions which changed the repo, which haven't been converted yet"),
+    "repo_converter_revisions_fetched_total"            : ("counter"    , "Number of svn revisions converted by successful git svn fetch batches"),
+    "repo_converter_fetch_duration_seconds"             : ("histogram"  , "Duration of each git svn fetch batch"),
+    "repo_converter_maintenance_duration_seconds"       : ("histogram"  , "Duration of git maintenance after fetching"),
+    "repo_converter_publish_refs_duration_seconds"      : ("histogram"  , "Duration of publishing the converted branches and tags"),
+    "repo_converter_svn_mirror_sync_duration_seconds"   : ("histogram"  , "Duration of syncing the local svn mirror from the svn server"),
+    "repo_converter_subprocesses_total"                 : ("counter"    , "Number of subprocesses run, by command"),
+    "repo_converter_subprocess_failures_total"          : ("counter"    , "Number of subprocesses which failed, or were killed, by command"),
+    "repo_converter_retries_total"                      : ("counter"    , "Number of retries, by reason"),
+    "repo_converter_lock_skips_total"                   : ("counter"    , "Number of times a repo was skipped because another process held its lock"),
+    "repo_converter_bulk_up_to_date_skips_total"        : ("counter"    , "Number of times the bulk svn info check found a repo up to date, so it wasn't queued"),
+    "repo_converter_code_host_skips_total"              : ("counter"    , "Number of times a repo was skipped, by code host and reason: circuit open, circuit probing, circuit half open, or rate limit"),
+    "repo_converter_code_host_circuit_open"             : ("gauge"      , "1 if the code host's circuit breaker is open, after failing to connect to it, 0 if it's closed"),
+    "repo_converter_code_host_rate_limit_wait_seconds"  : ("histogram"  , "Duration of each wait for the code host's request rate limit"),
+}
+metrics_histogram_buckets = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+passwords_redaction_pattern = None
+passwords_redaction_prefilter = None
 passwords_set = set()
+repo_conversion_pool = None
+repo_conversion_tasks_dict = {}
+repo_schedule_heap = []
+repo_schedule_lock = threading.Lock()
+repo_schedule_wake_event = threading.Event()
+repos_bulk_checked_list = []
+repos_bulk_checking_set = set()
 repos_dict = {}
+repos_next_fetch_time_dict = {}
+repos_revision_lag_dict = {}
+repos_to_convert_file_signature = None
+repos_to_convert_raw_dict = {}
 script_name = os.path.basename(__file__)
+subprocess_output_tail_lines = 100
+# The pids of the subprocesses which subprocess_run() and iterate_subprocess_output() started, and wait on themselves,
+# so reap_child_processes() doesn't wait on them first, and take their return status
+subprocess_pids_lock = threading.Lock()
+subprocess_pids_set = set()
 script_run_number = 0
+svn_bulk_check_executor = None
+# svn's transport errors, for failing to reach the svn server, which count towards the code host's circuit breaker
+# Not E170013 "Unable to connect to a repository at", as svn also prints it for a repo's wrong credentials, or a missing repo,
+# which are the repo's problem, not the code host's; the codes are for svn, the messages for git svn, which prints them without codes
+svn_connection_failure_messages = (
+    "E000101", "Network is unreachable",
+    "E000104", "Connection reset by peer",
+    "E000110", "E175012", "Connection timed out",
+    "E000111", "Connection refused",
+    "E000113", "No route to host",
+    "E120108", "The server unexpectedly closed the connection",
+    "E210002", "Network connection closed unexpectedly",
+    "E670002", "E670008", "Name or service not known", "Temporary failure in name resolution",
+)
+# Subversion client options which can be set for each code host in the code-hosts section of the REPOS_TO_CONVERT file,
+# with int for a number, or a tuple of the allowed values; they go in the [global] section of the code host's Subversion servers file
+# https://svnbook.red-bean.com/en/1.7/svn.advanced.confarea.html#svn.advanced.confarea.opts.servers
+svn_servers_options_dict = {
+    "http-bulk-updates"     : ("auto", "no", "prefer", "yes"),
+    "http-chunked-requests" : ("no", "yes"),
+    "http-compression"      : ("auto", "no", "yes"),
+    "http-max-connections"  : int,
+    "http-timeout"          : int,
+}
+trace_events_list = []
+trace_phases_dict = {}
 
 
 def register_signal_handler():
@@ -129,6 +221,9 @@ def register_signal_handler():
 
         signal.signal(signal.SIGINT, signal_handler)
 
+        # Get notified when a child process exits, so it can be reaped right away, instead of scanning the process table on each run
+        signal.signal(signal.SIGCHLD, signal_handler)
+
     except Exception as exception:
 
         log(f"Registering signal handler failed with exception: {type(exception)}, {exception.args}, {exception}","error")
@@ -136,6 +231,13 @@ def register_signal_handler():
 
 def signal_handler(incoming_signal, frame):
 
+    # This fires for every child process which exits, so just flag it for reap_child_processes(), and wake up the main loop to run it
+    if incoming_signal == signal.SIGCHLD:
+
+        child_process_exited_event.set()
+        repo_schedule_wake_event.set()
+        return
+
     log(f"Received signal: {incoming_signal} frame: {frame}","debug")
 
     signal_name = signal.Signals(incoming_signal).name
@@ -150,11 +252,56 @@ def load_config_from_environment_variables():
 
     # DEBUG INFO WARNING ERROR CRITICAL
     environment_variables_dict["LOG_LEVEL"]                         = str(os.environ.get("LOG_LEVEL"                        , "INFO" ))
+    # Port for the Prometheus metrics HTTP endpoint, at /metrics; 0 to disable
+    environment_variables_dict["METRICS_PORT"]                      = int(os.environ.get("METRICS_PORT"                     , 9434 ))
+    # text or json; json writes one object per line, with the repo key, phase, and pid as fields
+    environment_variables_dict["LOG_FORMAT"]                        = str(os.environ.get("LOG_FORMAT"                       , "text" )).lower()
+    # Number of worker processes in the pool, which caps how many repos get converted at the same time
+    environment_variables_dict["MAX_CONCURRENT_REPOS"]              = int(os.environ.get("MAX_CONCURRENT_REPOS"             , 10 ))
+    # Thresholds for run_git_maintenance() to decide which git maintenance tasks to run after each fetch
+    environment_variables_dict["MAINTENANCE_LOOSE_OBJECTS_LIMIT"]   = int(os.environ.get("MAINTENANCE_LOOSE_OBJECTS_LIMIT"  , 6700 ))
+    environment_variables_dict["MAINTENANCE_PACK_LIMIT"]            = int(os.environ.get("MAINTENANCE_PACK_LIMIT"           , 50 ))
+    environment_variables_dict["MAINTENANCE_FULL_REPACK_DAYS"]      = int(os.environ.get("MAINTENANCE_FULL_REPACK_DAYS"     , 7 ))
+    # Hours of the day in the container's time zone when full repacks can run, ex. 1-5; empty for any time
+    environment_variables_dict["MAINTENANCE_QUIET_HOURS"]           = str(os.environ.get("MAINTENANCE_QUIET_HOURS"          , "" ))
+    # Seconds a command can run without making progress (output, network or disk reads, or CPU time) before it's killed and retried; 0 to disable
+    environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"]    = int(os.environ.get("STALL_TIMEOUT_SECONDS_SVN_INFO"   , 300 ))
+    environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_LOG"]     = int(os.environ.get("STALL_TIMEOUT_SECONDS_SVN_LOG"    , 900 ))
+    environment_variables_dict["STALL_TIMEOUT_SECONDS_FETCH"]       = int(os.environ.get("STALL_TIMEOUT_SECONDS_FETCH"      , 1800 ))
+    environment_variables_dict["STALL_TIMEOUT_SECONDS_MAINTENANCE"] = int(os.environ.get("STALL_TIMEOUT_SECONDS_MAINTENANCE", 3600 ))
+    environment_variables_dict["STALL_RETRIES"]                     = int(os.environ.get("STALL_RETRIES"                    , 1 ))
+    # Seconds each repo can keep fetching batches for in each run, until it's caught up; 0 fetches one batch per run
+    environment_variables_dict["CATCH_UP_TIME_BUDGET_SECONDS"]      = int(os.environ.get("CATCH_UP_TIME_BUDGET_SECONDS"     , 0 ))
     environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"]   = int(os.environ.get("REPO_CONVERTER_INTERVAL_SECONDS"  , 3600 ))
+    # 1 to check the due svn repos' last changed revisions with a few svn info commands per svn server, in the main process, and only queue the repos which changed; 0 to disable
+    environment_variables_dict["SVN_BULK_UP_TO_DATE_CHECK"]         = int(os.environ.get("SVN_BULK_UP_TO_DATE_CHECK"        , 1 ))
+    # Defaults for the code hosts' limits, which can be set for each code host in the code-hosts section of the REPOS_TO_CONVERT file
+    # Maximum number of repos from each code host queued or running at the same time; 0 for no limit other than MAX_CONCURRENT_REPOS
+    environment_variables_dict["CODE_HOST_MAX_CONCURRENT_REPOS"]    = int(os.environ.get("CODE_HOST_MAX_CONCURRENT_REPOS"   , 0 ))
+    # Maximum number of svn commands started against each code host per minute, from all workers; 0 for no limit
+    environment_variables_dict["CODE_HOST_REQUESTS_PER_MINUTE"]     = int(os.environ.get("CODE_HOST_REQUESTS_PER_MINUTE"    , 0 ))
+    # Number of consecutive failures to connect to a code host before its repos are skipped, until one probe connects again; 0 to disable
+    environment_variables_dict["CODE_HOST_CIRCUIT_BREAKER_FAILURES"] = int(os.environ.get("CODE_HOST_CIRCUIT_BREAKER_FAILURES", 3 ))
+    # Maximum number of seconds between probes of a code host which is failing, the backoff starts at one minute, and doubles after each failed probe
+    environment_variables_dict["CODE_HOST_CIRCUIT_BREAKER_MAX_BACKOFF_SECONDS"] = int(os.environ.get("CODE_HOST_CIRCUIT_BREAKER_MAX_BACKOFF_SECONDS", 3600 ))
+    # Seconds between checks for changes to the REPOS_TO_CONVERT file, between runs; 0 to only check at the start of each run
+    environment_variables_dict["REPOS_TO_CONVERT_CHECK_SECONDS"]    = int(os.environ.get("REPOS_TO_CONVERT_CHECK_SECONDS"   , 10 ))
+    # Maximum random delay before each repo's first fetch after the container starts, so a restart doesn't hit every repo at once
+    environment_variables_dict["REPO_CONVERTER_JITTER_SECONDS"]     = int(os.environ.get("REPO_CONVERTER_JITTER_SECONDS"    , 60 ))
     # Path inside the container to find this file, only change to match if the right side of the volume mapping changes
     environment_variables_dict["REPOS_TO_CONVERT"]                  = str(os.environ.get("REPOS_TO_CONVERT"                 , "/sourcegraph/repos-to-convert.yaml" ))
     # Path inside the container to find this directory, only change to match if the right side of the volume mapping changes
     environment_variables_dict["SRC_SERVE_ROOT"]                    = str(os.environ.get("SRC_SERVE_ROOT"                   , "/sourcegraph/src-serve-root" ))
+    # Path inside the container to store the repo converter's own state, ex. lock files; defaults to a hidden directory in SRC_SERVE_ROOT, so it's on the same persistent volume
+    environment_variables_dict["REPO_CONVERTER_STATE_DIR"]          = str(os.environ.get("REPO_CONVERTER_STATE_DIR"         , f"{environment_variables_dict['SRC_SERVE_ROOT']}/.repo-converter" ))
+    # Path inside the container to store the local svnsync mirrors of svn repositories, for repos with svn-mirror: true
+    environment_variables_dict["SVN_MIRROR_DIR"]                    = str(os.environ.get("SVN_MIRROR_DIR"                   , f"{environment_variables_dict['REPO_CONVERTER_STATE_DIR']}/svn-mirrors" ))
+    # Path inside the container to write a Chrome trace JSON file of timing spans for each repo conversion and each run; empty to disable
+    environment_variables_dict["TRACE_DIR"]                         = str(os.environ.get("TRACE_DIR"                        , "" ))
+    # Number of the newest trace files to keep in TRACE_DIR, the older ones are deleted after each run
+    environment_variables_dict["TRACE_MAX_FILES"]                   = int(os.environ.get("TRACE_MAX_FILES"                  , 1000 ))
+    # 1 to also profile the main process with cProfile during each run, and write the stats to TRACE_DIR
+    environment_variables_dict["TRACE_PROFILE"]                     = int(os.environ.get("TRACE_PROFILE"                    , 0 ))
 
     # Image build info
     environment_variables_dict["BUILD_BRANCH"]                      = str(os.environ.get("BUILD_BRANCH"                     , "" ))
@@ -163,477 +310,1940 @@ def load_config_from_environment_variables():
     environment_variables_dict["BUILD_DIRTY"]                       = str(os.environ.get("BUILD_DIRTY"                      , "" ))
     environment_variables_dict["BUILD_TAG"]                         = str(os.environ.get("BUILD_TAG"                        , "" ))
 
+    # Keep the container's values, so a variable removed from the repos-to-convert.yaml file reverts to them
+    environment_variables_from_container_dict.clear()
+    environment_variables_from_container_dict.update(environment_variables_dict)
+
 
 def load_config_from_repos_to_convert_file():
-    # Try and load the environment variables from the REPOS_TO_CONVERT file
 
+    # Reload the REPOS_TO_CONVERT file only if it's changed since it was last loaded, then only validate and reschedule the repos whose config changed
+    # Returns True if the file was reloaded
+    global repos_to_convert_file_signature
 
-    # Check if the default config file exists
-    # If yes, read configs from it
-    # If no, use the environment variables
-    pass
+    repos_to_convert_file_signature_new = get_repos_to_convert_file_signature()
 
+    if repos_to_convert_file_signature_new == repos_to_convert_file_signature:
+        return False
 
-def configure_logging():
+    # On startup, parse_repos_to_convert_file() exits if the file is missing or invalid
+    # After startup, keep converting with the last config which loaded, until the file is fixed
+    repos_to_convert_file_dict = parse_repos_to_convert_file(exit_on_error = repos_to_convert_file_signature is None)
+    repos_to_convert_file_signature = repos_to_convert_file_signature_new
 
-    logging.basicConfig(
-        stream      = sys.stdout,
-        datefmt     = "%Y-%m-%d %H:%M:%S",
-        encoding    = "utf-8",
-        format      = f"%(message)s",
-        level       = environment_variables_dict["LOG_LEVEL"]
+    if repos_to_convert_file_dict is None:
+        return False
+
+    # The environment-variables key is reserved for settings which can be changed without restarting the container
+    load_config_from_repos_to_convert_file_environment_variables(repos_to_convert_file_dict.pop("environment-variables", None) or {})
+
+    # The code-hosts key is reserved for settings for all of the repos on each code host
+    load_config_from_repos_to_convert_file_code_hosts(repos_to_convert_file_dict.pop("code-hosts", None) or {})
+
+    update_repos_dict(repos_to_convert_file_dict)
+
+    return True
+
+
+def get_repos_to_convert_file_signature():
+
+    # Identify the version of the file by the inode, modification time, and size of the file that the path resolves to
+    # Kubernetes updates a mounted Secret or ConfigMap by writing a new directory, then swapping the ..data symlink to it,
+    # which doesn't change the path, but os.stat() follows the symlinks to the new file, with a new inode
+    # Returns an empty tuple if the file doesn't exist
+    try:
+
+        repos_to_convert_file_stat = os.stat(environment_variables_dict["REPOS_TO_CONVERT"])
+
+    except FileNotFoundError:
+
+        return ()
+
+    return (
+        os.path.realpath(environment_variables_dict["REPOS_TO_CONVERT"]),
+        repos_to_convert_file_stat.st_dev,
+        repos_to_convert_file_stat.st_ino,
+        repos_to_convert_file_stat.st_mtime_ns,
+        repos_to_convert_file_stat.st_size,
     )
 
 
-def log(message, level_name:str = "DEBUG"):
+def load_config_from_repos_to_convert_file_environment_variables(environment_variables_from_file):
 
-    level_name = str(level_name).upper()
+    # Override the container's environment variables with the ones in the environment-variables section of the REPOS_TO_CONVERT file
+    # Start from the container's values each time, so removing a variable from the file reverts it
+    if not isinstance(environment_variables_from_file, dict):
 
-    if level_name in ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]:
-        level_int = logging.getLevelName(level_name)
-    else:
-        level_name = "DEBUG"
-        level_int = logging.DEBUG
+        log(f"environment-variables in {environment_variables_dict['REPOS_TO_CONVERT']} should be a dict of variable names and values, ignoring it", "warning")
+        environment_variables_from_file = {}
 
-    date_string = datetime.now().date().isoformat()
-    time_string = datetime.now().time().isoformat()
-    run_string  = f"run {str(script_run_number)}"
-    message     = redact_password(message)
-    log_message = f"{date_string}; {time_string}; {run_string}; {level_name}; {str(message)}"
+    environment_variables_changed = []
 
-    logging.log(level_int, log_message)
+    for variable_name in environment_variables_from_file.keys():
+        if variable_name not in environment_variables_from_container_dict:
+            log(f"environment-variables in {environment_variables_dict['REPOS_TO_CONVERT']} has unknown variable {variable_name}, ignoring it", "warning")
 
+    for variable_name, container_value in environment_variables_from_container_dict.items():
 
-def redact_password(input):
+        variable_value = container_value
 
-    # Handle different types
-    # Return the same type this function was given
-    # If input is a dict or list, uses recursion to depth-first-search through the values, with arbitrary depths, keys, and value types
+        if variable_name in environment_variables_from_file:
 
-    # If the message is None, or the passwords_set is empty, or none of the passwords in the passwords set are in the input, then just return the input as is
-    if (
-        isinstance(input, type(None)) or
-        isinstance(input, type(bool)) or
-        len(passwords_set) == 0 or
-        all(password not in input for password in passwords_set)
-    ):
+            if variable_name in environment_variables_restart_required:
 
-        return input
+                log(f"{variable_name} can only be changed by restarting the container, ignoring it in environment-variables in {environment_variables_dict['REPOS_TO_CONVERT']}", "warning")
 
-    # If it's type string, just use string's built-in .replace()
-    elif isinstance(input, str):
+            else:
 
-        for password in passwords_set:
-            if password in input:
-                input_without_password = input.replace(password, "REDACTED-PASSWORD")
+                # Cast the value to the container value's type
+                try:
 
-    # If it's type int, cast it to a string, then recurse this function again to use string's built-in .replace()
-    elif isinstance(input, int):
+                    variable_value = type(container_value)(environment_variables_from_file[variable_name])
 
-        # Can't add the redacted message to an int
-        input_without_password_string = str(input).replace(password, "")
+                except (TypeError, ValueError):
 
-        # Cast back to an int to return the same type
-        input_without_password = int(input_without_password_string)
+                    log(f"environment-variables in {environment_variables_dict['REPOS_TO_CONVERT']} has invalid value for {variable_name}: {environment_variables_from_file[variable_name]}, should be {type(container_value)}, ignoring it", "warning")
 
-    # AttributeError: 'list' object has no attribute 'replace'
-    # Need to iterate through the items in the list
-    elif isinstance(input, list):
+                if variable_name == "LOG_FORMAT":
+                    variable_value = variable_value.lower()
 
-        input_without_password = []
-        for item in input:
+                if variable_name == "LOG_LEVEL":
 
-            # Send the list item back through this function to hit any of the non-list types
-            input_without_password.append(redact_password(item))
+                    variable_value = variable_value.upper()
 
-    # If it's a dict, recurse through the dict, until it gets down to primitive types
-    elif isinstance(input, dict):
+                    if variable_value not in ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]:
 
-        input_without_password = {}
+                        log(f"environment-variables in {environment_variables_dict['REPOS_TO_CONVERT']} has invalid value for LOG_LEVEL: {variable_value}, ignoring it", "warning")
+                        variable_value = container_value
 
-        for key in input.keys():
+        if environment_variables_dict.get(variable_name) != variable_value:
 
-            # Check if the password is in the key, and convert it to a string
-            key_string = redact_password(str(key))
+            environment_variables_dict[variable_name] = variable_value
+            environment_variables_changed.append(f"{variable_name}={variable_value}")
 
-            # Send the value back through this function to hit any of the non-list types
-            input_without_password[key_string] = redact_password(input[key])
+    if not environment_variables_changed:
+        return
 
-    else:
+    # The workers get a copy of environment_variables_dict with each repo they're sent, so only this process' log level needs to change here
+    logging.getLogger().setLevel(environment_variables_dict["LOG_LEVEL"])
 
-        log(f"redact_password() doesn't handle input of type {type(input)}","error")
+    log(f"Reloaded environment variables from {environment_variables_dict['REPOS_TO_CONVERT']}: {', '.join(environment_variables_changed)}", "info")
 
-        # Set it to None to just break the code instead of leak the password
-        input_without_password = None
 
-    return input_without_password
+def load_config_from_repos_to_convert_file_code_hosts(code_hosts_from_file):
 
+    # Validate the Subversion client options and limits for each code host in the code-hosts section of the REPOS_TO_CONVERT file,
+    # then write each code host's Subversion config dir, which the workers pass to svn and git svn for the code host's repos
+    # The main process sends each worker a copy of its repo's code host's settings, with the repo
+    if not isinstance(code_hosts_from_file, dict):
 
-def get_process_uptime(pid:int = 1):
+        log(f"code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']} should be a dict of code-host-names and their settings, ignoring it", "warning")
+        code_hosts_from_file = {}
 
-    formatted_timedelta = None
+    code_hosts_new_dict = {}
 
-    try:
+    for code_host_name, code_host_options in code_hosts_from_file.items():
 
-        pid_int                 = int(pid)
-        pid_create_time         = psutil.Process(pid_int).create_time()
-        pid_start_datetime      = datetime.fromtimestamp(pid_create_time)
-        pid_uptime_timedelta    = datetime.now() - pid_start_datetime
-        pid_uptime_seconds      = pid_uptime_timedelta.total_seconds()
-        formatted_timedelta     = timedelta(seconds=pid_uptime_seconds)
+        code_host_name = str(code_host_name)
 
-    except psutil.NoSuchProcess:
-        pass
+        if not isinstance(code_host_options, dict):
 
-    return formatted_timedelta
+            log(f"code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']} should have a dict of settings for {code_host_name}, ignoring it", "warning")
+            continue
 
+        code_host_config = {}
 
-def status_update_and_cleanup_zombie_processes():
+        for option_name, option_value in code_host_options.items():
 
-    # The current approach should return the same list of processes as just ps -ef when a Docker container runs this script as the CMD (pid 1)
+            option_values_allowed = int if option_name in code_hosts_limits_options_dict else svn_servers_options_dict.get(option_name)
 
-    # Get the current process ID, should be 1 in Docker
-    os_this_pid = os.getpid()
+            if option_values_allowed is None:
 
-    # Using a set for built-in deduplication
-    process_pids_to_wait_for = set()
+                log(f"code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']} has unknown setting {option_name} for {code_host_name}, ignoring it, should be one of {sorted(list(svn_servers_options_dict.keys()) + list(code_hosts_limits_options_dict.keys()))}", "warning")
+                continue
 
-    # Get a oneshot snapshot of all processes running this instant
-    # Loop through for each processes
-    for process in psutil.process_iter():
+            # YAML parses yes / no as booleans
+            if isinstance(option_value, bool):
+                option_value = "yes" if option_value else "no"
 
-        # The process may finish in the time between .process_iter() and .parents()
-        try:
+            if option_values_allowed is int:
 
-            # Get all upstream parent PIDs of the process
-            # Caught a process doesn't exist exception here, could see if it could be handled
-            process_parents_pids = [process_parent.pid for process_parent in process.parents()]
+                # The limits can be 0 to turn them off for the code host
+                option_value_min = 0 if option_name in code_hosts_limits_options_dict else 1
 
-            # If this pid is in the parents, then we know its a child / grandchild / great-grandchild / etc. process of this process
-            if os_this_pid in process_parents_pids:
+                try:
+                    option_value = int(option_value)
+                except (TypeError, ValueError):
+                    option_value = -1
 
-                # Add the process' own PID to the set
-                process_pids_to_wait_for.add(process.pid)
+                if option_value < option_value_min:
 
-                # Loop through the process' parents and add them to the set too
-                for process_parents_pid in process_parents_pids:
+                    log(f"code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']} has invalid value for {option_name} for {code_host_name}: {code_host_options[option_name]}, should be a number of at least {option_value_min}, ignoring it", "warning")
+                    continue
 
-                    process_pids_to_wait_for.add(process_parents_pid)
+            else:
 
-        except psutil.NoSuchProcess as exception:
+                option_value = str(option_value).lower()
 
-            log(f"Caught an exception when listing parents of processes: {exception}", "debug")
+                if option_value not in option_values_allowed:
 
-    # Remove this script's PID so it's not waiting on itself
-    process_pids_to_wait_for.discard(os_this_pid)
+                    log(f"code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']} has invalid value for {option_name} for {code_host_name}: {code_host_options[option_name]}, should be one of {list(option_values_allowed)}, ignoring it", "warning")
+                    continue
 
-    # Now that we have a set of all child / grandchild / etc PIDs without our own
-    # Loop through them and wait for each one
-    # If the process is a zombie, then waiting for it:
-        # Gets the return value
-        # Removes the process from the OS' process table
-        # Raises an exception
-    for process_pid_to_wait_for in process_pids_to_wait_for:
+            code_host_config[option_name] = option_value
 
-        process_dict        = {}
-        process_to_wait_for = None
-        status_message      = ""
+        code_hosts_new_dict[code_host_name] = code_host_config
 
-        try:
+    # Write the config dirs of new and changed code hosts, and any which are missing from disk
+    for code_host_name, code_host_config in code_hosts_new_dict.items():
 
-            # Create an instance of a Process object for the PID number
-            # Raises psutil.NoSuchProcess if the PID has already finished
-            process_to_wait_for = psutil.Process(process_pid_to_wait_for)
+        svn_servers_options = {option_name: option_value for option_name, option_value in code_host_config.items() if option_name in svn_servers_options_dict}
 
-            # Get the process attributes from the OS
-            process_dict = process_to_wait_for.as_dict()
+        if code_hosts_dict.get(code_host_name) != code_host_config or not get_svn_config_dir(code_host_name):
 
-            # This rarely fires, ex. if cleaning up processes at the beginning of a script execution and the process finished during the interval
-            if process_to_wait_for.status() == psutil.STATUS_ZOMBIE:
-                status_message = "is a zombie"
+            write_svn_config_dir(code_host_name, svn_servers_options)
+            log(f"Loaded settings for code host {code_host_name} from {environment_variables_dict['REPOS_TO_CONVERT']}: {code_host_config}", "info")
 
-            # Wait a short period, and capture the return status
-            # Raises psutil.TimeoutExpired if the process is busy executing longer than the wait time
-            return_status = process_to_wait_for.wait(0.1)
-            status_message = f"finished with return status: {str(return_status)}"
+    # Remove the config dirs of code hosts which were removed from the file, including before the container restarted,
+    # so their repos go back to using the default Subversion config
+    svn_config_dirs_path        = get_svn_config_dir_path()
+    svn_config_dirs_to_keep     = [os.path.basename(get_svn_config_dir_path(code_host_name)) for code_host_name in code_hosts_new_dict]
 
-        except psutil.NoSuchProcess as exception:
-            status_message = "finished on wait"
+    if os.path.isdir(svn_config_dirs_path):
 
-        except psutil.TimeoutExpired as exception:
-            status_message = "still running"
+        for svn_config_dir_name in os.listdir(svn_config_dirs_path):
 
-        except Exception as exception:
-            status_message = f"raised an exception while waiting: {type(exception)}, {exception.args}, {exception}"
+            if svn_config_dir_name not in svn_config_dirs_to_keep:
 
-        if "pid" not in process_dict.keys():
-            process_dict["pid"] = process_pid_to_wait_for
+                log(f"Removing Subversion client settings for code host {svn_config_dir_name}, as it's no longer in code-hosts in {environment_variables_dict['REPOS_TO_CONVERT']}", "info")
+                shutil.rmtree(f"{svn_config_dirs_path}/{svn_config_dir_name}", ignore_errors=True)
 
-        print_process_status(process_dict, status_message)
+    code_hosts_dict.clear()
+    code_hosts_dict.update(code_hosts_new_dict)
 
 
-def git_config_safe_directory():
+def get_svn_config_dir_path(code_host_name=None):
 
-    cmd_git_safe_directory = ["git", "config", "--system", "--replace-all", "safe.directory", "\"*\""]
-    subprocess_run(cmd_git_safe_directory)
+    # Each code host's Subversion config dir is under REPO_CONVERTER_STATE_DIR/svn-config, named after the code host
+    svn_config_dirs_path = f"{environment_variables_dict['REPO_CONVERTER_STATE_DIR']}/svn-config"
 
+    if code_host_name is None:
+        return svn_config_dirs_path
 
-def parse_repos_to_convert_file_into_repos_dict():
+    return f"{svn_config_dirs_path}/{get_code_host_file_name(code_host_name)}"
 
-    # The Python runtime seems to require this to get specified
-    global repos_dict
 
-    # Clear the dict for this execution to ignore repos which have been removed from the yaml file
-    repos_dict.clear()
+def get_code_host_file_name(code_host_name):
 
-    # Parse the repos-to-convert.yaml file
-    try:
+    # Make the code host name safe to use as a file name, ex. for a code-host-name with a port, or a path
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(code_host_name)).lstrip(".") or "_"
 
-        # Open the file
-        with open(environment_variables_dict["REPOS_TO_CONVERT"], "r") as repos_to_convert_file:
 
-            # This should return a dict
-            repos_dict = yaml.safe_load(repos_to_convert_file)
+def get_svn_config_dir(code_host_name):
 
-    except FileNotFoundError:
+    # Returns the code host's Subversion config dir, for svn's --config-dir arg, or None if code-hosts doesn't have settings for it
+    # Check the disk, instead of code_hosts_dict, as the workers' copy of it isn't updated when the file is reloaded
+    if not code_host_name:
+        return None
 
-        log(f"repos-to-convert.yaml file not found at {environment_variables_dict['REPOS_TO_CONVERT']}", "error")
-        sys.exit(1)
+    svn_config_dir = get_svn_config_dir_path(code_host_name)
 
-    except (AttributeError, yaml.scanner.ScannerError) as exception:
+    return svn_config_dir if os.path.isfile(f"{svn_config_dir}/servers") else None
 
-        log(f"Invalid YAML file format in {environment_variables_dict['REPOS_TO_CONVERT']}, please check the structure matches the format in the README.md. Exception: {type(exception)}, {exception.args}, {exception}", "error")
-        sys.exit(2)
 
-    log(f"Parsed {len(repos_dict)} repos from {environment_variables_dict['REPOS_TO_CONVERT']}", "info")
+def write_svn_config_dir(code_host_name, svn_servers_options):
 
-    repos_dict = sanitize_inputs(repos_dict)
+    # Write the code host's Subversion config dir, starting from the container's default config,
+    # so settings other than the code host's, ex. how credentials are stored, are the same as without a config dir
+    # svn caches the code host's credentials and server certificates in the config dir's auth directory
+    svn_config_dir                  = get_svn_config_dir_path(code_host_name)
+    default_svn_config_dir          = os.path.expanduser("~/.subversion")
+    svn_servers_file_path           = f"{svn_config_dir}/servers"
+    temp_svn_servers_file_path      = f"{svn_servers_file_path}.tmp"
 
+    os.makedirs(svn_config_dir, exist_ok=True)
 
-def sanitize_inputs(input_value, input_key="", recursed=False):
+    if os.path.isfile(f"{default_svn_config_dir}/config") and not os.path.isfile(f"{svn_config_dir}/config"):
+        shutil.copyfile(f"{default_svn_config_dir}/config", f"{svn_config_dir}/config")
 
-    # Uses recursion to depth-first-search through the repos_dict dictionary, with arbitrary depths, keys, and value types
+    svn_servers_config = configparser.RawConfigParser(strict=False)
+    svn_servers_config.optionxform = str
 
-    # log(f"sanitize_inputs; starting; type(input_key): {type(input_key)}, input_key: {input_key}, type(input_value): {type(input_value)}, input_value: {input_value}, recursed: {recursed}", "info")
+    try:
+        svn_servers_config.read(f"{default_svn_config_dir}/servers")
+    except configparser.Error as exception:
+        log(f"Failed to read {default_svn_config_dir}/servers, writing Subversion client settings for code host {code_host_name} without it: {exception}", "warning")
 
-    # Take in the repos_dict
-    # DFS traverse the dictionary
-    # Get the key:value pairs
-    # Convert the keys to strings
-    # Validate / convert the value types
+    if not svn_servers_config.has_section("global"):
+        svn_servers_config.add_section("global")
 
-    # The inputs that have specific type requirements
-    # Dictionary of tuples
-    input_value_types_dict = {}
-    input_value_types_dict[ "authors-file-path"     ] = (str,           )
-    input_value_types_dict[ "authors-prog-path"     ] = (str,           )
-    input_value_types_dict[ "bare-clone"            ] = (bool,          )
-    input_value_types_dict[ "branches"              ] = (str, list      )
-    input_value_types_dict[ "code-host-name"        ] = (str,           )
-    input_value_types_dict[ "fetch-batch-size"      ] = (int,           )
-    input_value_types_dict[ "git-default-branch"    ] = (str,           )
-    input_value_types_dict[ "git-ignore-file-path"  ] = (str,           )
-    input_value_types_dict[ "git-org-name"          ] = (str,           )
-    input_value_types_dict[ "layout"                ] = (str,           )
-    input_value_types_dict[ "password"              ] = (str,           )
-    input_value_types_dict[ "svn-repo-code-root"    ] = (str,           )
-    input_value_types_dict[ "tags"                  ] = (str, list      )
-    input_value_types_dict[ "trunk"                 ] = (str,           )
-    input_value_types_dict[ "type"                  ] = (str,           )
-    input_value_types_dict[ "username"              ] = (str,           )
+    for option_name, option_value in svn_servers_options.items():
+        svn_servers_config.set("global", option_name, str(option_value))
 
+    # Write to a temp file, then rename it into place, so svn commands running in the workers never read a partly written file
+    with open(temp_svn_servers_file_path, "w") as temp_svn_servers_file:
+        svn_servers_config.write(temp_svn_servers_file)
 
-    if isinstance(input_value, dict):
+    os.replace(temp_svn_servers_file_path, svn_servers_file_path)
 
-        # log(f"sanitize_inputs(): received dict with key: {input_key} and dict: {input_value}", "info")
 
-        output = {}
+def configure_logging():
 
-        for input_value_key in input_value.keys():
+    global log_queue
+    global log_writer_thread
 
-            # log(f"sanitize_inputs(): key   type: {type(input_key)}; key: {input_key}", "info")
-            # log(f"sanitize_inputs(): value type: {type(input[input_key])}; value: {input[input_key]}", "info")
+    logging.basicConfig(
+        stream      = sys.stdout,
+        datefmt     = "%Y-%m-%d %H:%M:%S",
+        encoding    = "utf-8",
+        format      = f"%(message)s",
+        level       = environment_variables_dict["LOG_LEVEL"]
+    )
 
-            # Convert the key to a string
-            output_key = str(input_value_key)
+    # Create the queue before the pool forks its workers, so they inherit it
+    # Every process puts its log records on the queue, without waiting, and one thread in the main process formats, redacts, and writes them,
+    # so a slow stdout, ex. from the Docker log driver's backpressure, doesn't block the workers in the middle of a conversion
+    if log_queue is None:
 
-            # Recurse back into this function to handle the values of this dict
-            output[output_key] = sanitize_inputs(input_value[input_value_key], input_value_key, True)
+        log_queue = multiprocessing.Queue(maxsize=100000)
 
-    # If this function was called with a list
-    elif isinstance(input_value, list):
+        log_writer_thread = threading.Thread(target=write_log_records, name="log-writer", daemon=True)
+        log_writer_thread.start()
 
-        # log(f"sanitize_inputs(): received list with key: {input_key} and list: {input_value}", "info")
+        # Write the records still in the queue before the main process exits
+        atexit.register(stop_log_writer)
 
-        output = []
 
-        for input_list_item in input_value:
+def log(message, level_name:str = "DEBUG"):
 
-            # log(f"sanitize_inputs(): type(input_list_item): {type(input_list_item)}; input_list_item: {input_list_item}", "info")
+    global log_records_dropped
 
-            # Recurse back into this function to handle the values of this list
-            output.append(sanitize_inputs(input_list_item, input_key, True))
+    level_name = str(level_name).upper()
 
+    if level_name in ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]:
+        level_int = logging.getLevelName(level_name)
     else:
+        level_name = "DEBUG"
+        level_int = logging.DEBUG
 
-        # If the key is in the input_value_types_dict, then validate the value type
-        if input_key in input_value_types_dict.keys():
+    # Skip building the record if its level isn't logged
+    if not logging.getLogger().isEnabledFor(level_int):
+        return
 
-            # If the value's type is in the tuple, then just copy it as is
-            if type(input_value) in input_value_types_dict[input_key]:
+    log_record = {
+        "time"      : time.time(),
+        "level"     : level_name,
+        "run"       : script_run_number,
+        "pid"       : os.getpid(),
+        "repo"      : log_context_dict.get("repo"),
+        "phase"     : log_context_dict.get("phase"),
+        "message"   : str(message),
+    }
+
+    # Before configure_logging() starts the writer, format, redact, and write the record in this process
+    if log_queue is None:
+
+        sys.stdout.write(format_log_record(log_record))
+        sys.stdout.flush()
+        return
 
-                output = input_value
+    try:
 
-            # Type doesn't match
-            else:
+        # If records were dropped since the last one was queued, say so
+        if log_records_dropped:
 
-                # Construct the warning message
-                type_warning_message = f"Parsing {environment_variables_dict['REPOS_TO_CONVERT']} found incorrect variable type for "
+            log_queue.put_nowait(dict(log_record, level="WARNING", message=f"log queue was full, dropped {log_records_dropped} log records"))
+            log_records_dropped = 0
 
-                if input_key == "password":
-                    type_warning_message += input_key
-                else:
-                    type_warning_message += f"{input_key}: {input_value}"
+        log_queue.put_nowait(log_record)
 
-                type_warning_message += f", type {type(input_value)}, should be "
+    except queue.Full:
 
-                for variable_type in input_value_types_dict[input_key]:
-                    type_warning_message += f"{variable_type}, "
+        # Drop the record, instead of waiting for the writer to catch up
+        log_records_dropped += 1
 
-                type_warning_message += "will attempt to convert it"
 
-                # Log the warning message
-                log(type_warning_message, "warning")
+def format_log_record(log_record):
 
-                # Cast the value to the correct type
-                # This one chokes pretty hard, need to add a try except block
-                # ValueError: invalid literal for int() with base 10: '2=1'
-                if input_value_types_dict[input_key] == (int,):
-                    output = int(input_value)
+    # Redact the record's values before formatting it, as JSON escaping could change how a password looks in the output
+    # Returns the formatted record, with a newline
+    for key in ("message", "repo", "phase"):
+        log_record[key] = redact_password(log_record[key])
 
-                elif input_value_types_dict[input_key] == (bool,):
-                    output = bool(input_value)
+    if environment_variables_dict.get("LOG_FORMAT") == "json":
 
-                else:
-                    output = str(input_value)
-                    # log(f"output = str(input_value): {output}", "info")
+        log_record["time"] = datetime.fromtimestamp(log_record["time"]).astimezone().isoformat()
 
-            # Now that the keys and values are the correct type, check if it's a password
-            if input_key == "password":
+        return f"{json.dumps(log_record)}\n"
 
-                # Add the password value to the passwords set, to be redacted from logs later
-                passwords_set.add(input_value)
+    log_record_datetime = datetime.fromtimestamp(log_record["time"])
 
-        else:
+    return f"{log_record_datetime.date().isoformat()}; {log_record_datetime.time().isoformat()}; run {log_record['run']}; {log_record['level']}; {log_record['message']}\n"
 
-            log(f"No type check for {input_key}: {input_value} variable in {environment_variables_dict['REPOS_TO_CONVERT']}", "warning")
-            output = input_value
 
-    # log(f"sanitize_inputs; ending; type(output): {type(output)}, output: {output}", "info")
-    return output
+def write_log_records():
 
+    # Runs in a thread in the main process
+    # Wait for a record, then take all the records which are already queued, up to max_batch_records,
+    # and write them to stdout together, with one write and flush, instead of one for each line
+    max_batch_records = 1000
 
-def clone_svn_repos():
+    while True:
 
-    # Loop through the repos_dict, find the type: SVN repos, then fork off a process to clone them
-    for repo_key in repos_dict.keys():
+        log_records = [log_queue.get()]
 
-        repo_type = repos_dict[repo_key].get("type","").lower()
+        try:
 
-        if "svn" in repo_type or "subversion" in repo_type:
+            while len(log_records) < max_batch_records:
+                log_records.append(log_queue.get_nowait())
 
-            multiprocessing.Process(target=clone_svn_repo, name=f"clone_svn_repo_{repo_key}", args=(repo_key,)).start()
+        except queue.Empty:
+            pass
 
+        # None is the signal from stop_log_writer() to stop, after writing the records before it
+        stop = None in log_records
 
-def clone_svn_repo(repo_key):
+        try:
 
-    # Get config parameters read from repos-to-clone.yaml, and set defaults if they're not provided
-    git_repo_name               = repo_key
-    authors_file_path           = repos_dict[repo_key].get("authors-file-path"    , None    )
-    authors_prog_path           = repos_dict[repo_key].get("authors-prog-path"    , None    )
-    bare_clone                  = repos_dict[repo_key].get("bare-clone"           , True    )
-    branches                    = repos_dict[repo_key].get("branches"             , None    )
-    code_host_name              = repos_dict[repo_key].get("code-host-name"       , None    )
-    fetch_batch_size            = repos_dict[repo_key].get("fetch-batch-size"     , 100     )
-    git_default_branch          = repos_dict[repo_key].get("git-default-branch"   , "trunk" )
-    git_ignore_file_path        = repos_dict[repo_key].get("git-ignore-file-path" , None    )
-    git_org_name                = repos_dict[repo_key].get("git-org-name"         , None    )
-    layout                      = repos_dict[repo_key].get("layout"               , None    )
-    password                    = repos_dict[repo_key].get("password"             , None    )
-    svn_remote_repo_code_root   = repos_dict[repo_key].get("svn-repo-code-root"   , None    )
-    tags                        = repos_dict[repo_key].get("tags"                 , None    )
-    trunk                       = repos_dict[repo_key].get("trunk"                , None    )
-    username                    = repos_dict[repo_key].get("username"             , None    )
+            sys.stdout.write("".join(format_log_record(log_record) for log_record in log_records if log_record is not None))
+            sys.stdout.flush()
 
-    ## Parse config parameters into command args
-    # TODO: Interpret code_host_name, git_org_name, and git_repo_name if not given
-        # ex. https://svn.apache.org/repos/asf/parquet/site
-        # code_host_name            = svn.apache.org    # can get by removing url scheme, if any, till the first /
-        # arbitrary path on server  = repos             # optional, can either be a directory, or may actually be the repo
-        # git_org_name              = asf
-        # git_repo_name             = parquet
-        # git repo root             = site              # arbitrary path inside the repo where contributors decided to start storing /trunk /branches /tags and other files to be included in the repo
-    local_repo_path = f"{environment_variables_dict['SRC_SERVE_ROOT']}/{code_host_name}/{git_org_name}/{git_repo_name}"
+        except Exception as exception:
 
-    ## Define common command args
-    arg_batch_end_revision          =           [ f"{git_config_namespace}.batch-end-revision"  ]
-    arg_git                         =           [ "git", "-C", local_repo_path                  ]
-    arg_git_cfg                     = arg_git + [ "config"                                      ]
-    arg_git_svn                     = arg_git + [ "svn"                                         ]
-    arg_svn_echo_password           = None
-    arg_svn_non_interactive         =           [ "--non-interactive"                           ] # Do not prompt, just fail if the command doesn't work, only used for direct `svn` command
-    arg_svn_password                =           [ "--password", password                        ] # Only used for direct `svn` commands
-    arg_svn_remote_repo_code_root   =           [ svn_remote_repo_code_root                     ]
-    arg_svn_username                =           [ "--username", username                        ]
+            # Keep the writer running, the next batch may succeed
+            sys.stderr.write(f"Failed to write {len(log_records)} log records: {type(exception)}, {exception}\n")
 
-    ## Define commands
-    # One offs in the new array
-    # Reused one in their own arrays above, even if they're single element arrays
-    cmd_git_authors_file            = arg_git_cfg + [ "svn.authorsfile", authors_file_path                      ]
-    cmd_git_authors_prog            = arg_git_cfg + [ "svn.authorsProg", authors_prog_path                      ]
-    cmd_git_bare_clone              = arg_git_cfg + [ "core.bare", "true"                                       ]
-    cmd_git_default_branch          = arg_git     + [ "symbolic-ref", "HEAD", f"refs/heads/{git_default_branch}"]
-    cmd_git_garbage_collection      = arg_git     + [ "gc"                                                      ]
-    cmd_git_get_batch_end_revision  = arg_git_cfg + [ "--get"                                                   ] + arg_batch_end_revision
-    cmd_git_get_svn_url             = arg_git_cfg + [ "--get", "svn-remote.svn.url"                             ]
-    cmd_git_set_batch_end_revision  = arg_git_cfg + [ "--replace-all"                                           ] + arg_batch_end_revision
-    cmd_git_svn_fetch               = arg_git_svn + [ "fetch"                                                   ]
-    cmd_git_svn_init                = arg_git_svn + [ "init"                                                    ] + arg_svn_remote_repo_code_root
-    cmd_svn_info                    =               [ "svn", "info"                                             ] + arg_svn_non_interactive + arg_svn_remote_repo_code_root
-    cmd_svn_log                     =               [ "svn", "log", "--xml", "--with-no-revprops"               ] + arg_svn_non_interactive + arg_svn_remote_repo_code_root
+        if stop:
+            return
 
-    ## Modify commands based on config parameters
-    if username:
-        cmd_svn_info            += arg_svn_username
-        cmd_svn_log             += arg_svn_username
-        cmd_git_svn_init        += arg_svn_username
-        cmd_git_svn_fetch       += arg_svn_username
 
-    if password:
-        arg_svn_echo_password    = True
-        cmd_svn_info            += arg_svn_password
-        cmd_svn_log             += arg_svn_password
+def stop_log_writer():
 
-    # States
-        # Create:
-            # State:
-                # The directory doesn't already exist
-                # The repo      doesn't already exist
-            # How did we get here:
-                # First time - Create new path / repo / fetch job
-                # First run of the script
-                # New repo was added to the repos-to-convert.yaml file
-                # Repo was deleted from disk
-            # Approach:
-                # Harder to test for the negative, so assume we're in the Create state, unless we find we're in the Running or Update states
-    repo_state = "create"
-        # Running:
+    # Stop the writer thread after it writes the records which are already queued
+    if log_writer_thread and log_writer_thread.is_alive() and os.getpid() == main_process_pid:
+
+        log_queue.put(None)
+        log_writer_thread.join(timeout=10)
+
+
+def start_metrics_server():
+
+    # Serve the metrics in the Prometheus text format from a thread in the main process
+    # Create the queue before the pool forks its workers, so they inherit it, and send their metrics to the main process
+    global metrics_queue
+
+    metrics_port = environment_variables_dict["METRICS_PORT"]
+
+    if not metrics_port or metrics_queue is not None:
+        return
+
+    metrics_queue = multiprocessing.Queue(maxsize=100000)
+    threading.Thread(target=apply_queued_metrics, name="metrics-queue", daemon=True).start()
+
+    class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+
+            response_body = format_metrics().encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+        # Don't write a line to stderr for each scrape
+        def log_message(self, format, *args):
+            pass
+
+    try:
+
+        metrics_server = http.server.ThreadingHTTPServer(("", metrics_port), MetricsRequestHandler)
+
+    except OSError as exception:
+
+        log(f"Failed to start metrics server on port {metrics_port}: {type(exception)}, {exception}", "error")
+        return
+
+    threading.Thread(target=metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+
+    log(f"Serving metrics at http://0.0.0.0:{metrics_port}/metrics", "info")
+
+
+def record_metric(metric_name, value=1, **labels):
+
+    # Set a gauge, increment a counter, or observe a value in a histogram, depending on the metric's type in metrics_definitions_dict
+    # In the main process, update the metric directly, in worker processes, queue it for the main process, without waiting
+    if metrics_queue is None:
+        return
+
+    if os.getpid() == main_process_pid:
+        apply_metric(metric_name, value, labels)
+        return
+
+    try:
+        metrics_queue.put_nowait((metric_name, value, labels))
+    except queue.Full:
+        pass
+
+
+def apply_queued_metrics():
+
+    # Runs in a thread in the main process, to apply the metrics the workers send
+    while True:
+
+        metric_name, value, labels = metrics_queue.get()
+        apply_metric(metric_name, value, labels)
+
+
+def apply_metric(metric_name, value, labels):
+
+    metric_type = metrics_definitions_dict[metric_name][0]
+    labels_key  = tuple(sorted((label_name, str(label_value)) for label_name, label_value in labels.items()))
+
+    with metrics_lock:
+
+        metric_values_dict = metrics_dict.setdefault(metric_name, {})
+
+        if metric_type == "gauge":
+            metric_values_dict[labels_key] = value
+
+        elif metric_type == "counter":
+            metric_values_dict[labels_key] = metric_values_dict.get(labels_key, 0) + value
+
+        elif metric_type == "histogram":
+
+            # [count in each bucket, sum, count]
+            histogram = metric_values_dict.setdefault(labels_key, [[0] * len(metrics_histogram_buckets), 0.0, 0])
+
+            for i, bucket in enumerate(metrics_histogram_buckets):
+                if value <= bucket:
+                    histogram[0][i] += 1
+
+            histogram[1] += value
+            histogram[2] += 1
+
+
+def format_metrics():
+
+    # Format the metrics in the Prometheus text exposition format
+    # https://prometheus.io/docs/instrumenting/exposition_formats/
+    def format_labels(labels_key, extra_labels=()):
+
+        labels = list(labels_key) + list(extra_labels)
+
+        if not labels:
+            return ""
+
+        escaped_labels = [(label_name, label_value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for label_name, label_value in labels]
+
+        return "{" + ",".join(f'{label_name}="{label_value}"' for label_name, label_value in escaped_labels) + "}"
+
+    metrics_lines = []
+
+    with metrics_lock:
+
+        for metric_name, (metric_type, metric_help) in metrics_definitions_dict.items():
+
+            metrics_lines.append(f"# HELP {metric_name} {metric_help}")
+            metrics_lines.append(f"# TYPE {metric_name} {metric_type}")
+
+            for labels_key, value in sorted(metrics_dict.get(metric_name, {}).items()):
+
+                if metric_type != "histogram":
+                    metrics_lines.append(f"{metric_name}{format_labels(labels_key)} {value}")
+                    continue
+
+                bucket_counts, histogram_sum, histogram_count = value
+
+                for bucket, bucket_count in zip(metrics_histogram_buckets, bucket_counts):
+                    metrics_lines.append(f"{metric_name}_bucket{format_labels(labels_key, [('le', str(bucket))])} {bucket_count}")
+
+                metrics_lines.append(f"{metric_name}_bucket{format_labels(labels_key, [('le', '+Inf')])} {histogram_count}")
+                metrics_lines.append(f"{metric_name}_sum{format_labels(labels_key)} {histogram_sum}")
+                metrics_lines.append(f"{metric_name}_count{format_labels(labels_key)} {histogram_count}")
+
+    return "\n".join(metrics_lines) + "\n"
+
+
+def add_trace_event(name, category, start_time, end_time, args=None):
+
+    # Record a span of this process' time, as a complete event in the Chrome trace event format, which chrome://tracing and ui.perfetto.dev open
+    # https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OXQtYMdEdt7-MG-Ghv0XTKlM
+    # Timestamps are in microseconds since the epoch, so the spans from the main process and the workers line up
+    if not environment_variables_dict.get("TRACE_DIR"):
+        return
+
+    trace_events_list.append({
+        "name"  : name,
+        "cat"   : category,
+        "ph"    : "X",
+        "ts"    : int(start_time * 1000000),
+        "dur"   : int((end_time - start_time) * 1000000),
+        "pid"   : os.getpid(),
+        "tid"   : threading.get_native_id(),
+        "args"  : args or {},
+    })
+
+
+@contextlib.contextmanager
+def trace_span(name, category="function", **args):
+
+    # Record how long the block inside the with statement takes, ex. with trace_span("cleanup_branches_and_tags"):
+    if not environment_variables_dict.get("TRACE_DIR"):
+        yield
+        return
+
+    start_time = time.time()
+
+    try:
+        yield
+    finally:
+        add_trace_event(name, category, start_time, time.time(), args)
+
+
+def trace_phase(lock_name, phase=None):
+
+    # End the span of the lock holder's previous phase, and start a span for its new phase, or None to only end it
+    # update_lock_phase() calls this, so each phase a repo goes through gets a span, without adding a with statement to each one
+    now = time.time()
+    previous_phase, previous_phase_start_time = trace_phases_dict.pop(lock_name, (None, None))
+
+    if previous_phase is not None:
+        add_trace_event(previous_phase, "phase", previous_phase_start_time, now, {"lock": lock_name})
+
+    if phase is not None:
+        trace_phases_dict[lock_name] = (phase, now)
+
+
+def write_trace_file(trace_name):
+
+    # Write this process' trace events to a new JSON file in TRACE_DIR, then clear them for the next repo or run
+    # Returns the path of the file, or None if tracing is disabled, or there were no events
+    trace_dir = environment_variables_dict.get("TRACE_DIR")
+    trace_file_path = None
+
+    if trace_dir and trace_events_list:
+
+        trace_file_name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-run-{script_run_number}-{trace_name}")
+        trace_file_path = f"{trace_dir}/{trace_file_name}.json"
+
+        # Name the process in the trace viewer, instead of just its pid
+        process_name_event = {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": f"{script_name} {trace_name}"}}
+
+        try:
+
+            os.makedirs(trace_dir, exist_ok=True)
+
+            with open(f"{trace_file_path}.tmp", "w") as trace_file:
+                json.dump({"traceEvents": [process_name_event] + trace_events_list, "displayTimeUnit": "ms"}, trace_file)
+
+            os.replace(f"{trace_file_path}.tmp", trace_file_path)
+
+        except OSError as exception:
+
+            log(f"Failed to write trace file {trace_file_path}: {type(exception)}, {exception}", "warning")
+            trace_file_path = None
+
+    trace_events_list.clear()
+
+    return trace_file_path
+
+
+def remove_old_trace_files():
+
+    # Keep the newest TRACE_MAX_FILES files in TRACE_DIR, so a trace for each repo conversion doesn't fill the disk
+    trace_dir = environment_variables_dict.get("TRACE_DIR")
+
+    if not trace_dir:
+        return
+
+    try:
+
+        trace_file_paths = [directory_entry.path for directory_entry in os.scandir(trace_dir) if directory_entry.is_file()]
+        trace_file_paths.sort(key=os.path.getmtime, reverse=True)
+
+        for trace_file_path in trace_file_paths[max(environment_variables_dict["TRACE_MAX_FILES"], 0):]:
+            os.remove(trace_file_path)
+
+    except OSError as exception:
+        log(f"Failed to remove old trace files from {trace_dir}: {type(exception)}, {exception}", "warning")
+
+
+def start_profile():
+
+    # Profile the main process' Python code with cProfile, if TRACE_PROFILE is set
+    # Returns the profiler, to pass to stop_profile() at the end of the run, or None
+    # Keep it in a global too, so the pool's workers can turn off the copy they inherit, if they're forked while it's running
+    global main_process_profiler
+
+    if not environment_variables_dict.get("TRACE_PROFILE") or not environment_variables_dict.get("TRACE_DIR"):
+        return None
+
+    main_process_profiler = cProfile.Profile()
+    main_process_profiler.enable()
+
+    return main_process_profiler
+
+
+def stop_profile(profiler):
+
+    # Write the profile to TRACE_DIR, as a .prof file for pstats or snakeviz, and the top functions by cumulative time as a .txt file, to read without any tools
+    global main_process_profiler
+
+    if profiler is None:
+        return
+
+    profiler.disable()
+    main_process_profiler = None
+
+    trace_dir = environment_variables_dict["TRACE_DIR"]
+    profile_file_path = f"{trace_dir}/{datetime.now().strftime('%Y%m%d-%H%M%S')}-run-{script_run_number}-main"
+
+    profile_stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=profile_stats_stream).sort_stats("cumulative").print_stats(50)
+
+    try:
+
+        os.makedirs(trace_dir, exist_ok=True)
+        profiler.dump_stats(f"{profile_file_path}.prof")
+
+        with open(f"{profile_file_path}.txt", "w") as profile_stats_file:
+            profile_stats_file.write(profile_stats_stream.getvalue())
+
+    except OSError as exception:
+
+        log(f"Failed to write profile {profile_file_path}.prof: {type(exception)}, {exception}", "warning")
+        return
+
+    log(f"Wrote profile of run {script_run_number} to {profile_file_path}.prof and {profile_file_path}.txt", "info")
+
+
+def add_passwords(passwords):
+
+    # Add passwords to the passwords_set, to be redacted from logs,
+    # and rebuild the redaction pattern only if there are new ones, as log() uses it for every message
+    global passwords_redaction_pattern
+    global passwords_redaction_prefilter
+
+    new_passwords = {str(password) for password in passwords if password not in (None, "")} - passwords_set
+
+    if not new_passwords:
+        return
+
+    passwords_set.update(new_passwords)
+    passwords_redaction_pattern = compile_passwords_redaction_pattern(passwords_set)
+
+    # For a few passwords, searching for each of them with str's substring search, which runs in C, is faster than one pass with the regex,
+    # benchmarks/redact_password.py measures the crossover; longest first, so a password which contains another is redacted in full
+    passwords_redaction_prefilter = tuple(sorted(passwords_set, key=len, reverse=True)) if len(passwords_set) <= 150 else None
+
+
+def compile_passwords_redaction_pattern(passwords):
+
+    # Compile the passwords into one regex, as a trie of their characters, so each position in a message is only checked once,
+    # instead of once for each password; ex. abc, abd, and xy become (?:ab(?:c|d)|xy)
+    # Where one password is the start of another, the longer one matches first, so it's redacted in full
+    passwords_trie = {}
+
+    for password in passwords:
+
+        trie_node = passwords_trie
+
+        for character in password:
+            trie_node = trie_node.setdefault(character, {})
+
+        # An empty key marks the end of a password
+        trie_node[""] = {}
+
+    def trie_node_to_pattern(trie_node):
+
+        child_patterns = [re.escape(character) + trie_node_to_pattern(child_node) for character, child_node in sorted(trie_node.items()) if character]
+
+        if not child_patterns:
+            return ""
+
+        pattern = child_patterns[0] if len(child_patterns) == 1 else f"(?:{'|'.join(child_patterns)})"
+
+        # If a password ends at this node, the rest of the longer passwords is optional
+        if "" in trie_node:
+            pattern = f"(?:{pattern})?"
+
+        return pattern
+
+    return re.compile(trie_node_to_pattern(passwords_trie))
+
+
+def redact_password(input):
+
+    # Handle different types
+    # Return the same type this function was given, except where the password can only be redacted from the string form
+    # If input is a dict, list, or tuple, uses recursion to depth-first-search through the values, with arbitrary depths, keys, and value types
+    # Redacts all passwords in one pass over each string, with the pattern which add_passwords() compiles
+
+    # If there are no passwords, then just return the input as is
+    if passwords_redaction_pattern is None:
+        return input
+
+    # If it's type string, replace all of the passwords in one pass
+    # Check for strings first, as log() calls this function with a string for every message
+    if isinstance(input, str):
+
+        # For a few passwords, str's substring search is faster than the regex, see add_passwords()
+        if passwords_redaction_prefilter:
+
+            for password in passwords_redaction_prefilter:
+                if password in input:
+                    input = input.replace(password, "REDACTED-PASSWORD")
+
+            return input
+
+        return passwords_redaction_pattern.sub("REDACTED-PASSWORD", input)
+
+    # If the message is None or a bool, then just return the input as is
+    elif input is None or isinstance(input, bool):
+
+        return input
+
+    # If it's type int, only a password of digits could be in it
+    # Can't add the redacted message to an int, so return the redacted string if there was a password in it
+    elif isinstance(input, int):
+
+        input_string = str(input)
+        input_without_password = passwords_redaction_pattern.sub("REDACTED-PASSWORD", input_string)
+
+        return input if input_without_password == input_string else input_without_password
+
+    # AttributeError: 'list' object has no attribute 'replace'
+    # Need to iterate through the items in the list
+    elif isinstance(input, (list, tuple)):
+
+        # Send the list items back through this function to hit any of the non-list types
+        return type(input)(redact_password(item) for item in input)
+
+    # If it's a dict, recurse through the dict, until it gets down to primitive types
+    elif isinstance(input, dict):
+
+        # Check if the password is in the key, and convert it to a string
+        # Send the value back through this function to hit any of the non-list types
+        return {redact_password(str(key)): redact_password(value) for key, value in input.items()}
+
+    # Any other type, ex. a float or an exception, gets redacted as a string, so the password can't leak through its str()
+    input_string = str(input)
+    input_without_password = passwords_redaction_pattern.sub("REDACTED-PASSWORD", input_string)
+
+    return input if input_without_password == input_string else input_without_password
+
+
+def get_process_uptime(pid:int = 1):
+
+    formatted_timedelta = None
+
+    try:
+
+        pid_int                 = int(pid)
+        pid_create_time         = psutil.Process(pid_int).create_time()
+        pid_start_datetime      = datetime.fromtimestamp(pid_create_time)
+        pid_uptime_timedelta    = datetime.now() - pid_start_datetime
+        pid_uptime_seconds      = pid_uptime_timedelta.total_seconds()
+        formatted_timedelta     = timedelta(seconds=pid_uptime_seconds)
+
+    except (psutil.NoSuchProcess, TypeError, ValueError):
+        pass
+
+    return formatted_timedelta
+
+
+def get_lock_file_path(lock_name):
+
+    return f"{environment_variables_dict['REPO_CONVERTER_STATE_DIR']}/locks/{lock_name}.lock"
+
+
+def read_lock_file(lock_file_path):
+
+    # Returns the dict of the process which wrote the lock file, or an empty dict if the file is missing, empty, or unreadable
+    try:
+
+        with open(lock_file_path, "r") as lock_file:
+            return json.loads(lock_file.read() or "{}")
+
+    except (FileNotFoundError, ValueError, UnicodeDecodeError):
+        return {}
+
+
+def is_lock_holder_alive(lock_holder_dict):
+
+    # Check if the process which wrote the lock file is still running
+    # Compare its create time too, in case the pid has been reused by another process since then
+    try:
+
+        pid_create_time = psutil.Process(int(lock_holder_dict["pid"])).create_time()
+        return abs(pid_create_time - float(lock_holder_dict["create_time"])) < 1
+
+    except (KeyError, TypeError, ValueError, psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def acquire_lock(lock_name, phase="started"):
+
+    # Take an exclusive, non-blocking flock on the lock file, and write this process' pid, start time, and phase into it
+    # The OS releases the flock when the process exits, even if it's killed, so a lock can't outlive its process
+    # Returns a tuple of (True, {}) if acquired, or (False, lock holder dict) if another process holds it
+
+    # Forked processes inherit the dict, but not the lock, so only trust the entries this process added
+    if locks_held_dict.get(lock_name, (None, None))[1] == os.getpid():
+        return True, {}
+
+    lock_file_path = get_lock_file_path(lock_name)
+    os.makedirs(os.path.dirname(lock_file_path), exist_ok=True)
+
+    lock_file_descriptor = os.open(lock_file_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    try:
+
+        fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    except BlockingIOError:
+
+        os.close(lock_file_descriptor)
+        return False, read_lock_file(lock_file_path)
+
+    # If the previous holder's process is gone, its content is still in the file, log it for troubleshooting
+    previous_lock_holder_dict = read_lock_file(lock_file_path)
+
+    if previous_lock_holder_dict.get("pid") and not is_lock_holder_alive(previous_lock_holder_dict):
+        log(f"Taking over stale lock {lock_name} from pid {previous_lock_holder_dict.get('pid')}, which exited during phase {previous_lock_holder_dict.get('phase')}", "debug")
+
+    locks_held_dict[lock_name] = (lock_file_descriptor, os.getpid())
+    update_lock_phase(lock_name, phase)
+
+    return True, {}
+
+
+def update_lock_phase(lock_name, phase):
+
+    # Overwrite the lock file's content, so other processes can see what this process is doing
+    lock_file_descriptor, lock_holder_pid = locks_held_dict.get(lock_name, (None, None))
+
+    if lock_holder_pid != os.getpid():
+        return
+
+    # Add the phase to this process' log records, and start its trace span
+    log_context_dict["phase"] = phase
+    trace_phase(lock_name, phase)
+
+    lock_holder_dict = {
+        "pid"           : os.getpid(),
+        "create_time"   : psutil.Process().create_time(),
+        "phase"         : phase,
+        "phase_time"    : time.time(),
+    }
+
+    os.ftruncate(lock_file_descriptor, 0)
+    os.pwrite(lock_file_descriptor, json.dumps(lock_holder_dict).encode("utf-8"), 0)
+
+
+def release_lock(lock_name):
+
+    lock_file_descriptor, lock_holder_pid = locks_held_dict.pop(lock_name, (None, None))
+
+    if lock_holder_pid != os.getpid():
+        return
+
+    trace_phase(lock_name)
+
+    # Empty the file before unlocking, so the next holder doesn't log this process as a stale holder
+    os.ftruncate(lock_file_descriptor, 0)
+    fcntl.flock(lock_file_descriptor, fcntl.LOCK_UN)
+    os.close(lock_file_descriptor)
+
+
+def get_code_host_setting(code_host_name, option_name):
+
+    # Returns the code host's limit from the code-hosts section of the REPOS_TO_CONVERT file, or the environment variable it defaults to
+    return code_hosts_dict.get(code_host_name, {}).get(option_name, environment_variables_dict[code_hosts_limits_options_dict[option_name]])
+
+
+def update_code_host_state(code_host_name, update_function):
+
+    # Read, update, and write the code host's circuit breaker and rate limit state, which is shared by the main process and all workers,
+    # while holding a blocking flock on its state file, so each process sees the others' updates
+    # The state is on disk, so an outage's backoff carries over to the next run, and the next container
+    # Returns what update_function(state_dict, now) returns
+    code_host_state_file_path = f"{environment_variables_dict['REPO_CONVERTER_STATE_DIR']}/code-hosts/{get_code_host_file_name(code_host_name)}.json"
+    os.makedirs(os.path.dirname(code_host_state_file_path), exist_ok=True)
+
+    code_host_state_file_descriptor = os.open(code_host_state_file_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    try:
+
+        # Only held for the read and write, so processes only wait on each other for milliseconds
+        fcntl.flock(code_host_state_file_descriptor, fcntl.LOCK_EX)
+
+        try:
+            code_host_state_dict = json.loads(os.pread(code_host_state_file_descriptor, os.fstat(code_host_state_file_descriptor).st_size, 0) or "{}")
+        except (ValueError, UnicodeDecodeError):
+            code_host_state_dict = {}
+
+        update_function_result = update_function(code_host_state_dict, time.time())
+
+        os.ftruncate(code_host_state_file_descriptor, 0)
+        os.pwrite(code_host_state_file_descriptor, json.dumps(code_host_state_dict).encode("utf-8"), 0)
+
+        return update_function_result
+
+    finally:
+
+        # Closing the file releases the flock
+        os.close(code_host_state_file_descriptor)
+
+
+def acquire_code_host_request(repo_key, code_host_name, probe=False):
+
+    # Check the code host's circuit breaker, then take a token from its request rate token bucket, before each svn command to the code host
+    # While the circuit is open, after the code host failed to connect circuit-breaker-failures times in a row, skip the code host's repos without running any commands,
+    # until the backoff time passes, then let one process probe the code host, while the other processes keep skipping, until the probe succeeds
+    # Only the callers which pass probe=True can probe the code host, and they must record the probe's result with record_code_host_request_result(), even if the command raises
+    # Returns True if the command can run, or False if the repo should be skipped this run
+    if not code_host_name:
+        return True
+
+    circuit_breaker_failures    = get_code_host_setting(code_host_name, "circuit-breaker-failures")
+    requests_per_minute         = get_code_host_setting(code_host_name, "requests-per-minute")
+
+    # Don't wait longer than the interval for a token, as the repo would be due again by then anyway
+    rate_limit_wait_max_seconds = environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"]
+
+    def take_code_host_request(code_host_state_dict, now):
+
+        if circuit_breaker_failures and "circuit_open_until" in code_host_state_dict:
+
+            if now < code_host_state_dict["circuit_open_until"]:
+                return "circuit open", code_host_state_dict["circuit_open_until"] - now
+
+            # Half open: only one process probes the code host at a time, until the probe's result is recorded
+            # If the process probing it is gone, or the probe's taken longer than the interval, let this process probe it instead
+            probe_dict = code_host_state_dict.get("probe", {})
+
+            if not probe:
+                return "circuit half open", 0
+
+            if (probe_dict.get("pid"), probe_dict.get("thread")) != (os.getpid(), threading.get_ident()) and now < probe_dict.get("until", 0) and is_lock_holder_alive(probe_dict):
+                return "circuit probing", probe_dict["until"] - now
+
+            code_host_state_dict["probe"] = {
+                "pid"           : os.getpid(),
+                "thread"        : threading.get_ident(),
+                "create_time"   : psutil.Process().create_time(),
+                "repo"          : repo_key,
+                "until"         : now + environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"],
+            }
+
+        if not requests_per_minute:
+            return None, 0
+
+        # Token bucket, which holds up to ten seconds' worth of requests, to allow short bursts
+        # Take the token before it's refilled, then wait for it outside the flock, so processes get the tokens in the order they asked for them
+        tokens_per_second   = requests_per_minute / 60
+        tokens_max          = max(1, requests_per_minute / 6)
+        tokens              = min(tokens_max, code_host_state_dict.get("tokens", tokens_max) + (now - code_host_state_dict.get("tokens_time", now)) * tokens_per_second)
+        token_wait_seconds  = max(0, (1 - tokens) / tokens_per_second)
+
+        code_host_state_dict["tokens_time"] = now
+
+        if token_wait_seconds > rate_limit_wait_max_seconds:
+
+            code_host_state_dict["tokens"] = tokens
+            return "rate limit", token_wait_seconds
+
+        code_host_state_dict["tokens"] = tokens - 1
+        return None, token_wait_seconds
+
+    skip_reason, wait_seconds = update_code_host_state(code_host_name, take_code_host_request)
+
+    if skip_reason:
+
+        skip_reason_messages_dict = {
+            "circuit open"      : f"code host {code_host_name}'s circuit breaker is open for {int(wait_seconds)} more seconds",
+            "circuit probing"   : f"another process is probing code host {code_host_name}, for up to {int(wait_seconds)} more seconds",
+            "circuit half open" : f"code host {code_host_name}'s circuit breaker is waiting for a repo's svn info to probe it",
+            "rate limit"        : f"code host {code_host_name}'s rate limit of {requests_per_minute} requests per minute would take {int(wait_seconds)} seconds",
+        }
+
+        log(f"{repo_key}; skipping this run, {skip_reason_messages_dict[skip_reason]}", "info")
+        record_metric("repo_converter_code_host_skips_total", code_host=code_host_name, reason=skip_reason)
+        return False
+
+    if wait_seconds > 0:
+
+        log(f"{repo_key}; waiting {wait_seconds:.1f} seconds for code host {code_host_name}'s rate limit of {requests_per_minute} requests per minute", "debug")
+        record_metric("repo_converter_code_host_rate_limit_wait_seconds", wait_seconds, code_host=code_host_name)
+
+        with trace_span("code host rate limit wait", code_host=code_host_name):
+            time.sleep(wait_seconds)
+
+    return True
+
+
+def record_code_host_request_result(repo_key, code_host_name, succeeded):
+
+    # Record whether a command connected to the code host, to open its circuit breaker after circuit-breaker-failures failures in a row,
+    # double its backoff after each failed probe, up to circuit-breaker-max-backoff-seconds, or close it after a command succeeds
+    if not code_host_name:
+        return
+
+    circuit_breaker_failures            = get_code_host_setting(code_host_name, "circuit-breaker-failures")
+    circuit_breaker_max_backoff_seconds = get_code_host_setting(code_host_name, "circuit-breaker-max-backoff-seconds")
+
+    def record_code_host_result(code_host_state_dict, now):
+
+        probe_dict = code_host_state_dict.get("probe", {})
+
+        if (probe_dict.get("pid"), probe_dict.get("thread")) == (os.getpid(), threading.get_ident()):
+            del code_host_state_dict["probe"]
+
+        if succeeded:
+
+            circuit_was_open = "circuit_open_until" in code_host_state_dict
+
+            for key in ("circuit_backoff_seconds", "circuit_open_until", "failures", "probe"):
+                code_host_state_dict.pop(key, None)
+
+            return circuit_was_open
+
+        code_host_state_dict["failures"] = code_host_state_dict.get("failures", 0) + 1
+
+        if not circuit_breaker_failures:
+            return None
+
+        # Failures from commands which started before the circuit opened don't extend the backoff
+        if now < code_host_state_dict.get("circuit_open_until", 0):
+            return None
+
+        if "circuit_open_until" in code_host_state_dict:
+            circuit_backoff_seconds = code_host_state_dict.get("circuit_backoff_seconds", 60) * 2
+
+        elif code_host_state_dict["failures"] >= circuit_breaker_failures:
+            circuit_backoff_seconds = 60
+
+        else:
+            return None
+
+        circuit_backoff_seconds = max(1, min(circuit_backoff_seconds, circuit_breaker_max_backoff_seconds))
+        code_host_state_dict["circuit_backoff_seconds"] = circuit_backoff_seconds
+        code_host_state_dict["circuit_open_until"] = now + circuit_backoff_seconds
+
+        return circuit_backoff_seconds
+
+    circuit_change = update_code_host_state(code_host_name, record_code_host_result)
+
+    if succeeded and circuit_change:
+
+        log(f"{repo_key}; connected to code host {code_host_name}, closing its circuit breaker", "warning")
+        record_metric("repo_converter_code_host_circuit_open", 0, code_host=code_host_name)
+
+    elif not succeeded and circuit_change:
+
+        log(f"{repo_key}; failed to connect to code host {code_host_name}, opening its circuit breaker, skipping its repos for {circuit_change} seconds, until one probes it again", "error")
+        record_metric("repo_converter_code_host_circuit_open", 1, code_host=code_host_name)
+
+
+def is_svn_connection_failure(subprocess_output, stalled=False):
+
+    # A stalled command is usually stuck on an svn server which accepted the connection, but isn't responding
+    subprocess_output_string = " ".join(subprocess_output or [])
+
+    return stalled or any(message in subprocess_output_string for message in svn_connection_failure_messages)
+
+
+def get_repo_lock_name(repo_key):
+
+    # Lock the repo's path on disk, not the repo_key, as the path is what's shared between processes
+    code_host_name  = repos_dict[repo_key].get("code-host-name" , None)
+    git_org_name    = repos_dict[repo_key].get("git-org-name"   , None)
+
+    return f"repos/{code_host_name}/{git_org_name}/{repo_key}"
+
+
+def clear_stale_git_lock_files(repo_key, local_repo_path):
+
+    # Only call this while holding the repo's lock, so no other repo-converter process is using this repo,
+    # then any of git's lock files left behind are from a process which was killed, and will fail the next command
+    for lock_file_process, lock_file_relative_path in git_lock_files:
+
+        lock_file_path = f"{local_repo_path}/{lock_file_relative_path}"
+
+        if not os.path.exists(lock_file_path):
+            continue
+
+        lock_file_content = ""
+
+        try:
+
+            with open(lock_file_path, "r") as lock_file_object:
+                lock_file_content = lock_file_object.read().strip()
+
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+
+        # git gc writes "pid hostname" to gc.pid, and may still be running in the background from git gc --auto
+        if lock_file_relative_path.endswith("gc.pid"):
+
+            try:
+
+                gc_pid, gc_hostname = lock_file_content.split(" ", 1)
+
+                # Same as git gc, treat the file as stale after 12 hours, ex. sg_maintenance.sh writes pid 1, which is always running in the container
+                gc_pid_file_age_seconds = time.time() - os.path.getmtime(lock_file_path)
+
+                if gc_hostname == os.uname().nodename and psutil.pid_exists(int(gc_pid)) and gc_pid_file_age_seconds < 12 * 60 * 60:
+
+                    log(f"{repo_key}; {lock_file_process} is still running in pid {gc_pid}, leaving lock file {lock_file_path}", "debug")
+                    continue
+
+            except (FileNotFoundError, ValueError):
+                pass
+
+        log(f"{repo_key}; removing stale {lock_file_process} lock file {lock_file_path} before starting; lock file content: {lock_file_content}", "warning")
+
+        try:
+            os.remove(lock_file_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_child_pids():
+
+    # Get the pids of this process' direct children from the kernel, without scanning the whole process table
+    # When this script runs as pid 1 in the container, orphaned grandchild processes, ex. from git svn, also get re-parented to it
+    child_pids = set()
+
+    try:
+
+        for thread_id in os.listdir(f"/proc/{os.getpid()}/task"):
+
+            with open(f"/proc/{os.getpid()}/task/{thread_id}/children", "r") as children_file:
+                child_pids.update(int(pid) for pid in children_file.read().split())
+
+    except (FileNotFoundError, PermissionError):
+
+        # Kernels without CONFIG_PROC_CHILDREN don't have the children file
+        child_pids = {child.pid for child in psutil.Process().children()}
+
+    return child_pids
+
+
+def reap_child_processes():
+
+    # Wait on each child process which has exited, to remove the zombie from the OS' process table and get its return status
+    # Leave the pool's worker processes for the pool to wait on, so it can replace them if they exit
+    # Returns the number of child processes reaped
+    child_process_exited_event.clear()
+
+    pool_worker_pids = set()
+
+    if repo_conversion_pool:
+        pool_worker_pids = {pool_worker.pid for pool_worker in repo_conversion_pool._pool}
+
+    child_processes_reaped = 0
+
+    # Also leave the subprocesses which threads in this process are running, ex. the bulk svn info commands, for them to wait on,
+    # holding the lock so a subprocess can't be started between getting the child pids and waiting on them
+    with subprocess_pids_lock:
+
+        for child_pid in get_child_pids() - pool_worker_pids - subprocess_pids_set:
+
+            try:
+
+                # Returns (0, 0) right away if the child is still running
+                waited_pid, wait_status = os.waitpid(child_pid, os.WNOHANG)
+
+            except ChildProcessError:
+
+                # Another thread already waited on it
+                continue
+
+            if waited_pid:
+
+                child_processes_reaped += 1
+                log(f"pid {waited_pid}; finished with return status: {os.waitstatus_to_exitcode(wait_status)}", "debug")
+
+    return child_processes_reaped
+
+
+def status_update_and_cleanup_zombie_processes():
+
+    # Reap any child processes which have exited, and log the status of the repo conversion pool
+    child_processes_reaped = reap_child_processes()
+
+    pool_worker_pids = []
+
+    if repo_conversion_pool:
+        pool_worker_pids = [pool_worker.pid for pool_worker in repo_conversion_pool._pool]
+
+    log(f"Reaped {child_processes_reaped} child processes; repo conversion pool worker pids: {pool_worker_pids}; repos queued or running: {list(repo_conversion_tasks_dict.keys())}", "debug")
+
+
+def git_config_safe_directory():
+
+    cmd_git_safe_directory = ["git", "config", "--system", "--replace-all", "safe.directory", "\"*\""]
+    subprocess_run(cmd_git_safe_directory)
+
+
+def parse_repos_to_convert_file(exit_on_error=False):
+
+    # Parse the repos-to-convert.yaml file
+    # Returns a dict, or None if the file is missing or invalid, and exit_on_error is False
+    try:
+
+        # Open the file
+        with open(environment_variables_dict["REPOS_TO_CONVERT"], "r") as repos_to_convert_file:
+
+            # This should return a dict
+            repos_to_convert_file_dict = yaml.safe_load(repos_to_convert_file)
+
+        if not isinstance(repos_to_convert_file_dict, dict):
+            raise AttributeError(f"top level is {type(repos_to_convert_file_dict)}, should be a dict of repos")
+
+    except FileNotFoundError:
+
+        log(f"repos-to-convert.yaml file not found at {environment_variables_dict['REPOS_TO_CONVERT']}", "error")
+
+        if exit_on_error:
+            sys.exit(1)
+
+        return None
+
+    except (AttributeError, yaml.YAMLError) as exception:
+
+        log(f"Invalid YAML file format in {environment_variables_dict['REPOS_TO_CONVERT']}, please check the structure matches the format in the README.md. Exception: {type(exception)}, {exception.args}, {exception}", "error")
+
+        if exit_on_error:
+            sys.exit(2)
+
+        return None
+
+    return repos_to_convert_file_dict
+
+
+def update_repos_dict(repos_to_convert_file_dict):
+
+    # Compare each repo's config to the config it was last loaded with, so only the repos which were added, changed, or removed
+    # are validated by sanitize_inputs(), and rescheduled; the other repos keep their schedule, and repos in the pool keep running
+    repos_added = []
+    repos_changed = []
+    repos_removed = []
+
+    # Skip invalid repo configs before comparing, so they're handled as removed if they were valid before,
+    # without removing them from the dict while iterating over it
+    for repo_key, repo_config in repos_to_convert_file_dict.items():
+        if not isinstance(repo_config, dict):
+            log(f"{repo_key}; invalid config in {environment_variables_dict['REPOS_TO_CONVERT']}, should be a dict, skipping", "error")
+
+    repos_to_convert_file_dict = {str(repo_key): repo_config for repo_key, repo_config in repos_to_convert_file_dict.items() if isinstance(repo_config, dict)}
+
+    # Add all of the repos' passwords at once, so the redaction pattern is compiled once,
+    # instead of once for each password sanitize_inputs() finds, which takes minutes for thousands of repos
+    add_passwords([repo_config.get("password") for repo_config in repos_to_convert_file_dict.values()])
+
+    for repo_key, repo_config in repos_to_convert_file_dict.items():
+
+        if repo_key in repos_to_convert_raw_dict and repos_to_convert_raw_dict[repo_key] == repo_config:
+            continue
+
+        if repo_key in repos_to_convert_raw_dict:
+            repos_changed.append(repo_key)
+        else:
+            repos_added.append(repo_key)
+
+        repos_to_convert_raw_dict[repo_key] = repo_config
+        repos_dict[repo_key] = sanitize_inputs(repo_config)
+
+    for repo_key in list(repos_to_convert_raw_dict.keys()):
+
+        if repo_key not in repos_to_convert_file_dict:
+
+            repos_removed.append(repo_key)
+            del repos_to_convert_raw_dict[repo_key]
+            repos_dict.pop(repo_key, None)
+            repos_revision_lag_dict.pop(repo_key, None)
+
+    # Cancel the next fetch of removed repos, and fetch changed repos now, with their new config
+    # The heap entries of cancelled repos are skipped when they're popped
+    # Repos which are queued or running in the pool finish with the config they were sent,
+    # then repo_conversion_finished() only reschedules them if they're still in the repos_dict
+    with repo_schedule_lock:
+
+        for repo_key in repos_removed:
+            repos_next_fetch_time_dict.pop(repo_key, None)
+
+    for repo_key in repos_changed:
+        if repo_key in repos_next_fetch_time_dict:
+            schedule_repo(repo_key, time.time())
+
+    log(f"Loaded {len(repos_dict)} repos from {environment_variables_dict['REPOS_TO_CONVERT']}; added: {repos_added}; changed: {repos_changed}; removed: {repos_removed}", "info")
+
+
+def sanitize_inputs(input_value, input_key="", recursed=False):
+
+    # Uses recursion to depth-first-search through the repos_dict dictionary, with arbitrary depths, keys, and value types
+
+    # log(f"sanitize_inputs; starting; type(input_key): {type(input_key)}, input_key: {input_key}, type(input_value): {type(input_value)}, input_value: {input_value}, recursed: {recursed}", "info")
+
+    # Take in the repos_dict
+    # DFS traverse the dictionary
+    # Get the key:value pairs
+    # Convert the keys to strings
+    # Validate / convert the value types
+
+    # The inputs that have specific type requirements
+    # Dictionary of tuples
+    input_value_types_dict = {}
+    input_value_types_dict[ "authors-file-path"     ] = (str,           )
+    input_value_types_dict[ "authors-prog-path"     ] = (str,           )
+    input_value_types_dict[ "bare-clone"            ] = (bool,          )
+    input_value_types_dict[ "branches"              ] = (str, list      )
+    input_value_types_dict[ "catch-up-time-budget-seconds" ] = (int,    )
+    input_value_types_dict[ "code-host-name"        ] = (str,           )
+    input_value_types_dict[ "fetch-batch-size"      ] = (int,           )
+    input_value_types_dict[ "fetch-batch-size-max"  ] = (int,           )
+    input_value_types_dict[ "fetch-batch-target-seconds" ] = (int,      )
+    input_value_types_dict[ "fetch-interval-seconds"] = (int,           )
+    input_value_types_dict[ "git-default-branch"    ] = (str,           )
+    input_value_types_dict[ "git-ignore-file-path"  ] = (str,           )
+    input_value_types_dict[ "git-org-name"          ] = (str,           )
+    input_value_types_dict[ "git-refspecs"          ] = (str, list      )
+    input_value_types_dict[ "git-repo-url"          ] = (str,           )
+    input_value_types_dict[ "layout"                ] = (str,           )
+    input_value_types_dict[ "password"              ] = (str,           )
+    input_value_types_dict[ "svn-mirror"            ] = (bool,          )
+    input_value_types_dict[ "svn-repo-code-root"    ] = (str,           )
+    input_value_types_dict[ "tags"                  ] = (str, list      )
+    input_value_types_dict[ "trunk"                 ] = (str,           )
+    input_value_types_dict[ "type"                  ] = (str,           )
+    input_value_types_dict[ "username"              ] = (str,           )
+
+
+    if isinstance(input_value, dict):
+
+        # log(f"sanitize_inputs(): received dict with key: {input_key} and dict: {input_value}", "info")
+
+        output = {}
+
+        for input_value_key in input_value.keys():
+
+            # log(f"sanitize_inputs(): key   type: {type(input_key)}; key: {input_key}", "info")
+            # log(f"sanitize_inputs(): value type: {type(input[input_key])}; value: {input[input_key]}", "info")
+
+            # Convert the key to a string
+            output_key = str(input_value_key)
+
+            # Recurse back into this function to handle the values of this dict
+            output[output_key] = sanitize_inputs(input_value[input_value_key], input_value_key, True)
+
+    # If this function was called with a list
+    elif isinstance(input_value, list):
+
+        # log(f"sanitize_inputs(): received list with key: {input_key} and list: {input_value}", "info")
+
+        output = []
+
+        for input_list_item in input_value:
+
+            # log(f"sanitize_inputs(): type(input_list_item): {type(input_list_item)}; input_list_item: {input_list_item}", "info")
+
+            # Recurse back into this function to handle the values of this list
+            output.append(sanitize_inputs(input_list_item, input_key, True))
+
+    else:
+
+        # If the key is in the input_value_types_dict, then validate the value type
+        if input_key in input_value_types_dict.keys():
+
+            # If the value's type is in the tuple, then just copy it as is
+            if type(input_value) in input_value_types_dict[input_key]:
+
+                output = input_value
+
+            # Type doesn't match
+            else:
+
+                # Construct the warning message
+                type_warning_message = f"Parsing {environment_variables_dict['REPOS_TO_CONVERT']} found incorrect variable type for "
+
+                if input_key == "password":
+                    type_warning_message += input_key
+                else:
+                    type_warning_message += f"{input_key}: {input_value}"
+
+                type_warning_message += f", type {type(input_value)}, should be "
+
+                for variable_type in input_value_types_dict[input_key]:
+                    type_warning_message += f"{variable_type}, "
+
+                type_warning_message += "will attempt to convert it"
+
+                # Log the warning message
+                log(type_warning_message, "warning")
+
+                # Cast the value to the correct type
+                # This one chokes pretty hard, need to add a try except block
+                # ValueError: invalid literal for int() with base 10: '2=1'
+                if input_value_types_dict[input_key] == (int,):
+                    output = int(input_value)
+
+                elif input_value_types_dict[input_key] == (bool,):
+                    output = bool(input_value)
+
+                else:
+                    output = str(input_value)
+                    # log(f"output = str(input_value): {output}", "info")
+
+            # Now that the keys and values are the correct type, check if it's a password
+            if input_key == "password":
+
+                # Add the password value to the passwords set, to be redacted from logs later
+                # update_repos_dict() already added the repos' passwords in one batch, so this doesn't recompile the redaction pattern
+                add_passwords([input_value])
+
+        else:
+
+            log(f"No type check for {input_key}: {input_value} variable in {environment_variables_dict['REPOS_TO_CONVERT']}", "warning")
+            output = input_value
+
+    # log(f"sanitize_inputs; ending; type(output): {type(output)}, output: {output}", "info")
+    return output
+
+
+def start_repo_conversion_pool():
+
+    # Start the pool of worker processes on the first run, and keep reusing it on every run after,
+    # so each run only queues work, instead of forking a new process for every repo
+    global repo_conversion_pool
+
+    if repo_conversion_pool:
+        return
+
+    max_concurrent_repos = max(1, environment_variables_dict["MAX_CONCURRENT_REPOS"])
+
+    log(f"Starting repo conversion pool with MAX_CONCURRENT_REPOS={max_concurrent_repos} worker processes", "info")
+
+    repo_conversion_pool = multiprocessing.Pool(processes=max_concurrent_repos, initializer=repo_conversion_worker_initializer)
+
+
+def repo_conversion_worker_initializer():
+
+    # The workers wait on their own subprocesses, so they don't need the main process' SIGCHLD handler
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    # If the main process was profiling when it forked this worker, stop profiling, as the worker would never write the profile
+    if main_process_profiler:
+        main_process_profiler.disable()
+
+    # Don't write the main process' spans from before the fork into this worker's first trace file
+    trace_events_list.clear()
+    trace_phases_dict.clear()
+
+    # The pool forks replacement workers from its handler thread, so a bulk up to date check thread in the main process could be holding
+    # the subprocess pids lock, which this worker would inherit locked; its subprocesses are also not this worker's to wait on
+    global subprocess_pids_lock
+    subprocess_pids_lock = threading.Lock()
+    subprocess_pids_set.clear()
+
+
+def schedule_repo(repo_key, next_fetch_time):
+
+    # Push the repo onto the min-heap of next fetch times
+    # A repo's older entries stay in the heap, and are skipped when popped, if they don't match its time in repos_next_fetch_time_dict
+    with repo_schedule_lock:
+
+        repos_next_fetch_time_dict[repo_key] = next_fetch_time
+        heapq.heappush(repo_schedule_heap, (next_fetch_time, repo_key))
+
+    # Wake up the main loop, in case this repo is due sooner than the time it's waiting for
+    repo_schedule_wake_event.set()
+
+
+def get_repo_fetch_interval_seconds(repo_key):
+
+    return repos_dict.get(repo_key, {}).get("fetch-interval-seconds", environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"])
+
+
+def repo_conversion_finished(repo_key, dispatch_time, revision_lag=None):
+
+    # Runs in the pool's result handler thread in the main process when a worker finishes a repo
+    # Keep the revision lag the worker reported, to prioritize the repos which are furthest behind,
+    # free up the repo to be queued again, and schedule its next fetch one fetch interval after this one started
+    with repo_schedule_lock:
+        repo_conversion_tasks_dict.pop(repo_key, None)
+
+    # Wake up the main loop, to queue the repos waiting for their code host's max-concurrent-repos, even if this repo was removed
+    repo_schedule_wake_event.set()
+
+    if revision_lag is not None:
+        repos_revision_lag_dict[repo_key] = revision_lag
+
+    if repo_key in repos_dict:
+        schedule_repo(repo_key, max(dispatch_time + get_repo_fetch_interval_seconds(repo_key), time.time()))
+
+
+def repo_conversion_failed(repo_key, dispatch_time, exception):
+
+    log(f"{repo_key}; repo conversion raised an exception: {type(exception)}, {exception.args}, {exception}", "error")
+    repo_conversion_finished(repo_key, dispatch_time)
+
+
+def dispatch_due_repos():
+
+    # Pop the repos which are due off the heap, and queue them in the pool, the repos which are furthest behind first
+    # Returns the time the next repo is due, or None if no repos are scheduled
+    now = time.time()
+    due_repo_keys = []
+
+    with repo_schedule_lock:
+
+        while repo_schedule_heap and repo_schedule_heap[0][0] <= now:
+
+            next_fetch_time, repo_key = heapq.heappop(repo_schedule_heap)
+
+            # Skip the entry if the repo has been rescheduled or removed since it was pushed
+            if repos_next_fetch_time_dict.get(repo_key) != next_fetch_time:
+                continue
+
+            del repos_next_fetch_time_dict[repo_key]
+            due_repo_keys.append(repo_key)
+
+        next_repo_due_time = repo_schedule_heap[0][0] if repo_schedule_heap else None
+
+    # Skip starting a worker for the svn repos which haven't changed since their last conversion
+    # The check runs in threads, so a slow or unreachable svn server doesn't hold up queueing the other repos, or reloading the REPOS_TO_CONVERT file
+    if due_repo_keys and environment_variables_dict["SVN_BULK_UP_TO_DATE_CHECK"]:
+        due_repo_keys = start_svn_repos_up_to_date_checks_in_bulk(due_repo_keys, now)
+
+    # Queue the repos which the bulk up to date check has finished with, and didn't find up to date
+    with repo_schedule_lock:
+
+        due_repo_keys += repos_bulk_checked_list
+        repos_bulk_checked_list.clear()
+
+    # Skip the repos which a reload of the REPOS_TO_CONVERT file removed while they were being checked
+    due_repo_keys = [repo_key for repo_key in due_repo_keys if repo_key in repos_dict]
+
+    if due_repo_keys:
+        add_trace_event("dispatch due repos", "function", now, time.time(), {"repos": len(due_repo_keys)})
+
+    # Count each code host's repos which are queued or running, to hold its repos back at its max-concurrent-repos
+    # Add the repos which were waiting for their code host's repos to finish, up to its max-concurrent-repos, which may have been changed
+    with repo_schedule_lock:
+
+        code_hosts_repo_counts = collections.Counter(repos_dict.get(repo_key, {}).get("code-host-name") for repo_key in repo_conversion_tasks_dict)
+
+        for code_host_name, waiting_repo_keys in code_hosts_waiting_repos_dict.items():
+
+            code_host_max_repos = get_code_host_setting(code_host_name, "max-concurrent-repos")
+            waiting_repos_to_add = len(waiting_repo_keys) if not code_host_max_repos else code_host_max_repos - code_hosts_repo_counts[code_host_name]
+
+            while waiting_repo_keys and waiting_repos_to_add > 0:
+
+                waiting_repo_key = waiting_repo_keys.popleft()
+
+                if waiting_repo_key in repos_dict and waiting_repo_key not in due_repo_keys:
+
+                    due_repo_keys.append(waiting_repo_key)
+                    waiting_repos_to_add -= 1
+
+    # Repos which haven't reported a lag yet haven't been converted yet, so they're the furthest behind
+    due_repo_keys.sort(key=lambda repo_key: repos_revision_lag_dict.get(repo_key, float("inf")), reverse=True)
+
+    for repo_key in due_repo_keys:
+
+        # If a worker is somehow still converting the repo, it gets rescheduled when it finishes
+        if repo_key in repo_conversion_tasks_dict:
+
+            log(f"{repo_key}; previous conversion still queued or running, skipping", "info")
+            continue
+
+        code_host_name          = repos_dict[repo_key].get("code-host-name")
+        code_host_max_repos     = get_code_host_setting(code_host_name, "max-concurrent-repos") if code_host_name else 0
+
+        # Keep the repo out of the heap until one of the code host's repos finishes, instead of polling the heap for it
+        if code_host_max_repos and code_hosts_repo_counts[code_host_name] >= code_host_max_repos:
+
+            with repo_schedule_lock:
+
+                waiting_repo_keys = code_hosts_waiting_repos_dict.setdefault(code_host_name, collections.deque())
+
+                if repo_key not in waiting_repo_keys:
+                    waiting_repo_keys.append(repo_key)
+
+            log(f"{repo_key}; code host {code_host_name} has {code_hosts_repo_counts[code_host_name]} repos queued or running, at its max-concurrent-repos {code_host_max_repos}, waiting for one to finish", "debug")
+            continue
+
+        code_hosts_repo_counts[code_host_name] += 1
+
+        # The workers were forked when the pool started, so send them this run's copy of the repo's config, environment variables, passwords, and code host settings
+        # Hold the lock until the task is in the dict, in case it finishes before apply_async() returns
+        with repo_schedule_lock:
+
+            repo_conversion_tasks_dict[repo_key] = repo_conversion_pool.apply_async(
+                convert_repo_worker,
+                args            = (repo_key, repos_dict[repo_key], environment_variables_dict.copy(), passwords_set.copy(), script_run_number, code_hosts_dict.get(code_host_name, {})),
+                callback        = lambda revision_lag, repo_key=repo_key, dispatch_time=now: repo_conversion_finished(repo_key, dispatch_time, revision_lag),
+                error_callback  = lambda exception, repo_key=repo_key, dispatch_time=now: repo_conversion_failed(repo_key, dispatch_time, exception),
+            )
+
+        log(f"{repo_key}; queued for conversion, revision lag: {repos_revision_lag_dict.get(repo_key, 'unknown')}, {len(repo_conversion_tasks_dict)} repos queued or running in the pool of {environment_variables_dict['MAX_CONCURRENT_REPOS']} workers", "debug")
+
+    return next_repo_due_time
+
+
+def wait_for_due_repos(run_start_time):
+
+    # Queue repos as they come due, until REPO_CONVERTER_INTERVAL_SECONDS after run_start_time
+    # Sleeps until the next repo is due, a worker finishes and reschedules its repo, or it's time to check the REPOS_TO_CONVERT file for changes
+    next_repos_to_convert_check_time = time.time() + environment_variables_dict["REPOS_TO_CONVERT_CHECK_SECONDS"]
+
+    while True:
+
+        next_repo_due_time = dispatch_due_repos()
+        now = time.time()
+
+        # The interval can be changed in the REPOS_TO_CONVERT file, so check it each time
+        until_time = run_start_time + environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"]
+
+        if now >= until_time:
+            return
+
+        wake_time = min(until_time, next_repo_due_time) if next_repo_due_time else until_time
+
+        if environment_variables_dict["REPOS_TO_CONVERT_CHECK_SECONDS"] > 0:
+
+            if now >= next_repos_to_convert_check_time:
+
+                next_repos_to_convert_check_time = now + environment_variables_dict["REPOS_TO_CONVERT_CHECK_SECONDS"]
+
+                # Schedule the repos which were added, then go back to queue the repos which are due
+                with trace_span("reload repos-to-convert file"):
+                    repos_to_convert_file_reloaded = load_config_from_repos_to_convert_file()
+
+                if repos_to_convert_file_reloaded:
+
+                    with trace_span("schedule new repos"):
+                        clone_svn_repos()
+                        clone_git_repos()
+
+                    continue
+
+            wake_time = min(wake_time, next_repos_to_convert_check_time)
+
+        repo_schedule_wake_event.wait(max(wake_time - now, 0))
+        repo_schedule_wake_event.clear()
+
+        if child_process_exited_event.is_set():
+            reap_child_processes()
+
+
+def clone_svn_repos():
+
+    # Add the new type: SVN repos to the schedule
+    schedule_new_repos("SVN", ("svn", "subversion"))
+
+
+def schedule_new_repos(repo_type_name, repo_type_matches):
+
+    start_repo_conversion_pool()
+
+    # Loop through the repos_dict, find the repos of this type, and add the new ones to the schedule
+    # Repos which are already scheduled, queued, or running, keep their schedule
+    # On the first run after the container starts, spread out the repos' first fetches over REPO_CONVERTER_JITTER_SECONDS
+    now = time.time()
+    repos_scheduled = 0
+
+    for repo_key in repos_dict.keys():
+
+        repo_type = repos_dict[repo_key].get("type","").lower()
+
+        if any(repo_type_match in repo_type for repo_type_match in repo_type_matches):
+
+            if repo_key in repos_next_fetch_time_dict or repo_key in repo_conversion_tasks_dict or repo_key in repos_bulk_checking_set:
+                continue
+
+            jitter_seconds = 0
+
+            if script_run_number == 1:
+                jitter_seconds = random.uniform(0, min(environment_variables_dict["REPO_CONVERTER_JITTER_SECONDS"], get_repo_fetch_interval_seconds(repo_key)))
+
+            schedule_repo(repo_key, now + jitter_seconds)
+            repos_scheduled += 1
+
+    log(f"Scheduled {repos_scheduled} new {repo_type_name} repos for conversion, {len(repos_next_fetch_time_dict)} repos scheduled, {len(repo_conversion_tasks_dict)} queued or running in the pool of {environment_variables_dict['MAX_CONCURRENT_REPOS']} workers", "info")
+
+
+def convert_repo_worker(repo_key, repo_config, environment_variables, passwords, run_number, code_host_config=None):
+
+    # Runs in a pool worker process, which was forked when the pool started, so update its copy of the global variables before converting the repo
+    global script_run_number
+
+    environment_variables_dict.update(environment_variables)
+    logging.getLogger().setLevel(environment_variables_dict["LOG_LEVEL"])
+    add_passwords(passwords)
+    repos_dict[repo_key] = repo_config
+    script_run_number = run_number
+
+    if repo_config.get("code-host-name"):
+        code_hosts_dict[repo_config["code-host-name"]] = code_host_config or {}
+
+    # Add the repo key to this worker's log records, until it finishes this repo
+    log_context_dict["repo"] = repo_key
+    repo_start_time = time.time()
+
+    # Check if another process is still converting this repo, ex. from before the container restarted
+    repo_lock_name = get_repo_lock_name(repo_key)
+
+    with trace_span("repo lock check"):
+        lock_acquired, lock_holder_dict = acquire_lock(repo_lock_name)
+
+    if not lock_acquired:
+
+        log_failure_message = f"{repo_key}; previous process still running in pid {lock_holder_dict.get('pid')}"
+
+        if lock_holder_dict.get("phase"):
+            log_failure_message += f", in phase {lock_holder_dict.get('phase')}"
+
+        process_running_time = get_process_uptime(lock_holder_dict.get("pid"))
+        if process_running_time:
+            log_failure_message += f", running for {process_running_time}"
+
+        log(f"{log_failure_message}; skipping", "info")
+        record_metric("repo_converter_lock_skips_total", repo=repo_key)
+        repos_dict.pop(repo_key, None)
+        log_context_dict.clear()
+        trace_events_list.clear()
+        return
+
+    try:
+
+        # Returns the number of revisions this repo is still behind, if known, so the main process can prioritize it
+        if repo_config.get("type", "").lower() == "git":
+            return clone_git_repo(repo_key)
+
+        return clone_svn_repo(repo_key)
+
+    except Exception as exception:
+
+        # Log the exception here, as the worker process keeps running the next repo
+        log(f"{repo_key}; repo conversion raised an exception: {type(exception)}, {exception.args}, {exception}; {traceback.format_exc()}", "error")
+
+    finally:
+
+        release_lock(repo_lock_name)
+
+        # Write a trace file for each repo conversion, with a span for the whole conversion, and the phase, subprocess, and function spans in it
+        add_trace_event(repo_key, "repo", repo_start_time, time.time(), {"type": repo_config.get("type", "")})
+        write_trace_file(repo_key)
+
+        # Don't keep the config of a repo the worker isn't converting anymore
+        repos_dict.pop(repo_key, None)
+        log_context_dict.clear()
+
+
+def clone_svn_repo(repo_key):
+
+    # Get config parameters read from repos-to-clone.yaml, and set defaults if they're not provided
+    git_repo_name               = repo_key
+    authors_file_path           = repos_dict[repo_key].get("authors-file-path"    , None    )
+    authors_prog_path           = repos_dict[repo_key].get("authors-prog-path"    , None    )
+    bare_clone                  = repos_dict[repo_key].get("bare-clone"           , True    )
+    branches                    = repos_dict[repo_key].get("branches"             , None    )
+    code_host_name              = repos_dict[repo_key].get("code-host-name"       , None    )
+    fetch_batch_size            = repos_dict[repo_key].get("fetch-batch-size"     , 100     )
+    fetch_batch_size_max        = repos_dict[repo_key].get("fetch-batch-size-max" , 10000   )
+    fetch_batch_target_seconds  = repos_dict[repo_key].get("fetch-batch-target-seconds", None)
+    catch_up_time_budget_seconds = repos_dict[repo_key].get("catch-up-time-budget-seconds", environment_variables_dict["CATCH_UP_TIME_BUDGET_SECONDS"])
+    git_default_branch          = repos_dict[repo_key].get("git-default-branch"   , "trunk" )
+    git_ignore_file_path        = repos_dict[repo_key].get("git-ignore-file-path" , None    )
+    git_org_name                = repos_dict[repo_key].get("git-org-name"         , None    )
+    layout                      = repos_dict[repo_key].get("layout"               , None    )
+    password                    = repos_dict[repo_key].get("password"             , None    )
+    svn_mirror                  = repos_dict[repo_key].get("svn-mirror"           , False   )
+    svn_remote_repo_code_root   = repos_dict[repo_key].get("svn-repo-code-root"   , None    )
+    tags                        = repos_dict[repo_key].get("tags"                 , None    )
+    trunk                       = repos_dict[repo_key].get("trunk"                , None    )
+    username                    = repos_dict[repo_key].get("username"             , None    )
+
+    ## Parse config parameters into command args
+    # TODO: Interpret code_host_name, git_org_name, and git_repo_name if not given
+        # ex. https://svn.apache.org/repos/asf/parquet/site
+        # code_host_name            = svn.apache.org    # can get by removing url scheme, if any, till the first /
+        # arbitrary path on server  = repos             # optional, can either be a directory, or may actually be the repo
+        # git_org_name              = asf
+        # git_repo_name             = parquet
+        # git repo root             = site              # arbitrary path inside the repo where contributors decided to start storing /trunk /branches /tags and other files to be included in the repo
+    local_repo_path = f"{environment_variables_dict['SRC_SERVE_ROOT']}/{code_host_name}/{git_org_name}/{git_repo_name}"
+
+    ## Define common command args
+    arg_git                         =           [ "git", "-C", local_repo_path                  ]
+    arg_git_svn                     = arg_git + [ "svn"                                         ]
+    arg_svn_echo_password           = None
+    arg_svn_non_interactive         =           [ "--non-interactive"                           ] # Do not prompt, just fail if the command doesn't work, only used for direct `svn` command
+    arg_svn_password                =           [ "--password", password                        ] # Only used for direct `svn` commands
+    arg_svn_remote_repo_code_root   =           [ svn_remote_repo_code_root                     ]
+    arg_svn_username                =           [ "--username", username                        ]
+    svn_config_dir                  = get_svn_config_dir(code_host_name)
+    rate_limited_code_host_name     = code_host_name # The code host whose rate limit and circuit breaker apply to the commands, None when they use a local svn mirror
+    arg_svn_config_dir              =           [ "--config-dir", svn_config_dir                ] # The code host's Subversion client settings, from code-hosts in the REPOS_TO_CONVERT file
+
+    ## Define commands
+    # One offs in the new array
+    # Reused one in their own arrays above, even if they're single element arrays
+    # Git config and HEAD are read and written in-process, with git_config_get(), git_config_set(), and git_head_set()
+    cmd_git_svn_fetch               = arg_git_svn + [ "fetch"                                                   ]
+    cmd_git_svn_init                = arg_git_svn + [ "init"                                                    ] + arg_svn_remote_repo_code_root
+    cmd_svn_info                    =               [ "svn", "info"                                             ] + arg_svn_non_interactive + arg_svn_remote_repo_code_root
+    cmd_svn_log                     =               [ "svn", "log", "--xml", "--with-no-revprops"               ] + arg_svn_non_interactive + arg_svn_remote_repo_code_root
+
+    ## Modify commands based on config parameters
+    if username:
+        cmd_svn_info            += arg_svn_username
+        cmd_svn_log             += arg_svn_username
+        cmd_git_svn_init        += arg_svn_username
+        cmd_git_svn_fetch       += arg_svn_username
+
+    if password:
+        arg_svn_echo_password    = True
+        cmd_svn_info            += arg_svn_password
+        cmd_svn_log             += arg_svn_password
+
+    if svn_config_dir:
+        cmd_svn_info            += arg_svn_config_dir
+        cmd_svn_log             += arg_svn_config_dir
+        cmd_git_svn_init        += arg_svn_config_dir
+        cmd_git_svn_fetch       += arg_svn_config_dir
+
+    # States
+        # Create:
+            # State:
+                # The directory doesn't already exist
+                # The repo      doesn't already exist
+            # How did we get here:
+                # First time - Create new path / repo / fetch job
+                # First run of the script
+                # New repo was added to the repos-to-convert.yaml file
+                # Repo was deleted from disk
+            # Approach:
+                # Harder to test for the negative, so assume we're in the Create state, unless we find we're in the Running or Update states
+    repo_state = "create"
+        # Running:
             # State:
                 # An svn fetch process is still running
             # How did we get here:
                 # Fetch process is still running from a previous run of the script
             # Approach:
-                # Check first if the process is running, then continue this outer loop
+                # convert_repo_worker() checks the repo's lock file before calling this function, and skips the repo if the lock's holder is still running
         # Update:
             # State:
                 # Repo already exists, with a valid configuration
@@ -644,524 +2254,2070 @@ def clone_svn_repo(repo_key):
     # repo_state = "update"
 
 
-    ## Check if we're in the Running state
+    ## Check if we're in the Running state
+    # convert_repo_worker() holds this repo's lock while this function runs, so no other repo-converter process is using this repo
+    # Clear any lock files git left behind from a process which was killed, so they don't fail the commands below
+    repo_lock_name = get_repo_lock_name(repo_key)
+    clear_stale_git_lock_files(repo_key, local_repo_path)
+
+    ## Check if we're in the Update state
+    # Check if the git repo already exists and has the correct settings in the config file
+    try:
+
+        # None if the repo doesn't exist on disk yet, or doesn't have the svn remote configured
+        # If the repo was converted from a local svn mirror, rewriteRoot has the svn server's URL
+        svn_remote_url = git_config_get(local_repo_path, "svn-remote.svn.rewriteRoot") or git_config_get(local_repo_path, "svn-remote.svn.url")
+
+        if svn_remote_url and svn_remote_url in svn_remote_repo_code_root:
+
+            repo_state = "update"
+
+    except Exception as exception:
+
+        log(f"{repo_key}; failed to read svn-remote.svn.url from git config. Exception: {type(exception)}, {exception.args}, {exception}", "warning")
+
+
+    ## Run commands
+    update_lock_phase(repo_lock_name, "svn info")
+
+    # Run the svn info command to test logging in to the SVN server, for network connectivity and credentials
+    # Capture the output so we know the max revision in this repo's history
+    # Instead of retrying here, record connection failures in the code host's circuit breaker, which all workers share,
+    # so when the svn server is down, its repos are skipped, and only one of them probes it after each backoff, instead of every worker retrying it
+    # Any result other than a connection failure means the code host is up, ex. if this repo's credentials are wrong
+    if not acquire_code_host_request(repo_key, code_host_name, probe=True):
+        return
+
+    svn_info_connection_failed = False
+
+    try:
+
+        svn_info = subprocess_run(cmd_svn_info, password, arg_svn_echo_password, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"])
+        svn_info_connection_failed = svn_info["returncode"] != 0 and is_svn_connection_failure(svn_info["output"], svn_info.get("stalled"))
+
+    finally:
+
+        record_code_host_request_result(repo_key, code_host_name, not svn_info_connection_failed)
+
+    svn_info_output_string = " ".join(svn_info["output"] or [])
+
+    if svn_info["returncode"] != 0:
+
+        if svn_info_connection_failed:
+            log(f"{repo_key}; Failed to connect to repo remote, skipping this run", "error")
+        else:
+            log(f"{repo_key}; svn info failed, skipping this run", "error")
+
+        return
+
+    # Get last changed revision for this repo
+    last_changed_rev = int(svn_info_output_string.split("Last Changed Rev: ")[1].split(" ")[0])
+    record_metric("repo_converter_repo_remote_revision", last_changed_rev, repo=repo_key)
+
+    # The last revision fetched by the previous batch, or 0 if this is a new repo
+    previous_batch_end_revision = 0
+
+    # Check if the previous batch end revision is the same as the last changed rev from svn info
+    # If yes, we're up to date, return to the next repo, instead of forking the git svn process to do the same check
+    if repo_state == "update":
+
+        try:
+            previous_batch_end_revision = int(git_config_get(local_repo_path, f"{git_config_namespace}.batch-end-revision"))
+        except (TypeError, ValueError):
+            previous_batch_end_revision = 0
+
+        if previous_batch_end_revision == last_changed_rev:
+
+            log(f"{repo_key}; up to date, skipping; local rev {previous_batch_end_revision}, remote rev {last_changed_rev}", "info")
+            record_metric("repo_converter_repo_local_revision", previous_batch_end_revision, repo=repo_key)
+            record_metric("repo_converter_repo_revision_lag", 0, repo=repo_key)
+
+            # Publish any branch and tag changes, and run any git maintenance which is due, even if repo is already up to date
+            publish_refs_and_run_git_maintenance(repo_key, local_repo_path, git_default_branch, repo_lock_name)
+
+            return 0
+
+    # Convert from a local mirror of the svn repository, instead of the svn server, so git svn's many round trips per revision don't wait on the network
+    # The mirror is of the whole svn repository, so repos with code roots in the same svn repository share it
+    if svn_mirror:
+
+        svn_info_dict = parse_svn_info_output(svn_info["output"])
+
+        if not svn_info_dict.get("Repository Root") or not svn_remote_repo_code_root.startswith(svn_info_dict["Repository Root"]):
+
+            log(f"{repo_key}; svn-repo-code-root {svn_remote_repo_code_root} doesn't start with the Repository Root from svn info: {svn_info_dict.get('Repository Root')}, converting from the svn server instead of a mirror", "warning")
+            svn_mirror = False
+
+    if svn_mirror:
+
+        update_lock_phase(repo_lock_name, "svn mirror sync")
+        svn_mirror_url = sync_svn_mirror(repo_key, svn_info_dict["Repository Root"], svn_info_dict.get("Repository UUID"), username, password, svn_config_dir, code_host_name)
+
+        # Ex. if svnsync initialize failed, because the credentials can't read the repository root, or the mirror's directory couldn't be created,
+        # convert from the svn server, instead of skipping the repo every run, and try the mirror again next run
+        if not svn_mirror_url:
+
+            log(f"{repo_key}; svn mirror isn't available, converting from the svn server instead of a mirror this run", "warning")
+            svn_mirror = False
+
+    if svn_mirror:
+
+        svn_mirror_repo_code_root = svn_mirror_url + svn_remote_repo_code_root[len(svn_info_dict["Repository Root"]):]
+
+        # The mirror is on local disk, so the commands don't need credentials, the code host's Subversion client settings, or its rate limit
+        password                = None
+        rate_limited_code_host_name = None
+        arg_svn_echo_password   = None
+        cmd_git_svn_fetch       = arg_git_svn + [ "fetch"                                   ]
+        cmd_git_svn_init        = arg_git_svn + [ "init"                                    ] + [ svn_mirror_repo_code_root ]
+        cmd_svn_info            =               [ "svn", "info"                             ] + arg_svn_non_interactive + [ svn_mirror_repo_code_root ]
+        cmd_svn_log             =               [ "svn", "log", "--xml", "--with-no-revprops" ] + arg_svn_non_interactive + [ svn_mirror_repo_code_root ]
+
+        # Another repo in the same svn repository may still be syncing the mirror, so only convert up to the mirror's last changed rev for this repo
+        svn_info = subprocess_run(cmd_svn_info)
+
+        if svn_info["returncode"] != 0:
+
+            log(f"{repo_key}; svn info failed on the svn mirror, it may still be syncing its first revisions; skipping this run to retry next run", "warning")
+            return
+
+        last_changed_rev = int(parse_svn_info_output(svn_info["output"]).get("Last Changed Rev", 0))
+
+        if last_changed_rev <= previous_batch_end_revision:
+
+            log(f"{repo_key}; svn mirror hasn't synced past local rev {previous_batch_end_revision} yet; skipping this run to retry next run", "info")
+            return
+
+
+    if repo_state == "create":
+
+        log(f"{repo_key}; didn't find a local clone, creating one", "info")
+
+        # Create the repo path if it doesn't exist
+        if not os.path.exists(local_repo_path):
+            os.makedirs(local_repo_path)
+
+        if layout:
+            cmd_git_svn_init   += ["--stdlayout"]
+
+            # Warn the user if they provided an invalid value for the layout, only standard is supported
+            if "standard" not in layout and "std" not in layout:
+                log(f"{repo_key}; Layout shortcut provided with incorrect value {layout}, only standard is supported for the shortcut, continuing assuming standard, otherwise provide --trunk, --tags, and --branches", "warning")
+
+        # There can only be one trunk
+        if trunk:
+            cmd_git_svn_init            += ["--trunk", trunk]
+
+        # Tags and branches can either be single strings or lists of strings
+        if tags:
+            if isinstance(tags, str):
+                cmd_git_svn_init        += ["--tags", tags]
+            if isinstance(tags, list):
+                for tag in tags:
+                    cmd_git_svn_init    += ["--tags", tag]
+        if branches:
+            if isinstance(branches, str):
+                cmd_git_svn_init        += ["--branches", branches]
+            if isinstance(branches, list):
+                for branch in branches:
+                    cmd_git_svn_init    += ["--branches", branch]
+
+        # Initialize the repo
+        update_lock_phase(repo_lock_name, "git svn init")
+        subprocess_run(cmd_git_svn_init, password, arg_svn_echo_password, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"])
+
+        # Configure the bare clone
+        if bare_clone:
+            git_config_set(local_repo_path, "core.bare", "true")
+
+        # Initialize this config with a 0 value
+        git_config_set(local_repo_path, f"{git_config_namespace}.batch-end-revision", str(0))
+
+    # Point git svn at the mirror, or back at the svn server if the mirror was turned off
+    # rewriteRoot keeps the svn server's URL in the git-svn-id lines of the commit messages, so the commits are the same either way
+    svn_remote_url          = git_config_get(local_repo_path, "svn-remote.svn.url")
+    svn_remote_rewrite_root = git_config_get(local_repo_path, "svn-remote.svn.rewriteRoot")
+
+    if svn_mirror and svn_remote_url:
+
+        # git svn init may have shortened the URL to the root of the svn repository, so map the URL it chose to the same path on the svn server
+        if not svn_remote_rewrite_root:
+
+            if svn_remote_url.startswith(svn_mirror_url):
+                svn_remote_rewrite_root = svn_info_dict["Repository Root"] + svn_remote_url[len(svn_mirror_url):]
+            else:
+                svn_remote_rewrite_root = svn_remote_url
+
+        git_config_set_values(local_repo_path, {
+            "svn-remote.svn.url"            : svn_mirror_url + svn_remote_rewrite_root[len(svn_info_dict["Repository Root"]):],
+            "svn-remote.svn.rewriteRoot"    : svn_remote_rewrite_root,
+        })
+
+    elif svn_remote_rewrite_root and svn_remote_url != svn_remote_rewrite_root:
+
+        git_config_set(local_repo_path, "svn-remote.svn.url", svn_remote_rewrite_root)
+
+
+    ## Back to steps we do for both Create and Update states, so users can update the below parameters without having to restart the clone from scratch
+    # git_config_set() and git_head_set() skip writing values which are already set
+
+    # Set the default branch local to this repo, after init
+    git_head_set(local_repo_path, git_default_branch)
+
+    # Configure the authors file, if provided
+    if authors_file_path:
+        if os.path.exists(authors_file_path):
+            git_config_set(local_repo_path, "svn.authorsfile", authors_file_path)
+        else:
+            log(f"{repo_key}; authors file not found at {authors_file_path}, skipping configuring it", "warning")
+
+    # Configure the authors program, if provided
+    if authors_prog_path:
+        if os.path.exists(authors_prog_path):
+            git_config_set(local_repo_path, "svn.authorsProg", authors_prog_path)
+        else:
+            log(f"{repo_key}; authors prog not found at {authors_prog_path}, skipping configuring it", "warning")
+
+    # Configure the .gitignore file, if provided
+    if git_ignore_file_path:
+        if os.path.exists(git_ignore_file_path):
+            shutil.copy2(git_ignore_file_path, local_repo_path)
+        else:
+            log(f"{repo_key}; .gitignore file not found at {git_ignore_file_path}, skipping configuring it", "warning")
+
+    # Batch processing
+    # Add any new revisions from the svn server to this repo's revision index on disk,
+    # then get the batch start and end revisions, and count of remaining revisions, from the index
+    update_lock_phase(repo_lock_name, "svn log")
+
+    revision_index = update_svn_revision_index(repo_key, local_repo_path, svn_remote_repo_code_root, cmd_svn_log, last_changed_rev, password, arg_svn_echo_password, rate_limited_code_host_name)
+
+    if revision_index is None:
+
+        log(f"{repo_key}; failed to update the svn revision index; skipping this run to retry next run", "warning")
+        return
+
+    # In catch up mode, keep fetching batches until the repo is up to date, or the time budget runs out,
+    # otherwise, just fetch one batch per run
+    catch_up_deadline   = time.monotonic() + catch_up_time_budget_seconds
+    batches_fetched     = 0
+
+    while True:
+
+        # In adaptive mode, use the batch size tuned from the previous batches' throughput, if there is one
+        if fetch_batch_target_seconds:
+
+            tuned_fetch_batch_size = git_config_get(local_repo_path, f"{git_config_namespace}.fetch-batch-size")
+
+            if tuned_fetch_batch_size:
+                fetch_batch_size = int(tuned_fetch_batch_size)
+
+        batch_start_revision, batch_end_revision, remaining_revs = plan_svn_fetch_batch(revision_index, previous_batch_end_revision, fetch_batch_size)
+
+        if not batch_start_revision:
+
+            # The index has every revision up to last_changed_rev, so if none are left after the previous batch, there's nothing to fetch up to last_changed_rev
+            # Store it, so the next run can skip this repo after svn info
+            if batches_fetched == 0:
+                log(f"{repo_key}; up to date, no revisions found after local rev {previous_batch_end_revision} in the svn revision index, remote rev {last_changed_rev}", "info")
+                git_config_set(local_repo_path, f"{git_config_namespace}.batch-end-revision", str(last_changed_rev))
+                record_metric("repo_converter_repo_local_revision", last_changed_rev, repo=repo_key)
+                record_metric("repo_converter_repo_revision_lag", 0, repo=repo_key)
+                return 0
+
+            break
+
+        batch_revisions = min(remaining_revs, fetch_batch_size)
+
+        if not acquire_code_host_request(repo_key, rate_limited_code_host_name):
+            break
+
+        log(f"{repo_key}; out of date; local rev {previous_batch_end_revision}, remote rev {last_changed_rev}, {remaining_revs} revs remaining to catch up, fetching next batch of {batch_revisions} revisions", "info")
+
+        cmd_git_svn_fetch_batch = cmd_git_svn_fetch + ["--revision", f"{batch_start_revision}:{batch_end_revision}"]
+
+        # Start the fetch
+        log(f"{repo_key}; fetching with {' '.join(cmd_git_svn_fetch_batch)}", "info")
+        update_lock_phase(repo_lock_name, "git svn fetch")
+        git_svn_fetch_progress_dict = {"revisions_fetched": 0, "last_revision_fetched": None}
+        git_svn_fetch_start_time = time.monotonic()
+        git_svn_fetch_result = subprocess_run(
+            cmd_git_svn_fetch_batch,
+            password,
+            password,
+            output_consumers        = [ lambda output_line: parse_git_svn_fetch_output_line(output_line, git_svn_fetch_progress_dict) ],
+            stall_timeout_seconds   = environment_variables_dict["STALL_TIMEOUT_SECONDS_FETCH"],
+        )
+        git_svn_fetch_duration_seconds = time.monotonic() - git_svn_fetch_start_time
+        git_svn_fetch_succeeded = git_svn_fetch_result["returncode"] == 0
+        record_metric("repo_converter_fetch_duration_seconds", git_svn_fetch_duration_seconds, repo=repo_key)
+
+        log(f"{repo_key}; git svn fetch {'succeeded' if git_svn_fetch_succeeded else 'failed'} after fetching {git_svn_fetch_progress_dict['revisions_fetched']} revisions, last revision fetched: {git_svn_fetch_progress_dict['last_revision_fetched']}", "debug")
+
+        # Size the next batch to take fetch-batch-target-seconds, based on this batch's throughput
+        if fetch_batch_target_seconds:
+
+            tune_fetch_batch_size(
+                repo_key,
+                local_repo_path,
+                fetch_batch_size,
+                batch_revisions,
+                git_svn_fetch_duration_seconds,
+                git_svn_fetch_succeeded,
+                fetch_batch_target_seconds,
+                fetch_batch_size_max,
+            )
+
+        if not git_svn_fetch_succeeded:
+
+            if is_svn_connection_failure(git_svn_fetch_result["output"], git_svn_fetch_result.get("stalled")):
+                record_code_host_request_result(repo_key, rate_limited_code_host_name, False)
+
+            break
+
+        # Store the ending revision number after each batch, so the next batch, or run, picks up from here, even if this process is stopped
+        git_config_set(local_repo_path, f"{git_config_namespace}.batch-end-revision", str(batch_end_revision))
+        previous_batch_end_revision = batch_end_revision
+        remaining_revs -= batch_revisions
+        batches_fetched += 1
+
+        record_metric("repo_converter_revisions_fetched_total", batch_revisions, repo=repo_key)
+        record_metric("repo_converter_repo_local_revision", batch_end_revision, repo=repo_key)
+        record_metric("repo_converter_repo_revision_lag", remaining_revs, repo=repo_key)
+
+        if remaining_revs <= 0:
+            break
+
+        if time.monotonic() >= catch_up_deadline:
+
+            if catch_up_time_budget_seconds:
+                log(f"{repo_key}; catch up time budget of {catch_up_time_budget_seconds} seconds used up after {batches_fetched} batches, {remaining_revs} revs remaining to catch up next run", "info")
+
+            break
+
+    # Publish the branches and tags, then run any git maintenance which is due, once after all batches
+    publish_refs_and_run_git_maintenance(repo_key, local_repo_path, git_default_branch, repo_lock_name)
+
+    # Return how many revisions are left to catch up, so the repos furthest behind get queued first on the next run
+    return remaining_revs
+
+
+def parse_svn_info_output(svn_info_output):
+
+    # Returns a dict of the "Key: value" lines from svn info's output, ex. Repository Root, Revision, and Last Changed Rev
+    svn_info_dict = {}
+
+    for svn_info_output_line in svn_info_output or []:
+
+        key, separator, value = svn_info_output_line.partition(": ")
+
+        if separator:
+            svn_info_dict[key] = value.strip()
+
+    return svn_info_dict
+
+
+def start_svn_repos_up_to_date_checks_in_bulk(repo_keys, dispatch_time):
+
+    # Most runs, most svn repos haven't changed, but finding that out in clone_svn_repo() costs a worker, and an svn info command, for each repo
+    # Instead, group the due svn repos by code host and credentials, and check each group with a few svn info commands, in a thread in the main process
+    # check_svn_repos_up_to_date_in_bulk() reschedules the repos which are up to date, without queueing them, the same as if a worker had found them up to date,
+    # and adds the rest to repos_bulk_checked_list, for dispatch_due_repos() to queue
+    # Returns the list of repo keys which still need to be queued now
+    global svn_bulk_check_executor
+
+    repo_groups_dict = {}
+    repo_keys_to_queue = []
+
+    for repo_key in repo_keys:
+
+        repo_config = repos_dict.get(repo_key, {})
+
+        # Git repos, and repos which are still queued, running, or being checked, go through the usual path
+        if (
+            repo_config.get("type", "").lower() not in ("svn", "subversion") or
+            not repo_config.get("svn-repo-code-root") or
+            repo_key in repo_conversion_tasks_dict or
+            repo_key in repos_bulk_checking_set
+        ):
+            repo_keys_to_queue.append(repo_key)
+            continue
+
+        repo_group_key = (repo_config.get("code-host-name"), repo_config.get("username"), repo_config.get("password"))
+        repo_groups_dict.setdefault(repo_group_key, []).append(repo_key)
+
+    if not repo_groups_dict:
+        return repo_keys_to_queue
+
+    # A few threads, so one unreachable svn server only holds up the checks of its own repos, until its circuit breaker opens
+    if svn_bulk_check_executor is None:
+        svn_bulk_check_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="svn-bulk-check")
+
+    for (code_host_name, username, password), group_repo_keys in repo_groups_dict.items():
+
+        with repo_schedule_lock:
+            repos_bulk_checking_set.update(group_repo_keys)
+
+        svn_bulk_check_executor.submit(check_svn_repos_up_to_date_in_bulk, code_host_name, username, password, group_repo_keys, dispatch_time)
+
+    return repo_keys_to_queue
+
+
+def check_svn_repos_up_to_date_in_bulk(code_host_name, username, password, repo_keys, dispatch_time):
+
+    # Runs in one of svn_bulk_check_executor's threads, for one group of repos with the same code host and credentials
+    # Get all of their last changed revisions with a few svn info commands, reschedule the repos which are up to date,
+    # then hand the rest back to dispatch_due_repos() to queue, even if the check failed
+    up_to_date_repo_keys = set()
+
+    try:
+
+        svn_urls_dict = {repo_key: repos_dict.get(repo_key, {}).get("svn-repo-code-root") for repo_key in repo_keys}
+
+        with trace_span("svn bulk up to date check", code_host=code_host_name, repos=len(repo_keys)):
+
+            last_changed_revisions_dict = get_svn_last_changed_revisions([svn_url for svn_url in svn_urls_dict.values() if svn_url], username, password, get_svn_config_dir(code_host_name), code_host_name)
+
+            for repo_key, svn_url in svn_urls_dict.items():
+
+                last_changed_rev = last_changed_revisions_dict.get(normalize_svn_url(svn_url)) if svn_url else None
+
+                if last_changed_rev is None or not is_svn_repo_up_to_date(repo_key, last_changed_rev):
+                    continue
+
+                log(f"{repo_key}; up to date, skipping without queueing; local rev {last_changed_rev}, remote rev {last_changed_rev}", "info")
+                record_metric("repo_converter_repo_remote_revision", last_changed_rev, repo=repo_key)
+                record_metric("repo_converter_repo_local_revision", last_changed_rev, repo=repo_key)
+                record_metric("repo_converter_repo_revision_lag", 0, repo=repo_key)
+                record_metric("repo_converter_bulk_up_to_date_skips_total", repo=repo_key)
+                up_to_date_repo_keys.add(repo_key)
+
+        log(f"{code_host_name}; bulk svn info check found {len(up_to_date_repo_keys)} of {len(repo_keys)} due repos up to date, got last changed revisions for {len(last_changed_revisions_dict)} paths", "debug")
+
+    except Exception as exception:
+
+        log(f"{code_host_name}; bulk svn info check raised an exception, queueing its {len(repo_keys)} repos to be checked by their workers: {type(exception)}, {exception.args}, {exception}; {traceback.format_exc()}", "error")
+
+    finally:
+
+        with repo_schedule_lock:
+
+            repos_bulk_checking_set.difference_update(repo_keys)
+            repos_bulk_checked_list.extend(repo_key for repo_key in repo_keys if repo_key not in up_to_date_repo_keys and repo_key in repos_dict)
+
+        for repo_key in up_to_date_repo_keys:
+            repo_conversion_finished(repo_key, dispatch_time, 0)
+
+        # Wake up the main loop to queue the rest
+        repo_schedule_wake_event.set()
+
+
+def normalize_svn_url(svn_url):
+
+    # svn prints URLs percent-encoded, without a trailing slash, repos-to-convert.yaml may have them either way
+    return urllib.parse.unquote(svn_url).rstrip("/")
+
+
+def get_svn_last_changed_revisions(svn_urls, username=None, password=None, svn_config_dir=None, code_host_name=None):
+
+    # Get the last changed revision of each of the svn_urls, on one svn server, with as few requests as possible
+    # Where two or more of the URLs are in the same parent directory, ex. https://svn.apache.org/repos/asf/*,
+    # one svn info --depth immediates of the parent gets the last changed revisions of all of its children in one request,
+    # then one svn info with the rest of the URLs as its targets
+    # Each svn info command goes through the code host's circuit breaker and rate limit, and stops at the first one they skip
+    # Returns a dict of {normalized URL: last changed revision}, without the URLs which svn info failed for, or which weren't checked
+    arg_svn_info    = [ "svn", "info", "--xml", "--non-interactive" ]
+    svn_info_batch_size = 100
+
+    if username:
+        arg_svn_info += [ "--username", username ]
+
+    if password:
+        arg_svn_info += [ "--password", password ]
+
+    if svn_config_dir:
+        arg_svn_info += [ "--config-dir", svn_config_dir ]
+
+    normalized_svn_urls = sorted({normalize_svn_url(svn_url) for svn_url in svn_urls})
+    svn_parent_urls_dict = {}
+
+    for svn_url in normalized_svn_urls:
+        svn_parent_urls_dict.setdefault(svn_url.rsplit("/", 1)[0], []).append(svn_url)
+
+    last_changed_revisions_dict = {}
+
+    for svn_parent_url, svn_child_urls in svn_parent_urls_dict.items():
+
+        if len(svn_child_urls) >= 2:
+
+            svn_info_last_changed_revisions_dict = run_svn_info_xml(arg_svn_info + [ "--depth", "immediates", urllib.parse.quote(svn_parent_url, safe=":/@") ], password, code_host_name)
+
+            if svn_info_last_changed_revisions_dict is None:
+                return {svn_url: last_changed_revisions_dict[svn_url] for svn_url in normalized_svn_urls if svn_url in last_changed_revisions_dict}
+
+            last_changed_revisions_dict.update(svn_info_last_changed_revisions_dict)
+
+    # Get the rest in batches of targets, to stay well under the OS' limit on the length of a command
+    remaining_svn_urls = [svn_url for svn_url in normalized_svn_urls if svn_url not in last_changed_revisions_dict]
+
+    for batch_start in range(0, len(remaining_svn_urls), svn_info_batch_size):
+
+        svn_info_last_changed_revisions_dict = run_svn_info_xml(arg_svn_info + [ urllib.parse.quote(svn_url, safe=":/@") for svn_url in remaining_svn_urls[batch_start:batch_start + svn_info_batch_size] ], password, code_host_name)
+
+        if svn_info_last_changed_revisions_dict is None:
+            break
+
+        last_changed_revisions_dict.update(svn_info_last_changed_revisions_dict)
+
+    return {svn_url: last_changed_revisions_dict[svn_url] for svn_url in normalized_svn_urls if svn_url in last_changed_revisions_dict}
+
+
+def run_svn_info_xml(args, password=None, code_host_name=None):
+
+    # Run an svn info --xml command, and parse the URL and last changed revision of each entry
+    # svn info keeps going if some of its targets fail, ex. a repo was deleted, so parse the entries it printed, even if it failed
+    # The command can probe the code host if its circuit breaker is half open, so always record its result
+    # Returns a dict of {normalized URL: last changed revision}, or None if the code host's circuit breaker or rate limit skipped the command
+    svn_info_output = []
+    svn_info_connection_failed = False
+
+    if not acquire_code_host_request("bulk up to date check", code_host_name, probe=True):
+        return None
+
+    try:
+
+        for svn_info_output_line in iterate_subprocess_output(args, password, bool(password), stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"]):
+            svn_info_output.append(svn_info_output_line)
+
+    except subprocess.TimeoutExpired as exception:
+
+        svn_info_connection_failed = True
+        log(f"{code_host_name}; svn info for the bulk up to date check stalled, the repos it didn't get are checked by their workers: {exception}", "warning")
+
+    except (OSError, subprocess.CalledProcessError) as exception:
+
+        svn_info_connection_failed = is_svn_connection_failure(str(getattr(exception, "stderr", "") or "").splitlines())
+        log(f"{code_host_name}; svn info for the bulk up to date check failed, the repos it didn't get are checked by their workers: {type(exception)}, {exception}, {getattr(exception, 'stderr', '')}", "warning")
+
+    finally:
+
+        record_code_host_request_result("bulk up to date check", code_host_name, not svn_info_connection_failed)
+
+    last_changed_revisions_dict = {}
+
+    try:
+
+        svn_info_root_element = ElementTree.fromstring("\n".join(svn_info_output))
+
+    except ElementTree.ParseError:
+        return last_changed_revisions_dict
+
+    for entry_element in svn_info_root_element.iter("entry"):
+
+        svn_url         = entry_element.findtext("url")
+        commit_element  = entry_element.find("commit")
+
+        if svn_url and commit_element is not None and str(commit_element.get("revision", "")).isdigit():
+            last_changed_revisions_dict[normalize_svn_url(svn_url)] = int(commit_element.get("revision"))
+
+    return last_changed_revisions_dict
+
+
+def is_svn_repo_up_to_date(repo_key, last_changed_rev):
+
+    # Check, from the files on disk, whether a worker would only find the repo up to date, and have nothing to do
+    # The same checks clone_svn_repo() makes, before publishing refs and running git maintenance for an up to date repo,
+    # plus whether publishing refs or git maintenance would do anything
+    repo_config     = repos_dict[repo_key]
+    local_repo_path = f"{environment_variables_dict['SRC_SERVE_ROOT']}/{repo_config.get('code-host-name')}/{repo_config.get('git-org-name')}/{repo_key}"
+
+    svn_remote_url = git_config_get(local_repo_path, "svn-remote.svn.rewriteRoot") or git_config_get(local_repo_path, "svn-remote.svn.url")
+
+    if not svn_remote_url or svn_remote_url not in repo_config["svn-repo-code-root"]:
+        return False
+
+    if git_config_get(local_repo_path, f"{git_config_namespace}.batch-end-revision") != str(last_changed_rev):
+        return False
+
+    # The branches and tags are published, and the default branch hasn't changed
+    snapshot_default_branch, snapshot_remote_refs_dict = read_published_refs_snapshot(f"{local_repo_path}/.git/{git_config_namespace}-published-refs")
+
+    if snapshot_default_branch != repo_config.get("git-default-branch", "trunk") or snapshot_remote_refs_dict != read_git_refs(local_repo_path, ("refs/remotes/",)):
+        return False
+
+    # No git maintenance is due, with the same thresholds as run_git_maintenance()
+    maintenance_state_dict = get_git_maintenance_state(local_repo_path)
+
+    full_repack_due = (
+        maintenance_state_dict["last_full_repack"] is None or
+        time.time() - maintenance_state_dict["last_full_repack"] >= environment_variables_dict["MAINTENANCE_FULL_REPACK_DAYS"] * 24 * 60 * 60
+    )
+
+    if (
+        (full_repack_due and is_in_maintenance_quiet_hours()) or
+        maintenance_state_dict["packs"] >= environment_variables_dict["MAINTENANCE_PACK_LIMIT"] or
+        maintenance_state_dict["loose_objects"] >= environment_variables_dict["MAINTENANCE_LOOSE_OBJECTS_LIMIT"]
+    ):
+        return False
+
+    return True
+
+
+def get_svn_mirror_path(svn_repository_root):
+
+    # Store each mirror under the svn server's host name and path, ex. SVN_MIRROR_DIR/svn.apache.org/repos/asf
+    svn_mirror_relative_path = re.sub(r"^[A-Za-z0-9+.-]+://", "", svn_repository_root).strip("/")
+    svn_mirror_relative_path = "/".join(path_part for path_part in svn_mirror_relative_path.split("/") if path_part not in ("", ".", ".."))
+
+    return f"{environment_variables_dict['SVN_MIRROR_DIR']}/{svn_mirror_relative_path}"
+
+
+def sync_svn_mirror(repo_key, svn_repository_root, svn_repository_uuid=None, username=None, password=None, svn_config_dir=None, code_host_name=None):
+
+    # Create a local svnsync mirror of the svn repository, if there isn't one yet, then sync the revisions committed since the last sync,
+    # with one svnsync command, which replays each revision in one request, instead of git svn's many requests per revision
+    # Returns the file:// URL of the mirror's root, or None if the mirror doesn't exist yet
+    svn_mirror_path     = get_svn_mirror_path(svn_repository_root)
+    svn_mirror_url      = f"file://{svn_mirror_path}"
+    svn_mirror_lock_name = f"svn-mirrors/{svn_mirror_path[len(environment_variables_dict['SVN_MIRROR_DIR']) + 1:]}"
+
+    arg_svnsync_source_credentials = []
+
+    if username:
+        arg_svnsync_source_credentials += [ "--source-username", username ]
+
+    if password:
+        arg_svnsync_source_credentials += [ "--source-password", password ]
+
+    # svnsync uses the same config dir for the svn server and the mirror, and the code host's settings only apply to the svn server's URL anyway
+    if svn_config_dir:
+        arg_svnsync_source_credentials += [ "--config-dir", svn_config_dir ]
+
+    # Only one process syncs each mirror at a time
+    # If another repo in the same svn repository is syncing it, then just use the revisions it's synced so far, instead of waiting
+    lock_acquired, lock_holder_dict = acquire_lock(svn_mirror_lock_name, "svn mirror sync")
+
+    if not lock_acquired:
+
+        log(f"{repo_key}; svn mirror {svn_mirror_path} is being synced by pid {lock_holder_dict.get('pid')}, using the revisions it's synced so far", "info")
+        return svn_mirror_url if os.path.isdir(svn_mirror_path) else None
+
+    try:
+
+        if not acquire_code_host_request(repo_key, code_host_name):
+            return svn_mirror_url if os.path.isdir(svn_mirror_path) else None
+
+        if not os.path.isdir(svn_mirror_path):
+
+            log(f"{repo_key}; creating svn mirror of {svn_repository_root} in {svn_mirror_path}", "info")
+
+            # Create and initialize the mirror in a temporary directory, then rename it into place, so a partly created mirror is never used
+            svn_mirror_temp_path = f"{svn_mirror_path}.tmp"
+            shutil.rmtree(svn_mirror_temp_path, ignore_errors=True)
+
+            try:
+                os.makedirs(os.path.dirname(svn_mirror_path), exist_ok=True)
+            except OSError as exception:
+                log(f"{repo_key}; failed to create svn mirror directory {os.path.dirname(svn_mirror_path)}; exception: {type(exception)}, {exception}", "warning")
+                return None
+
+            if subprocess_run(["svnadmin", "create", svn_mirror_temp_path])["returncode"] != 0:
+                return None
+
+            # svnsync stores its progress in revision properties, which svn only allows changing if the pre-revprop-change hook allows it
+            pre_revprop_change_hook_path = f"{svn_mirror_temp_path}/hooks/pre-revprop-change"
+
+            with open(pre_revprop_change_hook_path, "w") as pre_revprop_change_hook_file:
+                pre_revprop_change_hook_file.write("#!/bin/sh\nexit 0\n")
+
+            os.chmod(pre_revprop_change_hook_path, 0o755)
+
+            # Give the mirror the svn server's UUID, so git svn's metadata is the same as when it fetches from the svn server
+            if svn_repository_uuid:
+                subprocess_run(["svnadmin", "setuuid", svn_mirror_temp_path, svn_repository_uuid])
+
+            cmd_svnsync_initialize = ["svnsync", "initialize", f"file://{svn_mirror_temp_path}", svn_repository_root, "--non-interactive"] + arg_svnsync_source_credentials
+
+            if subprocess_run(cmd_svnsync_initialize, password, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"])["returncode"] != 0:
+
+                shutil.rmtree(svn_mirror_temp_path, ignore_errors=True)
+                return None
+
+            os.rename(svn_mirror_temp_path, svn_mirror_path)
+
+        # --steal-lock takes over svnsync's own lock in the mirror, if a previous svnsync was killed while holding it, as this process holds the flock
+        cmd_svnsync_synchronize = ["svnsync", "synchronize", svn_mirror_url, "--non-interactive", "--steal-lock"] + arg_svnsync_source_credentials
+
+        svnsync_start_time = time.monotonic()
+        svnsync_result = subprocess_run(cmd_svnsync_synchronize, password, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_FETCH"])
+        record_metric("repo_converter_svn_mirror_sync_duration_seconds", time.monotonic() - svnsync_start_time, repo=repo_key)
+
+        # If the sync failed part way through, the revisions it committed are still complete, so convert them, and retry the sync next run
+        if svnsync_result["returncode"] != 0:
+            log(f"{repo_key}; svnsync failed to sync svn mirror {svn_mirror_path}, using the revisions it's synced so far", "warning")
+
+        return svn_mirror_url
+
+    finally:
+
+        release_lock(svn_mirror_lock_name)
+
+
+def get_svn_revision_index_file_path(local_repo_path):
+
+    # Keep the index next to git svn's own metadata
+    return f"{local_repo_path}/.git/svn/{git_config_namespace}-revision-index"
+
+
+def read_svn_revision_index(revision_index_file_path, svn_remote_repo_code_root):
+
+    # The index file has a header line with the repo's svn URL, then one changed revision number per line, in ascending order
+    # Returns the list of revision numbers, or an empty list if the index doesn't exist, is for a different URL, or is invalid, so it gets rebuilt
+    revision_index = []
+
+    try:
+
+        with open(revision_index_file_path, "r") as revision_index_file:
+
+            if revision_index_file.readline().rstrip("\n") != f"# {svn_remote_repo_code_root}":
+                return []
+
+            for line in revision_index_file:
+
+                # Ignore a partial last line, ex. if the process was killed while appending to the file
+                if not line.endswith("\n"):
+                    break
+
+                revision = int(line)
+
+                if revision_index and revision <= revision_index[-1]:
+                    return []
+
+                revision_index.append(revision)
+
+    except (FileNotFoundError, ValueError, UnicodeDecodeError):
+        return []
+
+    return revision_index
+
+
+def update_svn_revision_index(repo_key, local_repo_path, svn_remote_repo_code_root, cmd_svn_log, last_changed_rev, password=None, echo_password=None, code_host_name=None):
+
+    # Only ask the svn server for revisions newer than the last one in the index, so the full log is only downloaded once
+    # Returns the updated list of revision numbers, or None if the svn log command failed
+    revision_index_file_path    = get_svn_revision_index_file_path(local_repo_path)
+    revision_index              = read_svn_revision_index(revision_index_file_path, svn_remote_repo_code_root)
+    last_indexed_revision       = revision_index[-1] if revision_index else 0
+
+    if last_indexed_revision >= last_changed_rev:
+        return revision_index
+
+    if not acquire_code_host_request(repo_key, code_host_name):
+        return None
+
+    cmd_svn_log_new_revisions = cmd_svn_log + ["--revision", f"{last_indexed_revision + 1}:{last_changed_rev}"]
+
+    stall_retries = environment_variables_dict["STALL_RETRIES"]
+
+    while True:
+
+        try:
+
+            new_revisions = [
+                svn_log_entry["revision"]
+                for svn_log_entry in iterate_svn_log_entries(cmd_svn_log_new_revisions, password, echo_password, environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_LOG"])
+                if svn_log_entry["revision"] > last_indexed_revision
+            ]
+
+            break
+
+        except subprocess.TimeoutExpired as exception:
+
+            if stall_retries <= 0:
+
+                log(f"{repo_key}; svn log stalled, out of retries; exception: {exception}", "warning")
+                return None
+
+            stall_retries -= 1
+            log(f"{repo_key}; svn log stalled, retrying, {stall_retries} retries remaining", "warning")
+            record_metric("repo_converter_retries_total", repo=repo_key, reason="svn log stalled")
+
+        except (subprocess.CalledProcessError, ElementTree.ParseError) as exception:
+
+            log(f"{repo_key}; failed to read new revisions from svn log; exception: {type(exception)}, {exception.args}, {exception}", "warning")
+            return None
+
+    # Rewrite the file with a new header if the index was rebuilt, otherwise just append the new revisions
+    if last_indexed_revision == 0:
+
+        os.makedirs(os.path.dirname(revision_index_file_path), exist_ok=True)
+        temp_file_path = f"{revision_index_file_path}.tmp"
+
+        with open(temp_file_path, "w") as revision_index_file:
+            revision_index_file.write(f"# {svn_remote_repo_code_root}\n")
+            revision_index_file.writelines(f"{revision}\n" for revision in new_revisions)
+
+        os.replace(temp_file_path, revision_index_file_path)
+
+    elif new_revisions:
+
+        with open(revision_index_file_path, "r+b") as revision_index_file:
+
+            # Truncate a partial last line, which read_svn_revision_index() ignored, so the new revisions aren't appended to it
+            # A partial line is only part of one revision number, and the header line ends before it, so the last few bytes have a newline
+            file_size = revision_index_file.seek(0, os.SEEK_END)
+            tail_size = min(file_size, 64)
+            revision_index_file.seek(file_size - tail_size)
+            tail = revision_index_file.read(tail_size)
+
+            revision_index_file.truncate(file_size - tail_size + tail.rfind(b"\n") + 1)
+            revision_index_file.seek(0, os.SEEK_END)
+            revision_index_file.write("".join(f"{revision}\n" for revision in new_revisions).encode())
+
+    log(f"{repo_key}; added {len(new_revisions)} revisions to the svn revision index, {len(revision_index) + len(new_revisions)} revisions total", "debug")
+
+    revision_index.extend(new_revisions)
+
+    return revision_index
+
+
+def iterate_svn_log_entries(args, password=None, echo_password=None, stall_timeout_seconds=0):
+
+    # Runs an svn log --xml command, and parses its stdout incrementally while it's still running,
+    # yielding a dict for each logentry, then discarding it, so memory use doesn't grow with the length of the log
+    # The dict has the revision number, and the author, date, and list of changed paths, if the command's args include them
+    # Raises subprocess.CalledProcessError if the command fails, subprocess.TimeoutExpired if it stalls, or ElementTree.ParseError if the output isn't valid XML
+
+    xml_parser          = ElementTree.XMLPullParser(events=("start", "end"))
+    xml_root_element    = None
+
+    svn_log_output = iterate_subprocess_output(args, password, echo_password, read_chunk_size=64 * 1024, stall_timeout_seconds=stall_timeout_seconds)
+
+    try:
+
+        # An empty chunk after the last one, to close the parser and read its last events
+        for stdout_chunk in itertools.chain(svn_log_output, [b""]):
+
+            if stdout_chunk:
+                xml_parser.feed(stdout_chunk)
+            else:
+                xml_parser.close()
+
+            for event, element in xml_parser.read_events():
+
+                if event == "start":
+
+                    if xml_root_element is None:
+                        xml_root_element = element
+
+                    continue
+
+                if element.tag != "logentry":
+                    continue
+
+                yield {
+                    "revision"  : int(element.get("revision")),
+                    "author"    : element.findtext("author"),
+                    "date"      : element.findtext("date"),
+                    "paths"     : [path_element.text for path_element in element.iterfind("paths/path")],
+                }
+
+                # Drop the parsed logentries from the tree
+                xml_root_element.clear()
+
+    finally:
+
+        # Stop the svn log process if the caller stopped iterating early, or parsing failed
+        svn_log_output.close()
+
+
+def publish_refs_and_run_git_maintenance(repo_key, local_repo_path, git_default_branch, repo_lock_name):
+
+    # Publish the branches and tags first, so git maintenance packs the refs it creates
+    update_lock_phase(repo_lock_name, "publish refs")
+    publish_refs_start_time = time.monotonic()
+    cleanup_branches_and_tags(repo_key, local_repo_path, git_default_branch)
+    record_metric("repo_converter_publish_refs_duration_seconds", time.monotonic() - publish_refs_start_time, repo=repo_key)
+
+    maintenance_start_time = time.monotonic()
+    run_git_maintenance(repo_key, local_repo_path, repo_lock_name)
+    record_metric("repo_converter_maintenance_duration_seconds", time.monotonic() - maintenance_start_time, repo=repo_key)
+
+
+def parse_git_svn_fetch_output_line(output_line, git_svn_fetch_progress_dict):
+
+    # git svn fetch prints a line for each changed file, then a line for each revision it commits, ex.
+    # r1234 = 0123456789abcdef0123456789abcdef01234567 (refs/remotes/origin/trunk)
+    # Count the revisions, and keep the last one, so progress is known while the fetch is running, and after it fails
+    if not output_line.startswith("r"):
+        return
+
+    revision, separator, _ = output_line[1:].partition(" = ")
+
+    if separator and revision.isdigit():
+        git_svn_fetch_progress_dict["revisions_fetched"]        += 1
+        git_svn_fetch_progress_dict["last_revision_fetched"]    = int(revision)
+
+
+def tune_fetch_batch_size(repo_key, local_repo_path, batch_size, batch_revisions, batch_duration_seconds, batch_succeeded, target_seconds, max_batch_size):
+
+    # Measure the revisions per second of the batch which just finished, and size the next batch to take target_seconds
+    # Store the measurements and the tuned size in the repo's git config, so they're kept across runs and container restarts
+
+    previous_revisions_per_second = git_config_get(local_repo_path, f"{git_config_namespace}.fetch-revisions-per-second")
+
+    # The last batch of a catch up is short, because there weren't enough revisions remaining to fill it, so its throughput,
+    # which includes git svn's fixed startup time, would shrink the batch size; keep the batch size, unless even this short batch overran the target
+    if batch_succeeded and batch_revisions < batch_size and batch_duration_seconds <= target_seconds:
+
+        log(f"{repo_key}; fetched {batch_revisions} revisions in {batch_duration_seconds:.1f} seconds, fewer than the batch size {batch_size}, keeping the batch size", "debug")
+        return batch_size
+
+    if batch_succeeded:
+
+        revisions_per_second = batch_revisions / max(batch_duration_seconds, 0.001)
+
+        # Smooth out the measurement with the previous batches, so one unusually large or small commit doesn't swing the batch size
+        # Unless this batch overran the target, then shrink the next batch right away
+        if previous_revisions_per_second and batch_duration_seconds <= target_seconds:
+            revisions_per_second = (revisions_per_second + float(previous_revisions_per_second)) / 2
+
+        # Grow by at most double the previous batch, in case the throughput of the next revisions is very different
+        next_batch_size = int(revisions_per_second * target_seconds)
+        next_batch_size = min(next_batch_size, max(batch_size, batch_revisions) * 2)
+
+    else:
+
+        # If the batch failed, it may have been too large to finish, so try a smaller batch next time
+        revisions_per_second = float(previous_revisions_per_second or 0)
+        next_batch_size = batch_size // 2
+
+    next_batch_size = max(1, min(next_batch_size, max_batch_size))
+
+    git_config_set_values(local_repo_path, {
+        f"{git_config_namespace}.fetch-batch-size"              : str(next_batch_size),
+        f"{git_config_namespace}.fetch-batch-duration-seconds"  : f"{batch_duration_seconds:.1f}",
+        f"{git_config_namespace}.fetch-revisions-per-second"    : f"{revisions_per_second:.3f}",
+    })
+
+    log(f"{repo_key}; fetched {batch_revisions} revisions in {batch_duration_seconds:.1f} seconds, {revisions_per_second:.3f} revisions per second; next batch size {next_batch_size}, to take {target_seconds} seconds", "info")
+
+    return next_batch_size
+
+
+def split_git_config_key(key):
+
+    # Split a git config key into GitPython's section and option names
+    # ex. svn-remote.svn.url -> ('svn-remote "svn"', "url"), repo-converter.batch-end-revision -> ("repo-converter", "batch-end-revision")
+    section, _, option = key.rpartition(".")
+
+    if "." in section:
+        section, subsection = section.split(".", 1)
+        section = f'{section} "{subsection}"'
+
+    return section, option
+
+
+def read_git_config(local_repo_path):
+
+    # Parse the repo's .git/config file in-process with GitPython, instead of forking a git config process for each key
+    # Cache the parsed file until it changes on disk; writes replace the file, so a new inode means new content
+    git_config_file_path = f"{local_repo_path}/.git/config"
+
+    try:
+        git_config_file_stat = os.stat(git_config_file_path)
+    except FileNotFoundError:
+        git_config_cache_dict.pop(git_config_file_path, None)
+        return None
+
+    git_config_file_version = (git_config_file_stat.st_ino, git_config_file_stat.st_mtime_ns, git_config_file_stat.st_size)
+    cached_git_config = git_config_cache_dict.get(git_config_file_path)
+
+    if cached_git_config and cached_git_config[0] == git_config_file_version:
+        return cached_git_config[1]
+
+    git_config_parser = git.GitConfigParser(git_config_file_path, read_only=True, merge_includes=False)
+    git_config_parser.read()
+    git_config_cache_dict[git_config_file_path] = (git_config_file_version, git_config_parser)
+
+    return git_config_parser
+
+
+def git_config_get(local_repo_path, key):
+
+    # Returns the value of the key in the repo's git config as a string, or None if it isn't set
+    git_config_parser = read_git_config(local_repo_path)
+
+    if git_config_parser is None:
+        return None
+
+    section, option = split_git_config_key(key)
+
+    if not git_config_parser.has_option(section, option):
+        return None
+
+    return git_config_parser.get(section, option)
+
+
+def git_config_set(local_repo_path, key, value):
+
+    return git_config_set_values(local_repo_path, {key: value})
+
+
+def git_config_set_values(local_repo_path, keys_and_values_dict):
+
+    # Set one or more keys in the repo's git config, replacing any existing values, same as git config --replace-all
+    # Skip the write if the values are already set, otherwise write all of them in one atomic replace of the file,
+    # holding git's own config.lock file, so a git process can't write the file at the same time
+    # Only the lines of the keys which changed are rewritten, so the rest of the file keeps its text, ex. quoted values, continued lines, and comments
+    # Returns True if the values are set, False if the config couldn't be written
+    git_config_file_path    = f"{local_repo_path}/.git/config"
+    git_config_lock_path    = f"{git_config_file_path}.lock"
+
+    changed_keys_and_values_dict = {key: str(value) for key, value in keys_and_values_dict.items() if git_config_get(local_repo_path, key) != str(value)}
+
+    if not changed_keys_and_values_dict:
+        return True
+
+    try:
+        git_config_lock_fd = os.open(git_config_lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        log(f"{local_repo_path}; couldn't set git config {keys_and_values_dict}, {git_config_lock_path} exists", "warning")
+        return False
+
+    temp_git_config_file_path = None
+
+    try:
+
+        # surrogateescape keeps any bytes which aren't valid UTF-8 as they were, and newline="" keeps the file's line endings
+        with open(git_config_file_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as git_config_file:
+            git_config_lines = git_config_file.readlines()
+
+        git_config_lines = replace_git_config_values(git_config_lines, changed_keys_and_values_dict)
+
+        # Write a copy, then replace the original with it
+        temp_git_config_fd, temp_git_config_file_path = tempfile.mkstemp(dir=os.path.dirname(git_config_file_path), prefix="config.repo-converter.")
+
+        with open(temp_git_config_fd, "w", encoding="utf-8", errors="surrogateescape", newline="") as temp_git_config_file:
+            temp_git_config_file.writelines(git_config_lines)
+            temp_git_config_file.flush()
+            os.fsync(temp_git_config_file.fileno())
+
+        os.replace(temp_git_config_file_path, git_config_file_path)
+        temp_git_config_file_path = None
+
+    except Exception as exception:
+
+        log(f"{local_repo_path}; failed to set git config {keys_and_values_dict}; exception: {type(exception)}, {exception}", "error")
+        return False
+
+    finally:
+
+        os.close(git_config_lock_fd)
+        os.remove(git_config_lock_path)
+
+        if temp_git_config_file_path and os.path.exists(temp_git_config_file_path):
+            os.remove(temp_git_config_file_path)
+
+    return True
+
+
+def replace_git_config_values(git_config_lines, keys_and_values_dict):
+
+    # Edit the lines of a git config file, same as git config --replace-all for each key
+    # The first line of each key is replaced with its new value, and its other lines are removed, including their continued lines;
+    # keys which aren't set are added at the end of the last block of their section, or in a new section at the end of the file
+    # Section names and option names are case insensitive, subsection names are case sensitive, same as git
+    # Returns the new list of lines
+    keys_to_set_dict = {}
+
+    for key, value in keys_and_values_dict.items():
+
+        section, _, option = key.rpartition(".")
+        section, _, subsection = section.partition(".")
+        keys_to_set_dict[(section.lower(), subsection or None, option.lower())] = (option, value)
+
+    new_git_config_lines    = []
+    keys_written            = set()
+    section_end_indexes     = {}
+    current_section         = None
+    line_continues          = False
+    line_removed            = False
+
+    for git_config_line in git_config_lines:
+
+        # Continued lines belong to the key on the line before them
+        if line_continues:
+
+            line_continues = git_config_line_continues(git_config_line)
+
+            if not line_removed:
+                new_git_config_lines.append(git_config_line)
+                section_end_indexes[current_section] = len(new_git_config_lines)
+
+            continue
+
+        line_removed        = False
+        section_header      = re.match(r'\s*\[\s*([A-Za-z0-9.-]+)(?:\s+"((?:[^"\\\n]|\\.)*)")?\s*\]', git_config_line)
+        option_match        = re.match(r"\s*([A-Za-z][A-Za-z0-9-]*)\s*(?:[=;#\r\n]|$)", git_config_line)
+
+        if section_header:
+
+            section_name, subsection = section_header.group(1), section_header.group(2)
+
+            # The deprecated [section.subsection] syntax, where the subsection is case insensitive
+            if subsection is None and "." in section_name:
+                section_name, subsection = section_name.lower().split(".", 1)
+            elif subsection is not None:
+                subsection = re.sub(r"\\(.)", r"\1", subsection)
+
+            current_section = (section_name.lower(), subsection)
+
+        elif option_match and current_section:
+
+            key_to_set = current_section + (option_match.group(1).lower(),)
+            line_continues = git_config_line_continues(git_config_line)
+
+            if key_to_set in keys_to_set_dict:
+
+                line_removed = True
+
+                if key_to_set in keys_written:
+                    continue
+
+                keys_written.add(key_to_set)
+                git_config_line = format_git_config_option_line(*keys_to_set_dict[key_to_set])
+
+        new_git_config_lines.append(git_config_line)
+
+        # Track the end of each section's keys, not its trailing blank lines or comments, to add new keys after it
+        if current_section and (section_header or option_match):
+            section_end_indexes[current_section] = len(new_git_config_lines)
+
+    # Add the keys which weren't set, after the last line of the last block of their section
+    lines_to_insert_dict = {}
+
+    for key_to_set, (option, value) in keys_to_set_dict.items():
+
+        if key_to_set in keys_written:
+            continue
+
+        section = key_to_set[:2]
+
+        if section not in section_end_indexes:
+
+            section_name, subsection = section
+
+            if subsection is None:
+                section_header_line = f"[{section_name}]\n"
+            else:
+                escaped_subsection  = subsection.replace("\\", "\\\\").replace('"', '\\"')
+                section_header_line = f'[{section_name} "{escaped_subsection}"]\n'
+
+            if new_git_config_lines and not new_git_config_lines[-1].endswith("\n"):
+                new_git_config_lines[-1] += "\n"
+
+            new_git_config_lines.append(section_header_line)
+            section_end_indexes[section] = len(new_git_config_lines)
+
+        lines_to_insert_dict.setdefault(section_end_indexes[section], []).append(format_git_config_option_line(option, value))
+
+    for insert_index in sorted(lines_to_insert_dict, reverse=True):
+
+        if insert_index == len(new_git_config_lines) and new_git_config_lines and not new_git_config_lines[-1].endswith("\n"):
+            new_git_config_lines[-1] += "\n"
+
+        new_git_config_lines[insert_index:insert_index] = lines_to_insert_dict[insert_index]
+
+    return new_git_config_lines
+
+
+def git_config_line_continues(git_config_line):
+
+    # Returns True if the line ends with a \ outside of a comment, so its value continues on the next line
+    in_quotes = False
+    character_index = 0
+    git_config_line = git_config_line.rstrip("\r\n")
+
+    while character_index < len(git_config_line):
+
+        character = git_config_line[character_index]
+
+        if character == "\\":
+
+            if character_index == len(git_config_line) - 1:
+                return True
+
+            character_index += 1
+
+        elif character == '"':
+            in_quotes = not in_quotes
+
+        elif character in "#;" and not in_quotes:
+            return False
+
+        character_index += 1
+
+    return False
+
+
+def format_git_config_option_line(option, value):
+
+    # Format a key's line the same as git config writes it, quoting the value if it has leading or trailing spaces, or a comment character,
+    # and escaping backslashes, quotes, tabs, and newlines
+    escaped_value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\t", "\\t").replace("\n", "\\n")
+
+    if value != value.strip() or "#" in value or ";" in value:
+        escaped_value = f'"{escaped_value}"'
+
+    return f"\t{option} = {escaped_value}\n"
+
+
+def git_head_get(local_repo_path):
+
+    # Returns the ref which the repo's HEAD points to, ex. refs/heads/main, or None if HEAD is missing or detached
+    try:
+
+        with open(f"{local_repo_path}/.git/HEAD", "r") as head_file:
+            head_file_content = head_file.read().strip()
+
+    except FileNotFoundError:
+        return None
+
+    if head_file_content.startswith("ref: "):
+        return head_file_content[len("ref: "):]
+
+    return None
+
+
+def git_head_set(local_repo_path, git_default_branch):
+
+    # Point the repo's HEAD to the default branch, same as git symbolic-ref HEAD refs/heads/<branch>, skipping the write if it already does
+    # Write HEAD.lock, then rename it over HEAD, same as git does, so HEAD is never partially written
+    head_ref = f"refs/heads/{git_default_branch}"
+
+    if git_head_get(local_repo_path) == head_ref:
+        return True
+
+    head_file_path = f"{local_repo_path}/.git/HEAD"
+    head_lock_path = f"{head_file_path}.lock"
+
+    try:
+
+        with open(head_lock_path, "x") as head_lock_file:
+            head_lock_file.write(f"ref: {head_ref}\n")
+            head_lock_file.flush()
+            os.fsync(head_lock_file.fileno())
+
+    except FileExistsError:
+
+        log(f"{local_repo_path}; couldn't set HEAD to {head_ref}, {head_lock_path} exists", "warning")
+        return False
+
+    os.replace(head_lock_path, head_file_path)
+
+    return True
+
+
+def plan_svn_fetch_batch(revision_index, previous_batch_end_revision, fetch_batch_size):
+
+    # Binary search the sorted revision index for the first revision after the previous batch
+    # Returns a tuple of (batch start revision, batch end revision, count of revisions remaining), or (None, None, 0) if there are no revisions remaining
+    next_revision_position  = bisect.bisect_right(revision_index, previous_batch_end_revision)
+    remaining_revs          = len(revision_index) - next_revision_position
+
+    if remaining_revs <= 0:
+        return None, None, 0
+
+    batch_start_revision    = revision_index[next_revision_position]
+    batch_end_revision      = revision_index[next_revision_position + min(remaining_revs, max(fetch_batch_size, 1)) - 1]
+
+    return batch_start_revision, batch_end_revision, remaining_revs
+
+
+def get_git_maintenance_state(local_repo_path):
+
+    # Measure the repo's object storage from the filesystem, without running git
+    objects_path = f"{local_repo_path}/.git/objects"
+
+    maintenance_state_dict = {
+        "loose_objects"     : 0,
+        "packs"             : 0,
+        "pack_bytes"        : 0,
+        "last_full_repack"  : None,
+    }
+
+    # Estimate the number of loose objects the same way git gc --auto does,
+    # by counting the objects in one of the 256 directories which loose objects are spread across, and multiplying by 256
+    try:
+
+        with os.scandir(f"{objects_path}/17") as loose_objects_directory:
+            maintenance_state_dict["loose_objects"] = 256 * sum(1 for entry in loose_objects_directory if len(entry.name) == 38)
+
+    except FileNotFoundError:
+        pass
+
+    try:
+
+        with os.scandir(f"{objects_path}/pack") as packs_directory:
+
+            for entry in packs_directory:
+
+                if entry.name.endswith(".pack"):
+                    maintenance_state_dict["packs"]        += 1
+                    maintenance_state_dict["pack_bytes"]   += entry.stat().st_size
+
+    except FileNotFoundError:
+        pass
+
+    last_full_repack = git_config_get(local_repo_path, f"{git_config_namespace}.maintenance-last-full-repack")
+
+    if last_full_repack:
+        maintenance_state_dict["last_full_repack"] = float(last_full_repack)
+
+    return maintenance_state_dict
+
+
+def is_in_maintenance_quiet_hours():
+
+    # MAINTENANCE_QUIET_HOURS is a range of hours, ex. 1-5 for 01:00 to 04:59, or 22-4 to wrap around midnight
+    quiet_hours = environment_variables_dict["MAINTENANCE_QUIET_HOURS"]
+
+    if not quiet_hours:
+        return True
+
+    try:
+
+        start_hour, end_hour = (int(hour) for hour in quiet_hours.split("-"))
+
+    except ValueError:
+
+        log(f"MAINTENANCE_QUIET_HOURS={quiet_hours} isn't in the format start-end, ex. 1-5, running full repacks at any time", "warning")
+        return True
+
+    current_hour = datetime.now().hour
+
+    if start_hour <= end_hour:
+        return start_hour <= current_hour < end_hour
+
+    return current_hour >= start_hour or current_hour < end_hour
+
+
+def get_repack_window_memory(pack_bytes):
+
+    # Size git repack's --window-memory from the memory available to each worker, and the size of the repo, between 100 MB and 10 GB
+    megabyte = 1024 * 1024
+    available_bytes_per_worker = psutil.virtual_memory().available // max(1, environment_variables_dict["MAX_CONCURRENT_REPOS"])
+    window_memory_bytes = min(available_bytes_per_worker // 2, max(pack_bytes, 100 * megabyte), 10 * 1024 * megabyte)
+    window_memory_bytes = max(window_memory_bytes, 100 * megabyte)
+
+    return f"{window_memory_bytes // megabyte}m"
+
+
+def run_git_maintenance(repo_key, local_repo_path, repo_lock_name):
+
+    # Instead of running git gc after every fetch, decide which maintenance tasks the repo needs from its measured state,
+    # and run the cheapest ones which get it back under the limits
+    maintenance_state_dict  = get_git_maintenance_state(local_repo_path)
+    arg_git                 = [ "git", "-C", local_repo_path ]
+    now                     = time.time()
+    stall_timeout_seconds   = environment_variables_dict["STALL_TIMEOUT_SECONDS_MAINTENANCE"]
+
+    update_lock_phase(repo_lock_name, "git maintenance")
+
+    # Pack the refs every time, as it's cheap, so the loose refs which git svn fetch and cleanup_branches_and_tags() create don't pile up
+    subprocess_run(arg_git + [ "pack-refs", "--all", "--prune" ], stall_timeout_seconds=stall_timeout_seconds)
+
+    # A full repack is due if the repo has never had one, or the last one was MAINTENANCE_FULL_REPACK_DAYS ago,
+    # but it's the most expensive task, so only run it during quiet hours
+    full_repack_due = (
+        maintenance_state_dict["last_full_repack"] is None or
+        now - maintenance_state_dict["last_full_repack"] >= environment_variables_dict["MAINTENANCE_FULL_REPACK_DAYS"] * 24 * 60 * 60
+    )
+
+    if full_repack_due and is_in_maintenance_quiet_hours():
+
+        window_memory = get_repack_window_memory(maintenance_state_dict["pack_bytes"])
+        log(f"{repo_key}; running full repack with sg_maintenance.sh and --window-memory {window_memory}; maintenance state: {maintenance_state_dict}", "info")
+
+        update_lock_phase(repo_lock_name, "git full repack")
+        sg_maintenance_script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sg_maintenance.sh")
+        sg_maintenance_result = subprocess_run([ "bash", sg_maintenance_script_path, local_repo_path, window_memory ], stall_timeout_seconds=stall_timeout_seconds)
+
+        if sg_maintenance_result["returncode"] == 0:
+            git_config_set(local_repo_path, f"{git_config_namespace}.maintenance-last-full-repack", str(int(now)))
+
+        return
+
+    # Combine the packs into a geometric progression of sizes, which also packs the loose objects, and only rewrites the smaller packs
+    if maintenance_state_dict["packs"] >= environment_variables_dict["MAINTENANCE_PACK_LIMIT"]:
+
+        log(f"{repo_key}; running geometric repack; maintenance state: {maintenance_state_dict}", "info")
+        update_lock_phase(repo_lock_name, "git geometric repack")
+        subprocess_run(arg_git + [ "repack", "-d", "-q", "--geometric=2" ], stall_timeout_seconds=stall_timeout_seconds)
+
+    # Pack the loose objects into a new pack, without touching the existing packs
+    elif maintenance_state_dict["loose_objects"] >= environment_variables_dict["MAINTENANCE_LOOSE_OBJECTS_LIMIT"]:
+
+        log(f"{repo_key}; packing loose objects; maintenance state: {maintenance_state_dict}", "info")
+        update_lock_phase(repo_lock_name, "git pack loose objects")
+        subprocess_run(arg_git + [ "repack", "-d", "-q" ], stall_timeout_seconds=stall_timeout_seconds)
+
+    else:
+
+        log(f"{repo_key}; no git maintenance needed{', full repack waiting for MAINTENANCE_QUIET_HOURS' if full_repack_due else ''}; maintenance state: {maintenance_state_dict}", "debug")
+
+
+def clone_tfs_repos():
+    log("Cloning TFS repos function not implemented yet", "warning")
+
+    # # Declare an empty dict for TFS repos to extract them from the repos_dict
+    # tfs_repos_dict = {}
+
+    # # Loop through the repos_dict, find the type: tfs repos, then add them to the dict of TFS repos
+    # for repo_key in repos_dict.keys():
+
+    #     repo_type = repos_dict[repo_key].get('type','').lower()
+
+    #     if repo_type == 'tfs' or repo_type == 'tfvc':
+
+    #         tfs_repos_dict[repo_key] = repos_dict[repo_key]
+
+
+    # log(f"Cloning TFS repos: {str(tfs_repos_dict)}", "info")
+
+
+def clone_git_repos():
+
+    # Add the new type: Git repos to the schedule, they're fetched by the same pool of workers as the SVN repos
+    schedule_new_repos("Git", ("git",))
+
+
+def clone_git_repo(repo_key):
+
+    # Mirror a Git repo into SRC_SERVE_ROOT, with a first fetch into an empty repo, then incremental fetches of only the refs in git-refspecs
+    # Returns 0 if the repo is up to date, or None if the fetch failed
+
+    # Get config parameters read from repos-to-clone.yaml, and set defaults if they're not provided
+    git_repo_name               = repo_key
+    code_host_name              = repos_dict[repo_key].get("code-host-name"       , None    )
+    git_default_branch          = repos_dict[repo_key].get("git-default-branch"   , None    )
+    git_org_name                = repos_dict[repo_key].get("git-org-name"         , None    )
+    git_refspecs                = repos_dict[repo_key].get("git-refspecs"         , [ "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*" ])
+    git_repo_url                = repos_dict[repo_key].get("git-repo-url"         , None    )
+    password                    = repos_dict[repo_key].get("password"             , None    )
+    username                    = repos_dict[repo_key].get("username"             , None    )
+
+    if isinstance(git_refspecs, str):
+        git_refspecs = [ git_refspecs ]
+
+    if not git_repo_url:
+
+        log(f"{repo_key}; git-repo-url is required for type: Git repos, skipping", "error")
+        return
+
+    local_repo_path = f"{environment_variables_dict['SRC_SERVE_ROOT']}/{code_host_name}/{git_org_name}/{git_repo_name}"
+    repo_lock_name  = get_repo_lock_name(repo_key)
+
+    # Add the username to the URL for this process' commands, and the password to their environment, so they're never written to the repo's config on disk
+    git_fetch_url                               = get_git_url_with_username(git_repo_url, username)
+    arg_git_credentials, git_credentials_env    = get_git_credentials_args_and_env(git_repo_url, password)
+
+    ## Define commands
+    arg_git                         =           [ "git", "-C", local_repo_path                  ]
+    # --atomic updates all refs in one transaction, so src serve-git never serves a partly fetched set of branches and tags
+    # --prune deletes the refs which were deleted on the remote, only from the destinations of git-refspecs
+    # run_git_maintenance() packs the repo after the fetch, instead of git's auto maintenance
+    cmd_git_fetch                   = arg_git + arg_git_credentials + [ "fetch", "--atomic", "--prune", "--no-tags", "--no-write-fetch-head", "--no-auto-maintenance", git_fetch_url ] + git_refspecs
+    cmd_git_ls_remote               =           [ "git" ] + arg_git_credentials + [ "ls-remote", "--symref", git_fetch_url ]
+
+    clear_stale_git_lock_files(repo_key, local_repo_path)
+
+    # Create the repo if it doesn't exist, same layout as the SVN repos, a .git directory with core.bare = true
+    if not git_config_get(local_repo_path, "core.bare"):
+
+        log(f"{repo_key}; didn't find a local clone, creating one", "info")
+
+        os.makedirs(local_repo_path, exist_ok=True)
+        subprocess_run(arg_git + [ "init", "--quiet" ])
+        git_config_set(local_repo_path, "core.bare", "true")
+
+    # List the remote's refs, which is one round trip, and doesn't download any objects
+    update_lock_phase(repo_lock_name, "git ls-remote")
+    git_ls_remote = subprocess_run(cmd_git_ls_remote, quiet=True, output_tail_lines=None, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_SVN_INFO"], env=git_credentials_env)
+
+    if git_ls_remote["returncode"] != 0:
+
+        log(f"{repo_key}; git ls-remote failed; skipping this run to retry next run; output: {git_ls_remote['output'][-5:]}", "warning")
+        return
+
+    remote_refs_dict, remote_head_ref = parse_git_ls_remote_output(git_ls_remote["output"])
+    remote_refs_dict = filter_refs_by_refspecs(remote_refs_dict, git_refspecs)
+
+    # The snapshot has the remote ref tips from the last successful fetch, and the refspecs they were fetched with
+    remote_refs_snapshot_file_path = f"{local_repo_path}/.git/{git_config_namespace}-remote-refs"
+    remote_refs_snapshot_header = f"# {git_repo_url} {' '.join(git_refspecs)}"
+
+    if read_git_remote_refs_snapshot(remote_refs_snapshot_file_path, remote_refs_snapshot_header) == remote_refs_dict:
+
+        log(f"{repo_key}; up to date, skipping fetch; {len(remote_refs_dict)} remote refs unchanged", "info")
+
+    else:
+
+        log(f"{repo_key}; fetching {len(remote_refs_dict)} remote refs with git fetch {' '.join(git_refspecs)}", "info")
+        update_lock_phase(repo_lock_name, "git fetch")
+
+        git_fetch_start_time = time.monotonic()
+        git_fetch = subprocess_run(cmd_git_fetch, stall_timeout_seconds=environment_variables_dict["STALL_TIMEOUT_SECONDS_FETCH"], env=git_credentials_env)
+        record_metric("repo_converter_fetch_duration_seconds", time.monotonic() - git_fetch_start_time, repo=repo_key)
+
+        # If the fetch failed, --atomic didn't update any refs, so the next run fetches them all again
+        if git_fetch["returncode"] != 0:
+
+            log(f"{repo_key}; git fetch failed; skipping this run to retry next run; output: {git_fetch['output'][-5:]}", "warning")
+            return
+
+        write_git_remote_refs_snapshot(remote_refs_snapshot_file_path, remote_refs_snapshot_header, remote_refs_dict)
+
+    # Set the default branch to the one in the config, or the remote's default branch
+    if not git_default_branch and remote_head_ref and remote_head_ref.startswith("refs/heads/"):
+        git_default_branch = remote_head_ref[len("refs/heads/"):]
+
+    if git_default_branch:
+        git_head_set(local_repo_path, git_default_branch)
+
+    maintenance_start_time = time.monotonic()
+    run_git_maintenance(repo_key, local_repo_path, repo_lock_name)
+    record_metric("repo_converter_maintenance_duration_seconds", time.monotonic() - maintenance_start_time, repo=repo_key)
+
+    return 0
+
+
+def get_git_url_with_username(git_repo_url, username=None):
+
+    # Add the username to an http(s) URL, URL encoded, ex. https://username@github.com/org/repo.git
+    # SSH and file URLs are returned as is, SSH uses the keys mounted into the container
+    if not username or not git_repo_url.startswith(("http://", "https://")):
+        return git_repo_url
+
+    url_scheme, _, url_rest = git_repo_url.partition("://")
+
+    return f"{url_scheme}://{urllib.parse.quote(username, safe='')}@{url_rest}"
+
+
+def get_git_credentials_args_and_env(git_repo_url, password=None):
+
+    # Give git the password from an environment variable, through a credential helper, instead of in the URL,
+    # so the password is never in a command's args, which are logged, and visible to other processes in ps
+    # The first credential.helper= clears any helpers from the container's git config, so git doesn't store the password
+    # GIT_TERMINAL_PROMPT=0 fails the command, instead of prompting for a password, if the credentials are wrong
+    git_credentials_env = {"GIT_TERMINAL_PROMPT": "0"}
+
+    if not password or not git_repo_url.startswith(("http://", "https://")):
+        return [], git_credentials_env
+
+    git_credentials_env["REPO_CONVERTER_GIT_PASSWORD"] = password
 
-    # Check if a fetch or log process is currently running for this repo
-    try:
+    arg_git_credentials = [
+        "-c", "credential.helper=",
+        "-c", 'credential.helper=!f() { test "$1" = get && echo "password=$REPO_CONVERTER_GIT_PASSWORD"; }; f',
+    ]
+
+    return arg_git_credentials, git_credentials_env
 
-        # Get running processes, both as a list and string
-        ps_command = ["ps", "--no-headers", "-e", "--format", "pid,args"]
-        running_processes = subprocess_run(ps_command)["output"]
-        running_processes_string        = " ".join(running_processes)
 
-        # Define the list of strings we're looking for in the running processes' commands
-        cmd_git_svn_fetch_string            = " ".join(cmd_git_svn_fetch)
-        cmd_git_garbage_collection_string   = " ".join(cmd_git_garbage_collection)
-        cmd_svn_log_string                  = " ".join(cmd_svn_log)
-        process_name                        = f"clone_svn_repo_{repo_key}"
-        log_failure_message                 = ""
+def parse_git_ls_remote_output(git_ls_remote_output):
 
-        # In priority order
-        concurrency_error_strings_and_messages = [
-            (process_name,                      "Previous process still"                ),
-            (cmd_git_svn_fetch_string,          "Previous fetching process still"       ),
-            (cmd_svn_log_string,                "Previous svn log process still"        ),
-            (cmd_git_garbage_collection_string, "Git garbage collection process still"  ),
-            (local_repo_path,                   "Local repo path in process"            ), # Problem: if one repo's name is a substring of another repo's name
-        ]
+    # Returns a tuple of ({ref: object hash}, the ref which the remote's HEAD points to, or None)
+    # Skips HEAD, and the peeled hashes of annotated tags, which end with ^{}
+    remote_refs_dict    = {}
+    remote_head_ref     = None
 
-        # Loop through the list of strings we're looking for, to check the running processes for each of them
-        for concurrency_error_string_and_message in concurrency_error_strings_and_messages:
+    for git_ls_remote_line in git_ls_remote_output:
 
-            # If this string we're looking for is found
-            if concurrency_error_string_and_message[0] in running_processes_string:
+        object_hash_or_symref, _, ref = git_ls_remote_line.partition("\t")
 
-                # Find which process it's in
-                for i in range(len(running_processes)):
+        if object_hash_or_symref.startswith("ref: "):
 
-                    running_process = running_processes[i]
-                    pid, args = running_process.lstrip().split(" ", 1)
+            if ref == "HEAD":
+                remote_head_ref = object_hash_or_symref[len("ref: "):]
 
-                    # If it's this process, and this process hasn't already matched one of the previous concurrency errors
-                    if (
-                        concurrency_error_string_and_message[0] in args and
-                        pid not in log_failure_message
-                    ):
+            continue
 
-                        # Add its message to the string
-                        log_failure_message += f"{concurrency_error_string_and_message[1]} running in pid {pid}; "
+        if ref and ref != "HEAD" and not ref.endswith("^{}"):
+            remote_refs_dict[ref] = object_hash_or_symref
 
-                        # Calculate its running time
-                        # Quite often, processes will complete when get_process_uptime() checks them; if this is the case, then try this check again
-                        process_running_time = get_process_uptime(pid)
-                        if process_running_time:
+    return remote_refs_dict, remote_head_ref
 
-                            log_failure_message += f"running for {process_running_time}; "
 
-                        else:
+def filter_refs_by_refspecs(refs_dict, git_refspecs):
 
-                            # Check the process again to see if it's still running
-                            log(f"{repo_key}; pid {pid} with command {args} completed while checking for concurrency collisions, will try checking again", "debug")
-                            i -= 1
+    # Keep the refs which match the source side of any of the refspecs, and don't match any negative refspecs, which start with ^
+    # A * in a refspec matches any characters, including /, same as git
+    # A source without a * or refs/ is a short name, ex. main, which git fetch expands with the same rules as git rev-parse;
+    # it fetches the first of the expanded refs which the remote has, and a negative short name excludes all of them
+    include_patterns = []
+    exclude_patterns = []
 
-                        log_failure_message += f"with command: {args}; "
+    for git_refspec in git_refspecs:
 
-        if log_failure_message:
+        refspec_source = git_refspec.lstrip("+").split(":", 1)[0]
+        is_exclude = refspec_source.startswith("^")
+        refspec_source = refspec_source.lstrip("^")
 
-            log_failure_message = f"{repo_key}; {log_failure_message}skipping"
-            log(log_failure_message, "info")
-            return
+        if not refspec_source:
+            continue
 
-    except Exception as exception:
+        if "*" in refspec_source or refspec_source.startswith("refs/"):
+            refspec_source_refs = [ refspec_source ]
+        else:
+            refspec_source_refs = [ short_name_rule.format(refspec_source) for short_name_rule in git_short_ref_name_rules ]
 
-        # repo-converter  | 2024-03-14 10:46:41; run.py; WARNING; ant; Failed to check if fetching process is already running, will try to start it.
-        # Exception: <class 'FileNotFoundError'>, (2, 'No such file or directory'), [Errno 2] No such file or directory: '/proc/16/cwd'
-        log(f"{repo_key}; Failed to check if fetching process is already running, will try to start it. Exception: {type(exception)}, {exception.args}, {exception}", "warning")
+        if is_exclude:
+            exclude_patterns.extend(re.compile(".*".join(re.escape(part) for part in ref.split("*")) + "$") for ref in refspec_source_refs)
+        elif len(refspec_source_refs) > 1:
 
-        stack = traceback.extract_stack()
-        (filename, line, procname, text) = stack[-1]
+            first_matching_ref = next((ref for ref in refspec_source_refs if ref in refs_dict), None)
 
-        log(f"filename, line, procname, text: {filename, line, procname, text}", "warning")
+            if first_matching_ref:
+                include_patterns.append(re.compile(re.escape(first_matching_ref) + "$"))
 
-        raise exception
+        else:
+            include_patterns.append(re.compile(".*".join(re.escape(part) for part in refspec_source.split("*")) + "$"))
+
+    return {
+        ref: object_hash
+        for ref, object_hash in refs_dict.items()
+        if any(pattern.match(ref) for pattern in include_patterns) and not any(pattern.match(ref) for pattern in exclude_patterns)
+    }
+
+
+def read_git_remote_refs_snapshot(remote_refs_snapshot_file_path, remote_refs_snapshot_header):
+
+    # Returns the dict of {ref: object hash} from the last successful fetch, or None if the file is missing, or for a different URL or refspecs
+    remote_refs_dict = {}
 
-    ## Check if we're in the Update state
-    # Check if the git repo already exists and has the correct settings in the config file
     try:
 
-        svn_remote_url = subprocess_run(cmd_git_get_svn_url, quiet=True)["output"][0]
+        with open(remote_refs_snapshot_file_path, "r") as remote_refs_snapshot_file:
 
-        if svn_remote_url in svn_remote_repo_code_root:
+            if remote_refs_snapshot_file.readline().rstrip("\n") != remote_refs_snapshot_header:
+                return None
 
-            repo_state = "update"
+            for remote_refs_snapshot_line in remote_refs_snapshot_file:
 
-    except Exception as exception:
-        # Get an error when trying to git config --get svn-remote.svn.url, when the directory doesn't exist on disk
-        # WARNING; karaf; failed to check git config --get svn-remote.svn.url. Exception: <class 'TypeError'>, ("'NoneType' object is not subscriptable",), 'NoneType' object is not subscriptable
-        log(f"{repo_key}; failed to check git config --get svn-remote.svn.url. Exception: {type(exception)}, {exception.args}, {exception}", "warning")
+                object_hash, _, ref = remote_refs_snapshot_line.rstrip("\n").partition(" ")
+                remote_refs_dict[ref] = object_hash
 
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
 
-    ## Run commands
-    # Run the svn info command to test logging in to the SVN server, for network connectivity and credentials
-    # Capture the output so we know the max revision in this repo's history
-    svn_info = subprocess_run(cmd_svn_info, password, arg_svn_echo_password)
-    svn_info_output_string = " ".join(svn_info["output"])
+    return remote_refs_dict
 
-    if svn_info["returncode"] != 0:
 
-        # The clone_svn_repo function runs in its own process, get this process' start time
-        # Check for current time < start time + REPO_CONVERTER_INTERVAL_SECONDS, to ensure that this retry is not extending beyond the interval
-        process_create_time = psutil.Process(os.getpid()).create_time()
+def write_git_remote_refs_snapshot(remote_refs_snapshot_file_path, remote_refs_snapshot_header, remote_refs_dict):
 
-        # Let it retry up top 80% of the time remaining until the next REPO_CONVERTER_INTERVAL_SECONDS, so this process doesn't overrun the current interval
-        retry_time_limit = process_create_time + int(environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"] * 0.8)
+    # Write to a temp file, then rename it over the snapshot, so a partly written snapshot can't skip the next fetch
+    temp_file_path = f"{remote_refs_snapshot_file_path}.tmp"
 
-        # Set a maximum retry delay of one third of REPO_CONVERTER_INTERVAL_SECONDS, so it can retry 2-3 times, or 60 seconds, whichever is shorter
-        retry_delay_range = min(int(environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"] / 3), 60)
+    with open(temp_file_path, "w") as remote_refs_snapshot_file:
+        remote_refs_snapshot_file.write(f"{remote_refs_snapshot_header}\n")
+        remote_refs_snapshot_file.writelines(f"{object_hash} {ref}\n" for ref, object_hash in sorted(remote_refs_dict.items()))
 
-        # Set a maximum number of retries per script run
-        retry_attempts_max  = 3
-        retries_attempted   = 0
+    os.replace(temp_file_path, remote_refs_snapshot_file_path)
 
-        svn_connection_failure_message_to_check_for = "Unable to connect to a repository at"
 
-        while (
-            svn_connection_failure_message_to_check_for in svn_info_output_string and
-            time.time() < retry_time_limit and
-            retries_attempted < retry_attempts_max
-        ):
+def read_git_refs(local_repo_path, ref_prefixes):
 
-            retries_attempted += 1
-            retry_delay_seconds = random.randrange(1, retry_delay_range)
+    # Read the refs which start with any of the ref_prefixes, from both .git/packed-refs and loose ref files, without running git
+    # Returns a dict of {ref: object hash}, where loose refs override packed refs, same as git, and symbolic refs are skipped
+    git_dir_path    = f"{local_repo_path}/.git"
+    git_refs_dict   = {}
 
-            log(f"{repo_key}; Failed to connect to repo remote, retrying {retries_attempted} of max {retry_attempts_max} times, with a semi-random delay of {retry_delay_seconds} seconds", "warning")
+    try:
 
-            time.sleep(retry_delay_seconds)
+        with open(f"{git_dir_path}/packed-refs", "r") as packed_refs_file:
 
-            svn_info = subprocess_run(cmd_svn_info, password, arg_svn_echo_password)
-            svn_info_output_string = " ".join(svn_info["output"])
+            for packed_refs_line in packed_refs_file:
 
-        if svn_info["returncode"] != 0:
+                # Skip the header, and the peeled hashes of annotated tags, which start with ^
+                if packed_refs_line.startswith(("#", "^")):
+                    continue
 
-            log_failure_message = ""
+                object_hash, _, ref = packed_refs_line.rstrip("\n").partition(" ")
 
-            if retries_attempted == retry_attempts_max:
-                log_failure_message = f"hit retry count limit {retry_attempts_max} for this run"
+                if ref.startswith(ref_prefixes):
+                    git_refs_dict[ref] = object_hash
 
-            elif not time.time() < retry_time_limit:
-                log_failure_message = f"hit retry time limit for this run"
+    except FileNotFoundError:
+        pass
 
-            log(f"{repo_key}; Failed to connect to repo remote, {log_failure_message}, skipping", "error")
-            return
+    for ref_prefix in ref_prefixes:
 
-        else:
+        for directory_path, _, file_names in os.walk(f"{git_dir_path}/{ref_prefix.rstrip('/')}"):
 
-            log(f"{repo_key}; Successfully connected to repo remote after {retries_attempted} retries", "warning")
+            for file_name in file_names:
 
-    # Get last changed revision for this repo
-    last_changed_rev = svn_info_output_string.split("Last Changed Rev: ")[1].split(" ")[0]
+                # Skip lock files left behind, they're not refs
+                if file_name.endswith(".lock"):
+                    continue
 
-    # Check if the previous batch end revision is the same as the last changed rev from svn info
-    # If yes, we're up to date, return to the next repo, instead of forking the git svn process to do the same check
-    if repo_state == "update":
+                loose_ref_file_path = f"{directory_path}/{file_name}"
+                ref = os.path.relpath(loose_ref_file_path, git_dir_path)
 
-        #  TypeError: 'NoneType' object is not subscriptable
-        try:
-            previous_batch_end_revision = subprocess_run(cmd_git_get_batch_end_revision)["output"][0]
-        except Exception as exception:
-            previous_batch_end_revision = "1"
+                try:
 
-        if previous_batch_end_revision == last_changed_rev:
+                    with open(loose_ref_file_path, "r") as loose_ref_file:
+                        object_hash = loose_ref_file.read().strip()
 
-            log(f"{repo_key}; up to date, skipping; local rev {previous_batch_end_revision}, remote rev {last_changed_rev}", "info")
+                except (FileNotFoundError, UnicodeDecodeError):
+                    continue
 
-            # Run git garbage collection and cleanup branches, even if repo is already up to date
-            subprocess_run(cmd_git_garbage_collection)
-            cleanup_branches_and_tags(local_repo_path, cmd_git_default_branch, git_default_branch)
+                if object_hash and not object_hash.startswith("ref:"):
+                    git_refs_dict[ref] = object_hash
 
-            return
+    return git_refs_dict
 
-        else:
 
-            cmd_svn_log_remaining_revs = cmd_svn_log + ["--revision", f"{previous_batch_end_revision}:HEAD"]
-            svn_log_remaining_revs = subprocess_run(cmd_svn_log_remaining_revs, password, arg_svn_echo_password)["output"]
-            svn_log_remaining_revs_string = " ".join(svn_log_remaining_revs)
-            remaining_revs = svn_log_remaining_revs_string.count("revision=")
-            log(f"{repo_key}; out of date; local rev {previous_batch_end_revision}, remote rev {last_changed_rev}, {remaining_revs} revs remaining to catch up, fetching next batch of {min(remaining_revs,fetch_batch_size)} revisions", "info")
+def get_published_refs(remote_refs_dict, git_default_branch):
 
+    # Git svn and git tfs both create converted branches as remote branches, so the Sourcegraph clone doesn't show them to users
+    # Map the remote branches and tags to the local branches and tags which Sourcegraph users should see
+    # Returns a dict of {local ref: object hash}
+    local_branch_prefix         = "refs/heads/"
+    local_tag_prefix            = "refs/tags/"
+    remote_branch_prefix        = "refs/remotes/origin/"
+    remote_tag_prefix           = "refs/remotes/origin/tags/"
 
-    if repo_state == "create":
+    # Filter out the junk, ex. git svn creates refs/remotes/origin/tags/v1.0@1234 for the history of a tag which was replaced
+    remote_branch_exclusions    = [
+        "@",
+    ]
+    remote_tag_exclusions       = [
+        "@",
+    ]
 
-        log(f"{repo_key}; didn't find a local clone, creating one", "info")
+    published_refs_dict = {}
 
-        # Create the repo path if it doesn't exist
-        if not os.path.exists(local_repo_path):
-            os.makedirs(local_repo_path)
+    for remote_ref, object_hash in remote_refs_dict.items():
 
-        if layout:
-            cmd_git_svn_init   += ["--stdlayout"]
+        # If the path is a remote tag, then copy it to a local tag
+        if remote_ref.startswith(remote_tag_prefix):
 
-            # Warn the user if they provided an invalid value for the layout, only standard is supported
-            if "standard" not in layout and "std" not in layout:
-                log(f"{repo_key}; Layout shortcut provided with incorrect value {layout}, only standard is supported for the shortcut, continuing assuming standard, otherwise provide --trunk, --tags, and --branches", "warning")
+            if not any(exclusion in remote_ref for exclusion in remote_tag_exclusions):
+                published_refs_dict[remote_ref.replace(remote_tag_prefix, local_tag_prefix, 1)] = object_hash
 
-        # There can only be one trunk
-        if trunk:
-            cmd_git_svn_init            += ["--trunk", trunk]
+        # If the path is a remote branch, then copy it to a local branch
+        elif remote_ref.startswith(remote_branch_prefix):
 
-        # Tags and branches can either be single strings or lists of strings
-        if tags:
-            if isinstance(tags, str):
-                cmd_git_svn_init        += ["--tags", tags]
-            if isinstance(tags, list):
-                for tag in tags:
-                    cmd_git_svn_init    += ["--tags", tag]
-        if branches:
-            if isinstance(branches, str):
-                cmd_git_svn_init        += ["--branches", branches]
-            if isinstance(branches, list):
-                for branch in branches:
-                    cmd_git_svn_init    += ["--branches", branch]
+            if not any(exclusion in remote_ref for exclusion in remote_branch_exclusions):
+                published_refs_dict[remote_ref.replace(remote_branch_prefix, local_branch_prefix, 1)] = object_hash
 
-        # Initialize the repo
-        subprocess_run(cmd_git_svn_init, password, arg_svn_echo_password)
+    # git svn's default remote branch becomes the default local branch, even if there's a remote branch with the same name
+    if "refs/remotes/git-svn" in remote_refs_dict:
+        published_refs_dict[f"{local_branch_prefix}{git_default_branch}"] = remote_refs_dict["refs/remotes/git-svn"]
 
-        # Configure the bare clone
-        if bare_clone:
-            subprocess_run(cmd_git_bare_clone)
+    return published_refs_dict
 
-        # Initialize this config with a 0 value
-        cmd_git_set_batch_end_revision.append(str(0))
-        subprocess_run(cmd_git_set_batch_end_revision)
 
+def read_published_refs_snapshot(published_refs_snapshot_file_path):
 
-    ## Back to steps we do for both Create and Update states, so users can update the below parameters without having to restart the clone from scratch
-    # TODO: Check if these configs are already set the same before trying to set them
+    # The snapshot file has a header line with the default branch name, then a line for each remote ref, "hash ref", as of the last publish
+    # Returns a tuple of (default branch name, {remote ref: object hash}), or (None, None) if there's no snapshot
+    try:
 
-    # Set the default branch local to this repo, after init
-    subprocess_run(cmd_git_default_branch)
+        with open(published_refs_snapshot_file_path, "r") as published_refs_snapshot_file:
 
-    # Configure the authors file, if provided
-    if authors_file_path:
-        if os.path.exists(authors_file_path):
-            subprocess_run(cmd_git_authors_file)
-        else:
-            log(f"{repo_key}; authors file not found at {authors_file_path}, skipping configuring it", "warning")
+            header_line = published_refs_snapshot_file.readline().rstrip("\n")
 
-    # Configure the authors program, if provided
-    if authors_prog_path:
-        if os.path.exists(authors_prog_path):
-            subprocess_run(cmd_git_authors_prog)
-        else:
-            log(f"{repo_key}; authors prog not found at {authors_prog_path}, skipping configuring it", "warning")
+            if not header_line.startswith("# "):
+                return None, None
 
-    # Configure the .gitignore file, if provided
-    if git_ignore_file_path:
-        if os.path.exists(git_ignore_file_path):
-            shutil.copy2(git_ignore_file_path, local_repo_path)
-        else:
-            log(f"{repo_key}; .gitignore file not found at {git_ignore_file_path}, skipping configuring it", "warning")
+            remote_refs_dict = {}
 
-    # Batch processing
-    batch_start_revision    = None
-    batch_end_revision      = None
+            for snapshot_line in published_refs_snapshot_file:
 
-    try:
+                object_hash, _, remote_ref = snapshot_line.rstrip("\n").partition(" ")
+                remote_refs_dict[remote_ref] = object_hash
 
-        # Get the revision number to start with
-        if repo_state == "update":
+            return header_line[2:], remote_refs_dict
 
-            # Try to retrieve repo-converter.batch-end-revision from git config
-            # previous_batch_end_revision = git config --get repo-converter.batch-end-revision
-            # Need to fail gracefully
-            previous_batch_end_revision = subprocess_run(cmd_git_get_batch_end_revision)["output"]
+    except FileNotFoundError:
+        return None, None
 
-            if previous_batch_end_revision:
 
-                batch_start_revision = int(" ".join(previous_batch_end_revision)) + 1
+def write_published_refs_snapshot(published_refs_snapshot_file_path, git_default_branch, remote_refs_dict):
 
-        if repo_state == "create" or batch_start_revision == None:
+    # Write to a temp file, then rename it over the snapshot, so the snapshot is never partially written
+    temp_file_path = f"{published_refs_snapshot_file_path}.tmp"
 
-            # If this is a new repo, get the first changed revision number for this repo from the svn server log
-            cmd_svn_log_batch_start_revision = cmd_svn_log + ["--limit", "1", "--revision", "1:HEAD"]
-            svn_log_batch_start_revision = subprocess_run(cmd_svn_log_batch_start_revision, password, arg_svn_echo_password)["output"]
-            batch_start_revision = int(" ".join(svn_log_batch_start_revision).split("revision=\"")[1].split("\"")[0])
+    with open(temp_file_path, "w") as published_refs_snapshot_file:
+        published_refs_snapshot_file.write(f"# {git_default_branch}\n")
+        published_refs_snapshot_file.writelines(f"{remote_refs_dict[remote_ref]} {remote_ref}\n" for remote_ref in sorted(remote_refs_dict))
 
-        # Get the revision number to end with
-        if batch_start_revision:
+    os.replace(temp_file_path, published_refs_snapshot_file_path)
 
-            # Get the batch size'th revision number for the rev to end this batch range
-            cmd_svn_log_batch_end_revision = cmd_svn_log + ["--limit", str(fetch_batch_size), "--revision", f"{batch_start_revision}:HEAD"]
-            cmd_svn_log_batch_end_revision_output = subprocess_run(cmd_svn_log_batch_end_revision, password, arg_svn_echo_password)["output"]
 
-            try:
+def cleanup_branches_and_tags(repo_key, local_repo_path, git_default_branch):
 
-                # While we're at it, update the batch starting rev to the first real rev number after the previous end rev +1
-                batch_start_revision = int(" ".join(cmd_svn_log_batch_end_revision_output).split("revision=\"")[1].split("\"")[0])
+    # Publish the converted remote branches and tags as local branches and tags, so Sourcegraph users can see them
+    # Compare the remote refs with a snapshot of them from the last publish, and skip the rest if the fetch didn't change any,
+    # otherwise, apply only the changed local refs, in one atomic git update-ref transaction, so src serve-git never sees a partial update
+    # Returns True if the local refs are up to date
+    published_refs_snapshot_file_path = f"{local_repo_path}/.git/{git_config_namespace}-published-refs"
 
-                # Reverse the output so we can get the last revision number
-                cmd_svn_log_batch_end_revision_output.reverse()
-                batch_end_revision = int(" ".join(cmd_svn_log_batch_end_revision_output).split("revision=\"")[1].split("\"")[0])
+    remote_refs_dict = read_git_refs(local_repo_path, ("refs/remotes/",))
+    snapshot_default_branch, snapshot_remote_refs_dict = read_published_refs_snapshot(published_refs_snapshot_file_path)
 
-            except IndexError as exception:
-                log(f"{repo_key}; IndexError when getting batch start or end revisions for batch size {fetch_batch_size}, skipping this run to retry next run", "warning")
-                return
+    # Reset the default branch
+    git_head_set(local_repo_path, git_default_branch)
 
-                # log(f"{repo_key}; IndexError when getting batch start or end revisions for batch size {fetch_batch_size}; running the fetch without the batch size limit; exception: {type(exception)}, {exception.args}, {exception}", "warning")
-                #  <class 'IndexError'>, ('list index out of range',), list index out of range
-                # Need to handle the issue where revisions seem to be out of order on the server
+    if snapshot_default_branch == git_default_branch and snapshot_remote_refs_dict == remote_refs_dict:
 
-        # If we were successful getting both starting and ending revision numbers
-        if batch_start_revision and batch_end_revision:
+        log(f"{repo_key}; no branch or tag changes since the last publish, {len(remote_refs_dict)} remote refs", "debug")
+        return True
 
-            # Use them
-            cmd_git_svn_fetch += ["--revision", f"{batch_start_revision}:{batch_end_revision}"]
+    # Compare the local refs which should be published, with the local refs which are there now
+    published_refs_dict = get_published_refs(remote_refs_dict, git_default_branch)
+    local_refs_dict     = read_git_refs(local_repo_path, ("refs/heads/", "refs/tags/"))
+    ref_transaction     = []
+    ref_changes_count   = {"create": 0, "update": 0, "delete": 0}
 
-    except Exception as exception:
+    for local_ref in sorted(published_refs_dict):
 
-        # Log a warning if this fails, and run the fetch without the --revision arg
-        # log(f"{repo_key}; failed to get batch start or end revision for batch size {fetch_batch_size}; running the fetch without the batch size limit; exception: {type(exception)}, {exception.args}, {exception}", "warning")
+        object_hash = published_refs_dict[local_ref]
 
-        log(f"{repo_key}; failed to get batch start or end revision for batch size {fetch_batch_size}; skipping this run to retry next run; exception: {type(exception)}, {exception.args}, {exception}", "warning")
-        return
+        if local_ref not in local_refs_dict:
+            ref_transaction.append(f"create {local_ref} {object_hash}")
+            ref_changes_count["create"] += 1
 
-    # Start the fetch
-    cmd_git_svn_fetch_string_may_have_batch_range = " ".join(cmd_git_svn_fetch)
-    log(f"{repo_key}; fetching with {cmd_git_svn_fetch_string_may_have_batch_range}", "info")
-    git_svn_fetch_result = subprocess_run(cmd_git_svn_fetch, password, password)
+        elif local_refs_dict[local_ref] != object_hash:
+            ref_transaction.append(f"update {local_ref} {object_hash} {local_refs_dict[local_ref]}")
+            ref_changes_count["update"] += 1
 
-    # If the fetch succeed, and if we have a batch_end_revision
-    if git_svn_fetch_result["returncode"] == 0 and batch_end_revision:
+    # Delete local refs which aren't published from a remote ref, ex. branches and tags which were deleted in svn
+    invalid_refs = []
 
-        # Store the ending revision number
-        cmd_git_set_batch_end_revision.append(str(batch_end_revision))
-        subprocess_run(cmd_git_set_batch_end_revision)
+    for local_ref in sorted(set(local_refs_dict) - set(published_refs_dict)):
 
-    # Run Git garbage collection before handing off to cleanup branches and tags
-    subprocess_run(cmd_git_garbage_collection)
+        # git update-ref can't delete a ref with an invalid name, ex. refs/heads//main which git svn creates, delete it from packed-refs below
+        if "//" in local_ref:
+            invalid_refs.append(local_ref)
+            continue
 
-    cleanup_branches_and_tags(local_repo_path, cmd_git_default_branch, git_default_branch)
+        ref_transaction.append(f"delete {local_ref} {local_refs_dict[local_ref]}")
+        ref_changes_count["delete"] += 1
 
+    # Git refuses to rewrite a packed-refs file with an invalid ref name in it, so delete them before the transaction, which may delete packed refs
+    if invalid_refs:
 
-def clone_tfs_repos():
-    log("Cloning TFS repos function not implemented yet", "warning")
+        if not delete_invalid_packed_refs(repo_key, local_repo_path, invalid_refs):
 
-    # # Declare an empty dict for TFS repos to extract them from the repos_dict
-    # tfs_repos_dict = {}
+            log(f"{repo_key}; failed to delete refs with invalid names: {invalid_refs}; will retry next run", "error")
+            return False
 
-    # # Loop through the repos_dict, find the type: tfs repos, then add them to the dict of TFS repos
-    # for repo_key in repos_dict.keys():
+        ref_changes_count["delete"] += len(invalid_refs)
 
-    #     repo_type = repos_dict[repo_key].get('type','').lower()
+    if ref_transaction:
 
-    #     if repo_type == 'tfs' or repo_type == 'tfvc':
+        # git update-ref --stdin applies all of the updates or none of them, and verifies each ref's old value, so it fails if another process changed it
+        ref_transaction_result = subprocess_run(
+            [ "git", "-C", local_repo_path, "update-ref", "--stdin" ],
+            input_text = "".join(f"{ref_update}\n" for ref_update in ref_transaction),
+        )
 
-    #         tfs_repos_dict[repo_key] = repos_dict[repo_key]
+        if ref_transaction_result["returncode"] != 0:
 
+            log(f"{repo_key}; failed to publish branch and tag changes: {ref_changes_count}; will retry next run", "error")
+            return False
 
-    # log(f"Cloning TFS repos: {str(tfs_repos_dict)}", "info")
+    # Save the snapshot after the transaction succeeded, so a failed transaction is retried next run
+    write_published_refs_snapshot(published_refs_snapshot_file_path, git_default_branch, remote_refs_dict)
 
+    log(f"{repo_key}; published branch and tag changes: {ref_changes_count}; {len(published_refs_dict)} branches and tags published from {len(remote_refs_dict)} remote refs", "info")
 
-def clone_git_repos():
-    log("Cloning Git repos function not implemented yet", "warning")
+    return True
 
 
-def cleanup_branches_and_tags(local_repo_path, cmd_git_default_branch, git_default_branch):
+def delete_invalid_packed_refs(repo_key, local_repo_path, invalid_refs):
 
-    # Git svn and git tfs both create converted branches as remote branches, so the Sourcegraph clone doesn't show them to users
-    # Need to convert the remote branches to local branches, so Sourcegraph users can see them
+    # Delete refs with invalid names from .git/packed-refs, which is the only place they can be, as a loose ref's file path can't contain //
+    # Write the new file to git's own packed-refs.lock, then rename it over packed-refs, same as git does, so no git process writes it at the same time
+    # Returns True if the refs were deleted
+    packed_refs_file_path   = f"{local_repo_path}/.git/packed-refs"
+    packed_refs_lock_path   = f"{packed_refs_file_path}.lock"
+    invalid_refs            = set(invalid_refs)
 
-    packed_refs_file_path       = f"{local_repo_path}/.git/packed-refs"
+    try:
+        packed_refs_lock_fd = os.open(packed_refs_lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        log(f"{repo_key}; couldn't delete refs with invalid names, {packed_refs_lock_path} exists", "warning")
+        return False
 
-    local_branch_prefix         = "refs/heads/"
-    local_tag_prefix            = "refs/tags/"
-    remote_branch_prefix        = "refs/remotes/origin/"
-    remote_tag_prefix           = "refs/remotes/origin/tags/"
+    try:
 
-    remote_branch_exclusions    = [
-        "@",
-    ]
-    remote_tag_exclusions       = [
-        "@",
-    ]
+        with open(packed_refs_file_path, "r") as packed_refs_file:
+            packed_refs_lines = packed_refs_file.readlines()
 
-    # Read the file content as lines into a list
-    with open(packed_refs_file_path, "r") as packed_refs_file:
-        input_lines = packed_refs_file.read().splitlines()
+        new_packed_refs_lines   = []
+        deleting_ref            = False
 
-    output_list_of_strings_and_line_number_tuples = []
-    output_list_of_reversed_tuples = []
+        for packed_refs_line in packed_refs_lines:
 
-    for i in range(len(input_lines)):
+            # A ^ line has the peeled hash of the annotated tag on the line before it, so it goes with that ref
+            if packed_refs_line.startswith("^"):
 
-        try :
+                if not deleting_ref:
+                    new_packed_refs_lines.append(packed_refs_line)
 
-            hash, path = input_lines[i].split(" ")
+                continue
 
-        except ValueError:
+            deleting_ref = not packed_refs_line.startswith("#") and packed_refs_line.rstrip("\n").partition(" ")[2] in invalid_refs
 
-            output_list_of_strings_and_line_number_tuples.append([str(input_lines[i]), i])
+            if not deleting_ref:
+                new_packed_refs_lines.append(packed_refs_line)
 
-            continue
+        with open(packed_refs_lock_fd, "w", closefd=False) as packed_refs_lock_file:
+            packed_refs_lock_file.writelines(new_packed_refs_lines)
+            packed_refs_lock_file.flush()
+            os.fsync(packed_refs_lock_file.fileno())
 
-        except Exception as exception:
+        os.replace(packed_refs_lock_path, packed_refs_file_path)
 
-            log(f"Exception while cleaning branches and tags: {exception}", "error")
-            continue
+    except OSError as exception:
 
-        # If the path is a local tag, then delete it
-        if path.startswith(local_tag_prefix):
-            continue
+        log(f"{repo_key}; failed to delete refs with invalid names from {packed_refs_file_path}; exception: {type(exception)}, {exception}", "error")
 
-        # If the path is a local branch, then delete it
-        elif path.startswith(local_branch_prefix):
-            continue
+        if os.path.exists(packed_refs_lock_path):
+            os.remove(packed_refs_lock_path)
 
-        # If the path is the git-svn's default remote branch, then keep it as is, and add a new default local branch
-        elif path == "refs/remotes/git-svn":
+        return False
 
-            output_list_of_reversed_tuples.append(tuple([path,hash]))
-            output_list_of_reversed_tuples.append(tuple([f"{local_branch_prefix}{git_default_branch}",hash]))
+    finally:
 
-        # If the path is the default branch, then delete it, it'll get recreated later
-        elif path == f"{local_branch_prefix}{git_default_branch}":
-            continue
+        os.close(packed_refs_lock_fd)
 
-        # If the path is the incorrectly formatted default branch, then delete it
-        elif path == f"{local_branch_prefix}/{git_default_branch}":
-            continue
+    log(f"{repo_key}; deleted refs with invalid names: {sorted(invalid_refs)}", "info")
 
-        # If the path is a remote tag, then copy it to a local path
-        elif path.startswith(remote_tag_prefix):
+    return True
 
-            output_list_of_reversed_tuples.append(tuple([path,hash]))
 
-            # Filter out the junk
-            # If none of the exclusions are in this path, then use it
-            filter=(exclusion in path for exclusion in remote_tag_exclusions)
-            if not any(filter):
+def get_subprocess_command_name(args):
 
-                new_path = path.replace(remote_tag_prefix, local_tag_prefix)
-                output_list_of_reversed_tuples.append(tuple([new_path,hash]))
+    # Get a short name for the command, without its paths and arguments, to use as a metric label, ex. git svn fetch, svn log, sg_maintenance.sh
+    command_args = list(args)
 
-        # If the path is a remote branch, then copy it to a local path
-        elif path.startswith(remote_branch_prefix):
+    if os.path.basename(command_args[0]) == "git":
 
-            output_list_of_reversed_tuples.append(tuple([path,hash]))
+        # Skip git's global options, ex. -C local_repo_path
+        command_args = command_args[1:]
 
-            # Filter out the junk
-            # If none of the exclusions are in this path, then use it
-            filter=(exclusion in path for exclusion in remote_branch_exclusions)
-            if not any(filter):
+        while command_args and command_args[0].startswith("-"):
+            command_args = command_args[2:] if command_args[0] == "-C" else command_args[1:]
 
-                new_path = path.replace(remote_branch_prefix, local_branch_prefix)
-                output_list_of_reversed_tuples.append(tuple([new_path,hash]))
+        if not command_args:
+            return "git"
 
-        else:
+        return "git " + " ".join(command_args[:2] if command_args[0] == "svn" and len(command_args) > 1 else command_args[:1])
 
-            log(f"Error while cleaning branches and tags, not sure how to handle line {input_lines[i]} in {packed_refs_file_path}", "error")
-            output_list_of_strings_and_line_number_tuples.append([str(input_lines[i]), i])
+    if os.path.basename(command_args[0]) == "svn" and len(command_args) > 1:
+        return f"svn {command_args[1]}"
 
-    # Sort by the path in the tuple
-    output_list_of_reversed_tuples.sort()
+    if os.path.basename(command_args[0]) == "bash" and len(command_args) > 1:
+        return os.path.basename(command_args[1])
 
-    # Reverse the tuple pairs back to "hash path"
-    # Convert the tuples back to strings
-    output_list_of_strings = [f"{hash} {path}" for path, hash in output_list_of_reversed_tuples]
+    return os.path.basename(command_args[0])
 
-    # Re-insert the strings that failed to split, back in their original line number
-    for string, line_number in output_list_of_strings_and_line_number_tuples:
-        output_list_of_strings.insert(line_number, string)
 
-    # Write the content back to the file
-    with open(packed_refs_file_path, "w") as packed_refs_file:
-        for line in output_list_of_strings:
-            packed_refs_file.write(f"{line}\n")
+def get_subprocess_dict(subprocess_to_run, args):
 
-    # Reset the default branch
-    subprocess_run(cmd_git_default_branch)
+    # Get the process attributes from the OS, or just the pid and args if the process already finished
+    try:
+        return subprocess_to_run.as_dict()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return {"pid": subprocess_to_run.pid, "cmdline": args}
 
 
-def subprocess_run(args, password=None, echo_password=None, quiet=False):
+def subprocess_run(args, password=None, echo_password=None, quiet=False, output_tail_lines=subprocess_output_tail_lines, output_consumers=None, stall_timeout_seconds=0, stall_retries=None, input_text=None, env=None):
+
+    # Runs the command, and reads its output line by line while it runs, instead of buffering all of it until it finishes,
+    # passing each line to each of the output_consumers functions, ex. progress parsers,
+    # and keeping only the last output_tail_lines lines in memory, to return and log
+    # Commands which need all of their output should use iterate_subprocess_output() instead
+    # If stall_timeout_seconds is set, kill the command if it makes no progress for that long, and retry it up to stall_retries times
+    # If input_text is set, write it to the command's stdin, ex. for git update-ref --stdin
+    # If env is set, add its variables to the command's environment, ex. for credentials which shouldn't be in its args
 
     return_dict                         = {}
     return_dict["returncode"]           = 1
     return_dict["output"]               = None
     truncated_subprocess_output_to_log  = None
     log_level                           = "debug"
+    subprocess_to_run                   = None
+    process_dict                        = {"pid": None, "cmdline": args}
+    subprocess_output                   = collections.deque(maxlen=output_tail_lines)
+    subprocess_progress_dict            = {"output_lines": 0, "stalled": False}
+    subprocess_finished_event           = threading.Event()
+    subprocess_start_time               = time.time()
+
+    if stall_retries is None:
+        stall_retries = environment_variables_dict.get("STALL_RETRIES", 0)
 
     try:
 
         # Create the process object and start it
-        subprocess_to_run = psutil.Popen(
+        subprocess_to_run = start_subprocess(
             args    = args,
             stdin   = subprocess.PIPE,
             stdout  = subprocess.PIPE,
             stderr  = subprocess.STDOUT,
             text    = True,
+            errors  = "replace",
+            env     = {**os.environ, **env} if env else None,
         )
 
-        # Get the process attributes from the OS
-        process_dict = subprocess_to_run.as_dict()
+        process_dict = get_subprocess_dict(subprocess_to_run, args)
 
         # Log a starting message
         status_message = "started"
         print_process_status(process_dict, status_message)
 
+        # Start a watchdog thread to kill the process if it stalls, as reading its output blocks this thread
+        start_subprocess_stall_watchdog(subprocess_to_run, stall_timeout_seconds, subprocess_progress_dict, subprocess_finished_event)
+
         # If password is provided to this function, feed it into the subprocess' stdin pipe
-        # communicate() also waits for the process to finish
-        if echo_password:
-            subprocess_output = subprocess_to_run.communicate(password)
+        try:
 
-        else:
-            subprocess_output = subprocess_to_run.communicate()
+            if echo_password:
+                subprocess_to_run.stdin.write(password)
+
+            if input_text:
+                subprocess_to_run.stdin.write(input_text)
+
+            subprocess_to_run.stdin.close()
+
+        except BrokenPipeError:
+            pass
+
+        # Read the output as it's written, the oldest lines fall off the front of the ring buffer
+        for subprocess_output_line in subprocess_to_run.stdout:
+
+            subprocess_output_line = subprocess_output_line.rstrip("\n")
+            subprocess_output.append(subprocess_output_line)
+            subprocess_progress_dict["output_lines"] += 1
+
+            for output_consumer in output_consumers or []:
+                output_consumer(subprocess_output_line)
+
+        subprocess_to_run.stdout.close()
+        subprocess_to_run.wait()
+        subprocess_finished_event.set()
 
         # Set the output to return
-        subprocess_output = subprocess_output[0].splitlines()
-        return_dict["output"] = subprocess_output
+        return_dict["output"] = list(subprocess_output)
 
         # Set the output to log
-        truncated_subprocess_output_to_log = truncate_subprocess_output(subprocess_output)
+        truncated_subprocess_output_to_log = truncate_subprocess_output(list(subprocess_output))
 
         # If the process exited successfully
         if subprocess_to_run.returncode == 0:
@@ -1170,6 +4326,13 @@ def subprocess_run(args, password=None, echo_password=None, quiet=False):
 
             return_dict["returncode"] = 0
 
+        elif subprocess_progress_dict["stalled"]:
+
+            status_message = f"killed after making no progress for {stall_timeout_seconds} seconds"
+
+            if not quiet:
+                log_level = "warning"
+
         else:
 
             status_message = "failed"
@@ -1177,15 +4340,27 @@ def subprocess_run(args, password=None, echo_password=None, quiet=False):
             if not quiet:
                 log_level = "error"
 
-    except subprocess.CalledProcessError as exception:
+    except (OSError, subprocess.SubprocessError) as exception:
 
             status_message = f"raised an exception: {type(exception)}, {exception.args}, {exception}"
 
             if not quiet:
                 log_level = "error"
 
+            # Don't leave the process running if reading its output failed
+            if subprocess_to_run and subprocess_to_run.poll() is None:
+                subprocess_to_run.kill()
+                subprocess_to_run.wait()
+
+    finally:
+
+        subprocess_finished_event.set()
+
+        if subprocess_to_run:
+            finish_subprocess(subprocess_to_run)
+
     # If the command fails
-    if subprocess_to_run.returncode != 0:
+    if subprocess_to_run and subprocess_to_run.returncode != 0:
 
         # There's a high chance it was caused by one of the lock files
         # If check_lock_files successfully cleared a lock file,
@@ -1196,9 +4371,223 @@ def subprocess_run(args, password=None, echo_password=None, quiet=False):
 
     print_process_status(process_dict, status_message, str(truncated_subprocess_output_to_log), log_level)
 
+    subprocess_command_name = get_subprocess_command_name(args)
+    record_metric("repo_converter_subprocesses_total", command=subprocess_command_name)
+    add_trace_event(subprocess_command_name, "subprocess", subprocess_start_time, time.time(), {"pid": process_dict["pid"], "status": status_message, "output_lines": subprocess_progress_dict["output_lines"]})
+
+    if return_dict["returncode"] != 0:
+        record_metric("repo_converter_subprocess_failures_total", command=subprocess_command_name)
+
+    # Kill and retry, as a stalled command is usually stuck on a dropped network connection, which a new process doesn't inherit
+    if subprocess_progress_dict["stalled"]:
+
+        return_dict["stalled"] = True
+
+        if stall_retries > 0:
+
+            record_metric("repo_converter_retries_total", repo=log_context_dict.get("repo", ""), reason=f"{subprocess_command_name} stalled")
+            log(f"pid {process_dict['pid']}; retrying stalled command {args[:4]}, {stall_retries - 1} retries remaining after this one", "warning")
+            return subprocess_run(args, password, echo_password, quiet, output_tail_lines, output_consumers, stall_timeout_seconds, stall_retries - 1, input_text, env)
+
     return return_dict
 
 
+def start_subprocess(**popen_kwargs):
+
+    # Start the process, and add its pid to the subprocess_pids_set, holding the lock, so reap_child_processes() can't wait on it
+    # before it's added, if it exits right away; raises the same exceptions as psutil.Popen
+    with subprocess_pids_lock:
+
+        subprocess_to_run = psutil.Popen(**popen_kwargs)
+        subprocess_pids_set.add(subprocess_to_run.pid)
+
+    return subprocess_to_run
+
+
+def finish_subprocess(subprocess_to_run):
+
+    # Remove the process' pid from the subprocess_pids_set, after waiting on it, so reap_child_processes() can reap the pid if it's reused
+    with subprocess_pids_lock:
+        subprocess_pids_set.discard(subprocess_to_run.pid)
+
+
+def get_subprocess_progress_counters(subprocess_to_run):
+
+    # Sum the bytes read, including from network sockets, and the CPU time, of the process and all of its children,
+    # ex. git svn fetch runs git, which runs perl, which reads from the svn server
+    progress_counters = [0, 0.0]
+
+    try:
+        processes = [subprocess_to_run] + subprocess_to_run.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+    for process in processes:
+
+        try:
+
+            with process.oneshot():
+
+                progress_counters[0] += process.io_counters().read_chars
+                cpu_times = process.cpu_times()
+                progress_counters[1] += cpu_times.user + cpu_times.system
+
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+            continue
+
+    # Round the CPU time to the clock tick, so rounding noise doesn't count as progress
+    return (progress_counters[0], round(progress_counters[1], 2), len(processes))
+
+
+def start_subprocess_stall_watchdog(subprocess_to_run, stall_timeout_seconds, subprocess_progress_dict, subprocess_finished_event):
+
+    # Watch the process in a thread, until subprocess_finished_event is set
+    # The process is making progress if it writes output, reads bytes, uses CPU time, or starts or stops child processes
+    # If it doesn't make progress for stall_timeout_seconds, kill it and its children, and set subprocess_progress_dict["stalled"]
+    if not stall_timeout_seconds:
+        return None
+
+    def watch_subprocess_for_stalls():
+
+        check_interval_seconds      = max(1, min(10, stall_timeout_seconds / 10))
+        last_progress_time          = time.monotonic()
+        last_progress_counters      = None
+        last_output_lines           = -1
+
+        while not subprocess_finished_event.wait(check_interval_seconds):
+
+            progress_counters = get_subprocess_progress_counters(subprocess_to_run)
+
+            if progress_counters is None:
+                return
+
+            if progress_counters != last_progress_counters or subprocess_progress_dict["output_lines"] != last_output_lines:
+
+                last_progress_time      = time.monotonic()
+                last_progress_counters  = progress_counters
+                last_output_lines       = subprocess_progress_dict["output_lines"]
+                continue
+
+            if time.monotonic() - last_progress_time < stall_timeout_seconds:
+                continue
+
+            log(f"pid {subprocess_to_run.pid}; no progress for {stall_timeout_seconds} seconds, killing it and its child processes; output lines: {last_output_lines}, bytes read: {progress_counters[0]}, CPU seconds: {progress_counters[1]}", "warning")
+            subprocess_progress_dict["stalled"] = True
+
+            try:
+                processes = subprocess_to_run.children(recursive=True) + [subprocess_to_run]
+            except psutil.NoSuchProcess:
+                processes = [subprocess_to_run]
+
+            for process in processes:
+
+                try:
+                    process.kill()
+                except psutil.NoSuchProcess:
+                    pass
+
+            return
+
+    watchdog_thread = threading.Thread(target=watch_subprocess_for_stalls, name=f"stall-watchdog-{subprocess_to_run.pid}", daemon=True)
+    watchdog_thread.start()
+
+    return watchdog_thread
+
+
+def iterate_subprocess_output(args, password=None, echo_password=None, read_chunk_size=None, stall_timeout_seconds=0):
+
+    # Runs the command, and yields its stdout while it's still running, for commands whose output is too large to hold in memory, ex. svn log
+    # Yields lines, without line endings, or if read_chunk_size is set, chunks of up to read_chunk_size bytes
+    # Raises subprocess.CalledProcessError if the command fails,
+    # or subprocess.TimeoutExpired if stall_timeout_seconds is set, and the command was killed for making no progress for that long
+
+    subprocess_progress_dict    = {"output_lines": 0, "stalled": False}
+    subprocess_finished_event   = threading.Event()
+    subprocess_start_time       = time.time()
+    stdout_finished             = False
+
+    # Send stderr to a temp file, so it can't get mixed into stdout, or fill up a pipe buffer while stdout is being read
+    with tempfile.TemporaryFile() as stderr_file:
+
+        subprocess_to_run = start_subprocess(
+            args    = args,
+            stdin   = subprocess.PIPE,
+            stdout  = subprocess.PIPE,
+            stderr  = stderr_file,
+        )
+
+        process_dict = get_subprocess_dict(subprocess_to_run, args)
+        print_process_status(process_dict, "started")
+        start_subprocess_stall_watchdog(subprocess_to_run, stall_timeout_seconds, subprocess_progress_dict, subprocess_finished_event)
+
+        try:
+
+            # If password is provided to this function, feed it into the subprocess' stdin pipe
+            try:
+
+                if echo_password:
+                    subprocess_to_run.stdin.write(f"{password}\n".encode("utf-8"))
+
+                subprocess_to_run.stdin.close()
+
+            except BrokenPipeError:
+                pass
+
+            if read_chunk_size:
+
+                # read1() returns as soon as any output is available, so the watchdog sees progress
+                while stdout_chunk := subprocess_to_run.stdout.read1(read_chunk_size):
+                    subprocess_progress_dict["output_lines"] += 1
+                    yield stdout_chunk
+
+            else:
+
+                for stdout_line in subprocess_to_run.stdout:
+                    subprocess_progress_dict["output_lines"] += 1
+                    yield stdout_line.decode("utf-8", errors="replace").rstrip("\n")
+
+            stdout_finished = True
+
+        finally:
+
+            # Stop the process if the caller stopped iterating early, or raised an exception
+            # Don't check if the process is still running instead, as it often hasn't exited yet right after closing its stdout, even when it succeeded
+            stopped_early = not stdout_finished and subprocess_to_run.poll() is None
+
+            if stopped_early:
+                subprocess_to_run.kill()
+
+            subprocess_to_run.stdout.close()
+            returncode = subprocess_to_run.wait()
+            subprocess_finished_event.set()
+            finish_subprocess(subprocess_to_run)
+
+            stderr_file.seek(0)
+            stderr_output = stderr_file.read().decode("utf-8", errors="replace").splitlines()
+
+            subprocess_command_name = get_subprocess_command_name(args)
+            record_metric("repo_converter_subprocesses_total", command=subprocess_command_name)
+            add_trace_event(subprocess_command_name, "subprocess", subprocess_start_time, time.time(), {"pid": process_dict["pid"], "returncode": returncode, "output_reads": subprocess_progress_dict["output_lines"]})
+
+            if returncode != 0 and not stopped_early:
+                record_metric("repo_converter_subprocess_failures_total", command=subprocess_command_name)
+
+            if returncode == 0:
+                print_process_status(process_dict, "succeeded")
+            elif stopped_early:
+                print_process_status(process_dict, "stopped before finishing")
+            elif subprocess_progress_dict["stalled"]:
+                print_process_status(process_dict, f"killed after making no progress for {stall_timeout_seconds} seconds", str(truncate_subprocess_output(stderr_output)), "warning")
+            else:
+                print_process_status(process_dict, "failed", str(truncate_subprocess_output(stderr_output)), "error")
+
+        if subprocess_progress_dict["stalled"]:
+            raise subprocess.TimeoutExpired(args, stall_timeout_seconds, stderr="\n".join(stderr_output))
+
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args, stderr="\n".join(stderr_output))
+
+
 def truncate_subprocess_output(subprocess_output):
 
     # If the output is longer than max_output_total_characters, it's probably just a list of all files converted, so truncate it
@@ -1225,12 +4614,6 @@ def check_lock_files(args, process_dict):
 
     return_value                = False
     repo_path                   = args[2] # [ "git", "-C", local_repo_path, "gc" ]
-    list_of_process_and_lock_file_path_tuples = [
-        ("Git garbage collection"       , ".git/gc.pid"                                     ), # fatal: gc is already running on machine '75c377aedbaf' pid 3700 (use --force if not)
-        ("svn config"                   , ".git/svn/.metadata.lock"                         ), # error: could not lock config file .git/svn/.metadata: File exists config svn-remote.svn.branches-maxRev 125551: command returned error: 255
-        ("git svn fetch git-svn"        , ".git/svn/refs/remotes/git-svn/index.lock"        ), # fatal: Unable to create '/sourcegraph/src-serve-root/svn.apache.org/asf/xmlbeans/.git/svn/refs/remotes/git-svn/index.lock': File exists.
-        ("git svn fetch origin trunk"   , ".git/svn/refs/remotes/origin/trunk/index.lock"   ), # fatal: Unable to create '/sourcegraph/src-serve-root/svn.apache.org/asf/xmlbeans/.git/svn/refs/remotes/origin/trunk/index.lock': File exists
-    ]
 
     # TypeError: can only join an iterable
     try:
@@ -1240,7 +4623,7 @@ def check_lock_files(args, process_dict):
 
     pid             = process_dict["pid"]
 
-    for lock_file in list_of_process_and_lock_file_path_tuples:
+    for lock_file in git_lock_files:
 
         process = lock_file[0]
         lock_file_path = f"{repo_path}/{lock_file[1]}"
@@ -1353,35 +4736,53 @@ def main():
     load_config_from_environment_variables()
     configure_logging()
     register_signal_handler()
+    start_metrics_server()
 
     while True:
 
         script_run_number += 1
+        run_start_time = time.time()
+
+        with trace_span("load repos-to-convert file"):
+            load_config_from_repos_to_convert_file()
 
-        load_config_from_repos_to_convert_file()
+        # Profile the orchestrator's own Python code for this run, if TRACE_PROFILE is set, after loading the file, as it can set TRACE_PROFILE
+        profiler = start_profile()
 
         # Calculate uptime
         uptime = get_process_uptime()
 
         log(f"Starting {script_name} run {script_run_number} with args: {str(environment_variables_dict)}; container ID: {os.uname().nodename}; uptime: {uptime}; running since {start_datetime}; using multiprocessing start method: {multiprocessing_start_method}", "info")
 
-        status_update_and_cleanup_zombie_processes()
-        git_config_safe_directory()
-        parse_repos_to_convert_file_into_repos_dict()
-        clone_svn_repos()
-        # clone_tfs_repos()
-        # clone_git_repos()
-        status_update_and_cleanup_zombie_processes()
+        with trace_span("status update and cleanup zombie processes"):
+            status_update_and_cleanup_zombie_processes()
+
+        with trace_span("git config safe directory"):
+            git_config_safe_directory()
+
+        with trace_span("schedule new repos"):
+            clone_svn_repos()
+            # clone_tfs_repos()
+            clone_git_repos()
+
+        # Queue each repo as it comes due, and reload the repos-to-convert.yaml file when it changes, until it's time for the next run
+        log(f"Queuing repos as they come due for the next REPO_CONVERTER_INTERVAL_SECONDS={environment_variables_dict['REPO_CONVERTER_INTERVAL_SECONDS']} seconds", "info")
+        wait_for_due_repos(run_start_time)
+
+        with trace_span("status update and cleanup zombie processes"):
+            status_update_and_cleanup_zombie_processes()
+
+        # Write the main process' spans for this run, the workers write their own for each repo
+        stop_profile(profiler)
+        add_trace_event(f"run {script_run_number}", "run", run_start_time, time.time())
+        write_trace_file("main")
+        remove_old_trace_files()
 
         # Calculate uptime
         uptime = get_process_uptime()
 
         log(f"Finishing {script_name} run {script_run_number} with args: {str(environment_variables_dict)}; container ID: {os.uname().nodename}; uptime: {uptime}; running since {start_datetime}; using multiprocessing start method: {multiprocessing_start_method}", "info")
 
-        # Sleep the configured interval
-        log(f"Sleeping main loop for REPO_CONVERTER_INTERVAL_SECONDS={environment_variables_dict['REPO_CONVERTER_INTERVAL_SECONDS']} seconds", "info")
-        time.sleep(environment_variables_dict["REPO_CONVERTER_INTERVAL_SECONDS"])
-
 
 if __name__ == "__main__":
     main()